@@ -0,0 +1,479 @@
+""" The SPL benchmark runner.
+
+Runs the benchmark scripts in 'benchmarks' through the real 'spl.py' pipeline, each in a new process, and reports
+the time of each phase as JSON. With a baseline, reports the benchmarks whose best run got slower than the best run of
+the baseline by more than the threshold. The best run is the one least disturbed by the rest of the machine, so it
+moves much less between two runs of the suite than the median. A phase may also get slower by as much as its runs
+spread in the baseline, from the best run to the 95th percentile, as less cannot be told from noise.
+
+Each round of runs also times a fixed python workload, and the times of the baseline are scaled by how much faster or
+slower that workload got, so a baseline recorded on another machine can be compared. On a shared machine, a whole run
+of the suite can still be much slower than another, so the gate is advisory: the regressions are printed, and only
+with '--strict' does the runner exit with status 1.
+
+With '--frontend', runs the front-end suite instead, which tokenizes and parses large generated sources and 'lang.sp'
+in this process, and also reports the throughput and the peak memory of each.
+
+With '--memory', runs each benchmark script in this process instead, and reports the live objects of the classes with
+'__slots__' layouts afterwards, with their bytes per object and the bytes the same objects would take with a '__dict__'.
+
+Usage
+    python bench.py [-h] [--frontend | --memory] [--scale N] [--runs N] [--warmup N] [--threshold T]
+                    [--baseline FILE] [--save-baseline] [--strict] [--output FILE] [--flags FLAGS] [NAME ...]
+"""
+
+import argparse
+import gc
+import io
+import json
+import math
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import script
+from bin import spl_interpreter, spl_lexer, spl_optimizer, spl_parser as psr, spl_resolver
+
+SUITE_VERSION = 3  # increase whenever a benchmark script or the report changes, so older baselines are not compared
+BENCH_DIR = os.path.join(script.get_spl_path(), "benchmarks")
+BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+FRONTEND_BASELINE = os.path.join(BENCH_DIR, "frontend_baseline.json")
+SPL = os.path.join(script.get_spl_path(), "spl.py")
+LANG = os.path.join(script.get_spl_path(), "lib", "lang.sp")
+PHASES = ("tokenize", "parse", "execute", "total")
+FRONTEND_PHASES = ("tokenize", "parse")
+MIN_GATED = 0.01  # seconds, phases faster than this in the baseline are too noisy to gate
+CALIBRATION_SIZE = 500000  # iterations of the calibration workload, about 0.15 seconds
+TIMER_PATTERN = re.compile(r"Time used: tokenize: ([\d.e-]+)s, parse: ([\d.e-]+)s, execute: ([\d.e-]+)s\.")
+
+
+class BenchmarkException(Exception):
+    def __init__(self, msg=""):
+        Exception.__init__(self, msg)
+
+
+def run_once(path: str, flags: list) -> dict:
+    """
+    Runs a benchmark script once, and returns the time of each phase, as reported by 'spl.py -t'.
+
+    :param path: the path of the script
+    :param flags: extra flags of 'spl.py', such as '-b'
+    :return: the seconds of each phase
+    """
+    proc = subprocess.run([sys.executable, SPL, "-t", *flags, path], stdin=subprocess.DEVNULL,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    match = TIMER_PATTERN.search(proc.stdout)
+    if proc.returncode != 0 or match is None:
+        raise BenchmarkException("Benchmark '{}' failed:\n{}{}".format(path, proc.stdout, proc.stderr))
+    tokenize, parse, execute = (float(x) for x in match.groups())
+    return {"tokenize": tokenize, "parse": parse, "execute": execute, "total": tokenize + parse + execute}
+
+
+def summarize(samples: list) -> dict:
+    """
+    Returns the statistics of the samples of one phase.
+
+    :param samples: the seconds of each run
+    :return: the best run, the median, the 95th percentile and the standard deviation
+    """
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+    return {"min": ordered[0],
+            "median": statistics.median(ordered),
+            "p95": p95,
+            "stddev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0}
+
+
+def calibrate() -> float:
+    """
+    Returns the seconds of a fixed python workload, which tells how fast the machine currently runs python.
+
+    :return: the seconds of the workload
+    """
+    start = time.perf_counter()
+    table = {}
+    for i in range(CALIBRATION_SIZE):
+        table[i % 97] = table.get(i % 89, 0) + len(str(i))
+    return time.perf_counter() - start
+
+
+def run_suite(names: list, runs: int, warmup: int, flags: list) -> dict:
+    """
+    Runs the benchmarks.
+
+    :param names: the benchmark names, which are the script names without '.sp'
+    :param runs: the number of measured runs of each benchmark
+    :param warmup: the number of runs before measuring, which fill the caches of the file system and the transpiler
+    :param flags: extra flags of 'spl.py'
+    :return: the report
+    """
+    paths = {name: os.path.join(BENCH_DIR, name + ".sp") for name in names}
+    for name in names:
+        for _ in range(warmup):
+            run_once(paths[name], flags)
+    results = {name: [] for name in names}
+    calibration = []
+    for _ in range(runs):  # one run of each benchmark at a time, so a slow period of the machine hits all alike
+        calibration.append(calibrate())
+        for name in names:
+            results[name].append(run_once(paths[name], flags))
+    benchmarks = {}
+    for name in names:
+        benchmarks[name] = {phase: summarize([r[phase] for r in results[name]]) for phase in PHASES}
+        print("{:<16} {:>10.1f} ms".format(name, benchmarks[name]["total"]["median"] * 1000), file=sys.stderr)
+    return {"version": SUITE_VERSION, "flags": flags, "runs": runs, "warmup": warmup,
+            "calibration": summarize(calibration), "benchmarks": benchmarks}
+
+
+def generate_nesting(scale: int) -> list:
+    """
+    Returns a source of deeply nested blocks.
+    """
+    lines = []
+    for k in range(20 * scale):
+        depth = 40
+        lines.append("function nested{}(n) {{\n".format(k))
+        for d in range(depth):
+            lines.append("    " * (d + 1) + ("if (n > {}) {{\n" if d % 2 == 0 else "while (n < {}) {{\n").format(d))
+        lines.append("    " * (depth + 1) + "n = n + 1;\n")
+        for d in range(depth, -1, -1):
+            lines.append("    " * d + "}\n")
+    return lines
+
+
+def generate_expressions(scale: int) -> list:
+    """
+    Returns a source of long arithmetic and logical expressions.
+    """
+    lines = []
+    for k in range(200 * scale):
+        terms = " + ".join("(a{0} * {1} - b{0} / {2} % 7)".format(k % 10, i, i + 1) for i in range(30))
+        lines.append("var e{} = {} > 0 && !(x{} == {}) || y >= {};\n".format(k, terms, k % 5, k, k))
+    return lines
+
+
+def generate_functions(scale: int) -> list:
+    """
+    Returns a source of many small documented functions.
+    """
+    lines = []
+    for k in range(2000 * scale):
+        lines.extend(["/*\n", " * Returns the function number {} applied to x and y.\n".format(k), " */\n",
+                      "function f{}(x, y=1, *rest) {{\n".format(k),
+                      "    var z = x * {} + y;\n".format(k),
+                      "    return z;\n",
+                      "}\n"])
+    return lines
+
+
+def generate_classes(scale: int) -> list:
+    """
+    Returns a source of many classes with fields, methods and inheritance.
+    """
+    lines = []
+    for k in range(500 * scale):
+        parent = " extends C{}".format(k - 1) if k > 0 else ""
+        lines.extend(["/*\n", " * The class number {}.\n".format(k), " */\n",
+                      "class C{}{} {{\n".format(k, parent),
+                      "    var value = {};\n".format(k),
+                      "    const name = \"C{}\";\n".format(k),
+                      "    function C{}(v) {{\n".format(k),
+                      "        value = v;\n",
+                      "    }\n",
+                      "    @Override\n",
+                      "    function get() {\n",
+                      "        return value + {};\n".format(k),
+                      "    }\n",
+                      "}\n"])
+    return lines
+
+
+def generate_strings(scale: int) -> list:
+    """
+    Returns a source of long string literals with escapes.
+    """
+    lines = []
+    text = "The quick brown fox jumps over the lazy dog, \\t tab \\n newline \\\\ slash. " * 4
+    for k in range(2000 * scale):
+        lines.append("var s{} = \"{}\" + \"x{}\";\n".format(k, text, k))
+    return lines
+
+
+GENERATORS = {"nesting": generate_nesting, "expressions": generate_expressions, "functions": generate_functions,
+              "classes": generate_classes, "strings": generate_strings}
+
+
+def front_end(lines: list, file_name: str) -> (list, float, float):
+    """
+    Tokenizes and parses a source, without importing 'lang.sp'.
+
+    The garbage collector is paused while measuring, as in 'timeit', so that its collections of the garbage of
+    earlier runs are not timed.
+
+    :param lines: the source lines
+    :param file_name: the file name recorded in the tokens
+    :return: the tokens, the seconds of tokenizing and the seconds of parsing
+    """
+    lexer = spl_lexer.Tokenizer()
+    lexer.setup(script.get_spl_path(), file_name, BENCH_DIR, import_lang=False)
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        lexer.tokenize(lines)
+        tokens = lexer.get_tokens()
+        middle = time.perf_counter()
+        psr.Parser(tokens).parse()
+        end = time.perf_counter()
+    finally:
+        gc.enable()
+    return tokens, middle - start, end - middle
+
+
+def peak_memory(lines: list, file_name: str) -> int:
+    """
+    Returns the peak bytes allocated while tokenizing and parsing a source.
+    """
+    tracemalloc.start()
+    try:
+        front_end(lines, file_name)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_frontend_suite(names: list, runs: int, warmup: int, scale: int) -> dict:
+    """
+    Runs the front-end benchmarks.
+
+    :param names: the names of the generated sources, and 'lang' for 'lib/lang.sp'
+    :param runs: the number of measured runs of each benchmark
+    :param warmup: the number of runs before measuring
+    :param scale: the size multiplier of the generated sources
+    :return: the report
+    """
+    sources = {}
+    for name in names:
+        if name == "lang":
+            with open(LANG, "r") as f:
+                sources[name] = f.readlines(), LANG
+        else:
+            sources[name] = GENERATORS[name](scale), name + ".sp"
+        for _ in range(warmup):
+            front_end(*sources[name])
+    results = {name: [] for name in names}
+    calibration = []
+    for _ in range(runs):  # one run of each benchmark at a time, so a slow period of the machine hits all alike
+        calibration.append(calibrate())
+        for name in names:
+            tokens, tokenize, parse = front_end(*sources[name])
+            results[name].append((len(tokens), tokenize, parse))
+    benchmarks = {}
+    for name in names:
+        lines, file_name = sources[name]
+        n_tokens = results[name][0][0]
+        result = {"tokenize": summarize([r[1] for r in results[name]]),
+                  "parse": summarize([r[2] for r in results[name]])}
+        for phase in FRONTEND_PHASES:
+            median = result[phase]["median"]
+            result[phase]["tokens_per_s"] = n_tokens / median
+            result[phase]["lines_per_s"] = len(lines) / median
+        result["lines"] = len(lines)
+        result["tokens"] = n_tokens
+        result["peak_bytes"] = peak_memory(lines, file_name)
+        benchmarks[name] = result
+        print("{:<16} {:>8} lines {:>10.0f} lines/s tokenize {:>10.0f} lines/s parse"
+              .format(name, len(lines), result["tokenize"]["lines_per_s"], result["parse"]["lines_per_s"]),
+              file=sys.stderr)
+    return {"version": SUITE_VERSION, "flags": ["--frontend", "--scale", str(scale)], "runs": runs, "warmup": warmup,
+            "calibration": summarize(calibration), "benchmarks": benchmarks}
+
+
+DICT_LAYOUTS = {}  # slotted class : a class with the same name whose instances have a '__dict__'
+
+
+def slot_names(cls: type) -> list:
+    return [name for c in cls.__mro__ for name in c.__dict__.get("__slots__", ())]
+
+
+def dict_layout_size(obj) -> int:
+    """
+    Returns the bytes an object would take if it kept its attributes in a '__dict__'.
+
+    The object is copied to an instance of a plain class made for its class, so copies of objects of one class share
+    their dict keys like instances without '__slots__' do.
+
+    :param obj: the slotted object
+    :return: the bytes of an object with the same attributes in a dict, and of the dict
+    """
+    cls = type(obj)
+    if cls not in DICT_LAYOUTS:
+        DICT_LAYOUTS[cls] = type(cls.__name__, (), {})
+    twin = DICT_LAYOUTS[cls]()
+    for name in slot_names(cls):
+        if hasattr(obj, name):
+            setattr(twin, name, getattr(obj, name))
+    return sys.getsizeof(twin) + sys.getsizeof(twin.__dict__)
+
+
+def census() -> dict:
+    """
+    Returns the live objects of the classes in 'bin' that have no '__dict__', by class name.
+
+    :return: the number of objects, and their bytes with slots and with a dict
+    """
+    counts = {}
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls.__module__.startswith("bin.") and not hasattr(obj, "__dict__"):
+            entry = counts.setdefault(cls.__name__, [0, 0, 0])
+            entry[0] += 1
+            entry[1] += sys.getsizeof(obj)
+            entry[2] += dict_layout_size(obj)
+    return counts
+
+
+def run_memory_suite(names: list) -> dict:
+    """
+    Runs the benchmarks in this process, with 'lang.sp' and their imports inlined, and counts the objects they leave.
+
+    The tokens, the tree and the interpreter are kept alive while counting, so the counts cover every stage.
+
+    :param names: the benchmark names
+    :return: the report
+    """
+    benchmarks = {}
+    for name in names:
+        path = os.path.join(BENCH_DIR, name + ".sp")
+        lexer = spl_lexer.Tokenizer()
+        lexer.setup(script.get_spl_path(), path, BENCH_DIR)
+        with open(path, "r") as f:
+            lexer.tokenize(f)
+        tokens = lexer.get_tokens()
+        block = spl_optimizer.Optimizer(1).optimize(psr.Parser(tokens).parse())
+        out = io.StringIO()
+        itr = spl_interpreter.Interpreter([], BENCH_DIR, None, (sys.stdin, out, out))
+        spl_resolver.resolve(block, itr.env.heap)
+        itr.set_ast(block)
+        itr.interpret()
+
+        gc.collect()
+        counts = census()
+        classes = {}
+        for cls_name, (n, slots_bytes, dict_bytes) in sorted(counts.items(), key=lambda kv: -kv[1][2]):
+            classes[cls_name] = {"objects": n, "slots_bytes": slots_bytes // n, "dict_bytes": dict_bytes // n}
+        total_slots = sum(c[1] for c in counts.values())
+        total_dict = sum(c[2] for c in counts.values())
+        benchmarks[name] = {"tokens": len(tokens), "objects": sum(c[0] for c in counts.values()),
+                            "slots_bytes": total_slots, "dict_bytes": total_dict, "classes": classes}
+        print("{:<16} {:>8} objects {:>10.1f} KiB, {:>10.1f} KiB with dicts ({:.0f}% saved)"
+              .format(name, benchmarks[name]["objects"], total_slots / 1024, total_dict / 1024,
+                      (1 - total_slots / total_dict) * 100), file=sys.stderr)
+        del tokens, block, itr
+    return {"version": SUITE_VERSION, "flags": ["--memory"], "benchmarks": benchmarks}
+
+
+def regressions(report: dict, baseline: dict, threshold: float) -> list:
+    """
+    Returns the phases whose best run got slower than the best run of the baseline by more than the threshold, or by
+    more than the relative spread of the phase in the baseline if that is larger.
+
+    The times of the baseline are first scaled by the ratio of the best calibration runs of the two reports.
+
+    :param report: the current report
+    :param baseline: the baseline report
+    :param threshold: the allowed relative slowdown, 0.25 for 25%
+    :return: the descriptions of the regressions
+    """
+    if baseline["version"] != report["version"]:
+        raise BenchmarkException("Baseline is of suite version {}, but the suite is of version {}"
+                                 .format(baseline["version"], report["version"]))
+    speed = report["calibration"]["min"] / baseline["calibration"]["min"]
+    found = []
+    for name, phases in report["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        for phase in PHASES if "execute" in phases else FRONTEND_PHASES:
+            stats = baseline["benchmarks"][name][phase]
+            before = stats["min"] * speed
+            after = phases[phase]["min"]
+            allowed = max(threshold, stats["p95"] / stats["min"] - 1) if before > 0 else threshold
+            if before >= MIN_GATED and after > before * (1 + allowed):
+                found.append("{} {}: {:.1f} ms expected at this machine speed, {:.1f} ms (+{:.0f}%, {:.0f}% allowed)"
+                             .format(name, phase, before * 1000, after * 1000, (after / before - 1) * 100,
+                                     allowed * 100))
+    return found
+
+
+def all_benchmarks() -> list:
+    return sorted(f[:-3] for f in os.listdir(BENCH_DIR) if f.endswith(".sp"))
+
+
+def parse_args(args: list):
+    parser = argparse.ArgumentParser(description="Runs the SPL benchmark suite.")
+    parser.add_argument("names", nargs="*", help="benchmarks to run, all as default")
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument("--frontend", action="store_true", help="runs the tokenizer and parser suite")
+    modes.add_argument("--memory", action="store_true", help="reports the bytes per object of the slotted classes")
+    parser.add_argument("--scale", type=int, default=1, help="size multiplier of the front-end sources")
+    parser.add_argument("--runs", type=int, default=10, help="measured runs of each benchmark")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured runs before measuring")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown, 0.25 for 25%%")
+    parser.add_argument("--baseline", help="the baseline to compare with, in 'benchmarks' as default")
+    parser.add_argument("--save-baseline", action="store_true", help="stores the results as the baseline")
+    parser.add_argument("--strict", action="store_true", help="exits with status 1 if there is any regression")
+    parser.add_argument("--output", help="writes the JSON report to the file instead of stdout")
+    parser.add_argument("--flags", default="", help="extra flags of spl.py, such as '-b'")
+    options = parser.parse_args(args)
+    if options.memory and (options.baseline or options.save_baseline or options.strict):
+        parser.error("the memory report has no baseline, '--baseline', '--save-baseline' and '--strict' are "
+                     "not allowed with '--memory'")
+    return options
+
+
+def main(args: list) -> int:
+    options = parse_args(args)
+    if options.memory:
+        report = run_memory_suite(options.names or all_benchmarks())
+        baseline_path = None
+    elif options.frontend:
+        names = options.names or [*GENERATORS, "lang"]
+        report = run_frontend_suite(names, options.runs, options.warmup, options.scale)
+        baseline_path = options.baseline or FRONTEND_BASELINE
+    else:
+        names = options.names or all_benchmarks()
+        report = run_suite(names, options.runs, options.warmup, options.flags.split())
+        baseline_path = options.baseline or BASELINE
+
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if baseline_path is None:
+        return 0
+    if options.save_baseline:
+        with open(baseline_path, "w") as f:
+            f.write(text + "\n")
+        return 0
+    if not os.path.exists(baseline_path):
+        return 0
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    if baseline["flags"] != report["flags"]:
+        print("Baseline was measured with flags {}, skipping comparison".format(baseline["flags"]), file=sys.stderr)
+        return 0
+    found = regressions(report, baseline, options.threshold)
+    for line in found:
+        print("Regression: " + line, file=sys.stderr)
+    return 1 if found and options.strict else 0
+
+
+if __name__ == "__main__":
+    sys.setrecursionlimit(10000)
+    sys.exit(main(sys.argv[1:]))
@@ -61,15 +61,12 @@ OVERRIDE = Annotation(lib.String("Override"))
 
 
 class Environment:
-    variables: dict
-    constants: dict
-    scope_type: int
-
     """
     ===== Attributes =====
     :param scope_type: the type of scope, whether it is global, class, function or inner
     :param heap: the shared-heap space, all pointed to one
     """
+    __slots__ = ("scope_type", "variables", "constants", "outer", "heap")
 
     def __init__(self, scope_type, outer):
         self.scope_type = scope_type
@@ -77,6 +74,7 @@ class Environment:
         self.constants: dict = {}  # Constants
 
         self.outer: Environment = outer
+        self.heap: dict = None if outer is None else outer.heap
 
     def __str__(self):
         temp = ["Consts: "]
@@ -156,48 +154,26 @@ class Environment:
             raise lib.NameException("Global name '{}' is not defined".format(class_name))
         return obj
 
-    def terminate(self, exit_value):
-        raise lib.SplException("Return outside function.")
-
-    def is_terminated(self):
+    def break_loop(self):
         """
-        Returns True iff this scope or one of its parent scopes had been terminated.
+        Stops the innermost loop.
 
-        :return: True iff this scope or one of its parent scopes had been terminated
-        """
-        return False
+        This method is called when the keyword 'break' is executed, and raises the signal caught by that loop.
 
-    def terminate_value(self):
-        """
-        Returns the last recorded terminate value of a function scope that the function had returned early.
-
-        :return: the terminate value
+        :return: None
         """
-        raise lib.SplException("Terminate value outside function.")
-
-    def break_loop(self):
         raise lib.SplException("Break not inside loop.")
 
     def pause_loop(self):
         """
-        Pauses the loop for one iteration.
+        Skips the rest of the current iteration of the innermost loop.
 
-        This method is called when the keyword 'continue' is executed.
+        This method is called when the keyword 'continue' is executed, and raises the signal caught by that loop.
 
         :return: None
         """
         raise lib.SplException("Continue not inside loop.")
 
-    def resume_loop(self):
-        """
-        Resumes a paused loop environment.
-
-        If this scope is not paused, this method can still be called but makes no effect.
-
-        :return: None
-        """
-        raise lib.SplException("Not inside loop.")
-
     def define_function(self, key, value, lf, annotations: lib.Set):
         if not annotations.contains(OVERRIDE) and \
                 not annotations.contains(SUPPRESS) and \
@@ -325,6 +301,29 @@ class Environment:
                                     .format(key, line_file[1], line_file[0]))
         return v
 
+    def get_at(self, key: str, depth: int, line_file: tuple):
+        """
+        Returns the value of a key that is statically resolved to be declared 'depth' sub scopes outside this scope.
+
+        Falls back to the full lookup if the path crosses a main scope, or the key is not there.
+
+        :param key:
+        :param depth: the number of scopes between this scope and the declaring scope
+        :param line_file:
+        :return: the value corresponding to the key
+        """
+        env = self
+        while depth:
+            if env.scope_type != SUB_SCOPE and env.scope_type != LOOP_SCOPE:
+                return self.get(key, line_file)
+            env = env.outer
+            depth -= 1
+        if key in env.constants:
+            return env.constants[key]
+        if key in env.variables:
+            return env.variables[key]
+        return self.get(key, line_file)
+
     def get_class(self, class_name):
         v = self._inner_get(class_name)
         if v is NULLPTR:
@@ -353,12 +352,12 @@ class Environment:
 
 
 class MainAbstractEnvironment(Environment):
-    namespaces: set
+    __slots__ = ("namespaces",)
 
     def __init__(self, scope_type, outer):
         Environment.__init__(self, scope_type, outer)
 
-        self.namespaces = set()
+        self.namespaces: set = set()
 
     def is_global(self):
         raise NotImplementedError
@@ -401,6 +400,8 @@ class MainAbstractEnvironment(Environment):
 
 
 class SubAbstractEnvironment(Environment):
+    __slots__ = ()
+
     def __init__(self, scope_type, outer):
         Environment.__init__(self, scope_type, outer)
 
@@ -430,11 +431,14 @@ class SubAbstractEnvironment(Environment):
 
 
 class GlobalEnvironment(MainAbstractEnvironment):
+    __slots__ = ("modules", "lang_classes", "scope_name")
+
     def __init__(self):
         MainAbstractEnvironment.__init__(self, GLOBAL_SCOPE, None)
 
         self.heap = {}
         self.modules = {}  # module path : Module objects
+        self.lang_classes = {}  # class name : classes of 'lib/lang.sp' already looked up
 
     def is_class(self):
         return False
@@ -471,6 +475,8 @@ class GlobalEnvironment(MainAbstractEnvironment):
 
 
 class ModuleEnvironment(MainAbstractEnvironment):
+    __slots__ = ()
+
     def __init__(self, outer):
         MainAbstractEnvironment.__init__(self, MODULE_SCOPE, outer)
 
@@ -488,6 +494,8 @@ class ModuleEnvironment(MainAbstractEnvironment):
 
 
 class ClassEnvironment(MainAbstractEnvironment):
+    __slots__ = ()
+
     def __init__(self, outer):
         MainAbstractEnvironment.__init__(self, CLASS_SCOPE, outer)
 
@@ -505,28 +513,17 @@ class ClassEnvironment(MainAbstractEnvironment):
 
 
 class FunctionEnvironment(MainAbstractEnvironment):
+    __slots__ = ()
+
     def __init__(self, outer):
         MainAbstractEnvironment.__init__(self, FUNCTION_SCOPE, outer)
 
-        self.terminated = False
-        self.exit_value = None
-
     def is_class(self):
         return False
 
     def is_global(self):
         return False
 
-    def terminate(self, exit_value):
-        self.terminated = True
-        self.exit_value = exit_value
-
-    def terminate_value(self):
-        return self.exit_value
-
-    def is_terminated(self):
-        return self.terminated
-
     def add_heap(self, k, v):
         self.outer.add_heap(k, v)
 
@@ -535,30 +532,16 @@ class FunctionEnvironment(MainAbstractEnvironment):
 
 
 class LoopEnvironment(SubAbstractEnvironment):
+    __slots__ = ()
+
     def __init__(self, outer):
         SubAbstractEnvironment.__init__(self, LOOP_SCOPE, outer)
 
-        self.broken = False
-        self.paused = False
-
-    def resume_loop(self):
-        self.paused = False
-
-    def terminate(self, exit_value):
-        self.broken = True
-        self.outer.terminate(exit_value)
-
-    def terminate_value(self):
-        return self.outer.terminate_value()
-
-    def is_terminated(self):
-        return self.outer.is_terminated()
-
     def break_loop(self):
-        self.broken = True
+        raise lib.LoopBreak()
 
     def pause_loop(self):
-        self.paused = True
+        raise lib.LoopContinue()
 
     def add_heap(self, k, v):
         self.outer.add_heap(k, v)
@@ -568,21 +551,11 @@ class LoopEnvironment(SubAbstractEnvironment):
 
 
 class SubEnvironment(SubAbstractEnvironment):
+    __slots__ = ()
+
     def __init__(self, outer):
         SubAbstractEnvironment.__init__(self, SUB_SCOPE, outer)
 
-    def resume_loop(self):
-        self.outer.resume_loop()
-
-    def terminate(self, exit_value):
-        self.outer.terminate(exit_value)
-
-    def terminate_value(self):
-        return self.outer.terminate_value()
-
-    def is_terminated(self):
-        return self.outer.is_terminated()
-
     def break_loop(self):
         self.outer.break_loop()
 
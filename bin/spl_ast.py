@@ -47,6 +47,9 @@ CONST = 1
 VAR = 2
 FUNC_DEFINE = 3
 
+# Name resolutions
+HEAP_NAME = -1
+
 
 class SpaceCounter:
     def __init__(self):
@@ -66,37 +69,41 @@ SPACES = SpaceCounter()
 
 
 class Node:
-    line_num = 0
-    file = None
-    node_type = 0
-    execution = 0
+    __slots__ = ("line_num", "file", "node_type", "execution", "compiled")
 
     def __init__(self, line: tuple):
         self.line_num = line[0]
         self.file = line[1]
         self.node_type = 0
         self.execution = 0
+        self.compiled = None  # the closure of this node, set by the closure compiler
 
 
 class LeafNode(Node):
+    __slots__ = ()
+
     def __init__(self, line):
         Node.__init__(self, line)
 
 
 class Expr(Node):
+    __slots__ = ()
+
     def __init__(self, line):
         Node.__init__(self, line)
 
 
 class BlockStmt(Node):
-    lines: list = None
-    standalone = False
+    __slots__ = ("lines", "standalone", "bytecode", "transpiled")
 
     def __init__(self, line):
         Node.__init__(self, line)
 
         self.node_type = BLOCK_STMT
-        self.lines = []
+        self.lines: list = []
+        self.standalone = False
+        self.bytecode = None  # the bytecode of a function body, set by the bytecode compiler
+        self.transpiled = None  # the python function of a function body, set by the transpiler
 
     def add_line(self, node):
         self.lines.append(node)
@@ -119,13 +126,13 @@ class BinaryExpr(Expr):
     :type operation: str
     :type left:
     """
-    left = None
-    right = None
-    operation = None
+    __slots__ = ("left", "right", "operation")
 
     def __init__(self, line, operator):
         Expr.__init__(self, line)
 
+        self.left = None
+        self.right = None
         self.operation = operator
 
     def precedence(self):
@@ -142,7 +149,7 @@ class LiteralNode(LeafNode):
     """
     :type literal: str
     """
-    literal = None
+    __slots__ = ("literal",)
 
     def __init__(self, line, lit):
         LeafNode.__init__(self, line)
@@ -158,24 +165,24 @@ class LiteralNode(LeafNode):
 
 
 class TitleNode(Node):
-    titles: list
+    __slots__ = ("titles",)
 
     def __init__(self, line):
         Node.__init__(self, line)
 
 
 class TernaryOperator(Expr):
-    first_op: str
-    second_op: str = None
-    left: Node = None
-    mid: Node = None
-    right: Node = None
+    __slots__ = ("first_op", "second_op", "left", "mid", "right")
 
     def __init__(self, line, first_op):
         Expr.__init__(self, line)
 
         self.node_type = TERNARY_OPERATOR
-        self.first_op = first_op
+        self.first_op: str = first_op
+        self.second_op: str = None
+        self.left: Node = None
+        self.mid: Node = None
+        self.right: Node = None
 
     def precedence(self):
         return PRECEDENCE[self.first_op]
@@ -188,22 +195,24 @@ class TernaryOperator(Expr):
 
 
 class BinaryOperator(BinaryExpr):
-    assignment = False
+    __slots__ = ("assignment", "specialization")
 
     def __init__(self, line, op):
         BinaryExpr.__init__(self, line, op)
 
         self.node_type = BINARY_OPERATOR
+        self.assignment = False
+        self.specialization = None  # (left type, right type, operation) seen by this operator, set by the interpreter
 
 
 class UnaryOperator(Expr):
-    value = None
-    operation = None
+    __slots__ = ("value", "operation")
 
     def __init__(self, line, op):
         Expr.__init__(self, line)
 
         self.node_type = UNARY_OPERATOR
+        self.value = None
         self.operation = op
 
     def precedence(self):
@@ -217,13 +226,14 @@ class UnaryOperator(Expr):
 
 
 class NameNode(LeafNode):
-    name: str = None
+    __slots__ = ("name", "depth")
 
     def __init__(self, line, n):
         LeafNode.__init__(self, line)
 
         self.node_type = NAME_NODE
-        self.name = n
+        self.name: str = n
+        self.depth: int = None  # scopes between the reading and the declaring scope, or HEAP_NAME, set by the resolver
 
     def __str__(self):
         return "N(" + self.name + ")"
@@ -233,7 +243,7 @@ class NameNode(LeafNode):
 
 
 class AssignmentNode(BinaryExpr):
-    level = ASSIGN
+    __slots__ = ("level",)
 
     def __init__(self, line, level):
         BinaryExpr.__init__(self, line, "=")
@@ -243,14 +253,14 @@ class AssignmentNode(BinaryExpr):
 
 
 class InDecrementOperator(Expr):
-    operation: str
-    is_post: bool = True  # if is_post: i++
-    value = None
+    __slots__ = ("operation", "is_post", "value")
 
     def __init__(self, lf, operation):
         Expr.__init__(self, lf)
 
-        self.operation = operation
+        self.operation: str = operation
+        self.is_post: bool = True  # if is_post: i++
+        self.value = None
         self.node_type = IN_DECREMENT_OPERATOR
 
     def precedence(self):
@@ -270,13 +280,13 @@ class InDecrementOperator(Expr):
 
 
 class AnnotationNode(Node):
-    name: str
-    args: BlockStmt = None
-    body: BlockStmt = None
+    __slots__ = ("name", "args", "body")
 
     def __init__(self, line, name):
         Node.__init__(self, line)
-        self.name = name
+        self.name: str = name
+        self.args: BlockStmt = None
+        self.body: BlockStmt = None
 
         self.node_type = ANNOTATION_NODE
 
@@ -288,6 +298,8 @@ class AnnotationNode(Node):
 
 
 class BreakStmt(LeafNode):
+    __slots__ = ()
+
     def __init__(self, line):
         LeafNode.__init__(self, line)
 
@@ -301,6 +313,8 @@ class BreakStmt(LeafNode):
 
 
 class ContinueStmt(LeafNode):
+    __slots__ = ()
+
     def __init__(self, line):
         LeafNode.__init__(self, line)
 
@@ -314,21 +328,26 @@ class ContinueStmt(LeafNode):
 
 
 class CondStmt(Node):
-    condition = None
+    __slots__ = ("condition",)
 
     def __init__(self, line):
         Node.__init__(self, line)
 
+        self.condition = None
+
 
 class IfStmt(CondStmt):
-    then_block = None
-    else_block = None
-    has_else = False
+    __slots__ = ("then_block", "else_block", "has_else", "then_scoped", "else_scoped")
 
     def __init__(self, line):
         CondStmt.__init__(self, line)
 
         self.node_type = IF_STMT
+        self.then_block = None
+        self.else_block = None
+        self.has_else = False
+        self.then_scoped: bool = True  # whether the then block runs in its own scope, set by the resolver
+        self.else_scoped: bool = True  # whether the else block runs in its own scope, set by the resolver
 
     def __str__(self):
         return "if({} then {} else[{}] {})".format(self.condition, self.then_block, self.has_else, self.else_block)
@@ -338,12 +357,14 @@ class IfStmt(CondStmt):
 
 
 class WhileStmt(CondStmt):
-    body = None
+    __slots__ = ("body", "body_declares")
 
     def __init__(self, line):
         CondStmt.__init__(self, line)
 
         self.node_type = WHILE_STMT
+        self.body = None
+        self.body_declares: bool = True  # whether the body may declare names in its block scope, set by the resolver
 
     def __str__(self):
         return "while({} do {})".format(self.condition, self.body)
@@ -353,12 +374,15 @@ class WhileStmt(CondStmt):
 
 
 class ForLoopStmt(CondStmt):
-    body = None
+    __slots__ = ("body", "counter", "body_declares")
 
     def __init__(self, line):
         CondStmt.__init__(self, line)
 
         self.node_type = FOR_LOOP_STMT
+        self.body = None
+        self.counter: str = None  # the name of the counter if this is a counted loop, set by the optimizer
+        self.body_declares: bool = True  # whether the body may declare names in its block scope, set by the resolver
 
     def __str__(self):
         return "for ({}) do {}".format(self.condition, self.body)
@@ -368,20 +392,17 @@ class ForLoopStmt(CondStmt):
 
 
 class DefStmt(TitleNode):
-    params: BlockStmt = None
-    body = None
-    abstract: bool = False
-    annotations: list
-    doc: str
+    __slots__ = ("params", "body", "abstract", "annotations", "doc")
 
     def __init__(self, line, abstract: bool, func_doc: str):
         TitleNode.__init__(self, line)
 
         self.node_type = DEF_STMT
-        self.params = None
-        self.abstract = abstract
-        self.doc = func_doc
-        self.annotations = []
+        self.params: BlockStmt = None
+        self.body = None
+        self.abstract: bool = abstract
+        self.doc: str = func_doc
+        self.annotations: list = []
 
     def __str__(self):
         return "func(({}) -> {})".format(self.params, self.body)
@@ -391,14 +412,14 @@ class DefStmt(TitleNode):
 
 
 class FuncCall(Node):
-    call_obj = None
-    args: BlockStmt = None
+    __slots__ = ("call_obj", "args")
 
     def __init__(self, line, call_obj):
         Node.__init__(self, line)
 
         self.node_type = FUNCTION_CALL
         self.call_obj = call_obj
+        self.args: BlockStmt = None
 
     def __str__(self):
         return "call:[{}({})]".format(self.call_obj, self.args)
@@ -411,14 +432,14 @@ class FuncCall(Node):
 
 
 class IndexingNode(Node):
-    call_obj = None
-    arg: BlockStmt = None
+    __slots__ = ("call_obj", "arg")
 
     def __init__(self, line, call_obj):
         Node.__init__(self, line)
 
         self.node_type = INDEXING_NODE
         self.call_obj = call_obj
+        self.arg: BlockStmt = None
 
     def __str__(self):
         return "{}[{}]".format(self.call_obj, self.arg)
@@ -431,15 +452,14 @@ class IndexingNode(Node):
 
 
 class ImportNode(Node):
-    import_name: str
-    path: str
-    block: BlockStmt = None
+    __slots__ = ("import_name", "path", "block")
 
     def __init__(self, line, name, path):
         Node.__init__(self, line)
 
-        self.import_name = name
-        self.path = path
+        self.import_name: str = name
+        self.path: str = path
+        self.block: BlockStmt = None
         self.node_type = IMPORT_NODE
 
     def __str__(self):
@@ -450,20 +470,17 @@ class ImportNode(Node):
 
 
 class ClassStmt(Node):
-    class_name: str = None
-    superclass_nodes: list
-    block: BlockStmt = None
-    abstract: bool = False
-    doc: str
+    __slots__ = ("class_name", "superclass_nodes", "block", "abstract", "doc")
 
     def __init__(self, line: tuple, name: str, abstract: bool, class_doc: str):
         Node.__init__(self, line)
 
         self.node_type = CLASS_STMT
-        self.class_name = name
-        self.abstract = abstract
-        self.doc = class_doc
-        self.superclass_nodes = [NameNode(line, "Object")]
+        self.class_name: str = name
+        self.block: BlockStmt = None
+        self.abstract: bool = abstract
+        self.doc: str = class_doc
+        self.superclass_nodes: list = [NameNode(line, "Object")]
 
     def __str__(self):
         return "Class {}: {}".format(self.class_name, self.block)
@@ -473,6 +490,8 @@ class ClassStmt(Node):
 
 
 class Dot(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, line):
         BinaryOperator.__init__(self, line, ".")
 
@@ -486,12 +505,13 @@ class Dot(BinaryOperator):
 
 
 class CatchStmt(CondStmt):
-    then: BlockStmt = None
+    __slots__ = ("then",)
 
     def __init__(self, line):
         CondStmt.__init__(self, line)
 
         self.node_type = CATCH_STMT
+        self.then: BlockStmt = None
 
     def __str__(self):
         return "catch ({}) {}".format(self.condition, self.then)
@@ -501,15 +521,17 @@ class CatchStmt(CondStmt):
 
 
 class TryStmt(Node):
-    try_block: BlockStmt = None
-    catch_blocks = None
-    finally_block: BlockStmt = None
+    __slots__ = ("try_block", "catch_blocks", "finally_block", "try_scoped", "finally_scoped")
 
     def __init__(self, line):
         Node.__init__(self, line)
 
         self.node_type = TRY_STMT
+        self.try_block: BlockStmt = None
         self.catch_blocks: [CatchStmt] = []
+        self.finally_block: BlockStmt = None
+        self.try_scoped: bool = True  # whether the try block runs in its own scope, set by the resolver
+        self.finally_scoped: bool = True  # whether the finally block runs in its own scope, set by the resolver
 
     def __str__(self):
         return "try {} {} finally {}" \
@@ -520,24 +542,29 @@ class TryStmt(Node):
 
 
 class JumpNode(Node):
-    to = None
-    args = None
+    """
+    A function call in tail position, whose result is returned by the calling function.
 
-    def __init__(self, line, to):
+    The call is made after the calling function returns, so it does not grow the call stack.
+    """
+    __slots__ = ("call",)
+
+    def __init__(self, line, call: FuncCall):
         Node.__init__(self, line)
 
         self.node_type = JUMP_NODE
-        self.to = to
-        self.args = []
+        self.call = call
 
     def __str__(self):
-        return "Jump({}: {})".format(self.to, self.args)
+        return "Jump({})".format(self.call)
 
     def __repr__(self):
         return self.__str__()
 
 
 class UndefinedNode(LeafNode):
+    __slots__ = ()
+
     def __init__(self, line):
         LeafNode.__init__(self, line)
 
@@ -852,7 +879,8 @@ class AbstractSyntaxTree:
         else:
             block: BlockStmt = self.stack.pop()
             node: ImportNode = self.stack[-1]
-            node.block = block
+            if isinstance(node, ImportNode):  # 'import "x";' leaves the name of the path on the stack instead
+                node.block = block
 
     def new_block(self):
         if self.inner:
@@ -1168,3 +1196,69 @@ def place_else(stmt: Node, element) -> bool:
             else:
                 return place_else(stmt.else_block, element)
     return False
+
+
+def children(node) -> list:
+    """
+    Returns the direct children of an abstract syntax tree node, in the order they are evaluated.
+
+    The returned list may contain raw values such as numbers, booleans or None, as they are also valid elements of
+    the tree.
+
+    :param node: the parent node
+    :return: the direct children of the node
+    """
+    if isinstance(node, BlockStmt):
+        return node.lines
+    elif isinstance(node, BinaryExpr):
+        return [node.left, node.right]
+    elif isinstance(node, UnaryOperator) or isinstance(node, InDecrementOperator):
+        return [node.value]
+    elif isinstance(node, TernaryOperator):
+        return [node.left, node.mid, node.right]
+    elif isinstance(node, IfStmt):
+        return [node.condition, node.then_block, node.else_block]
+    elif isinstance(node, WhileStmt) or isinstance(node, ForLoopStmt):
+        return [node.condition, node.body]
+    elif isinstance(node, CatchStmt):
+        return [node.condition, node.then]
+    elif isinstance(node, TryStmt):
+        return [node.try_block, *node.catch_blocks, node.finally_block]
+    elif isinstance(node, DefStmt):
+        return [node.params, node.body]
+    elif isinstance(node, FuncCall):
+        return [node.call_obj, node.args]
+    elif isinstance(node, IndexingNode):
+        return [node.call_obj, node.arg]
+    elif isinstance(node, ClassStmt):
+        return [*node.superclass_nodes, node.block]
+    elif isinstance(node, ImportNode):
+        return [node.block]
+    elif isinstance(node, AnnotationNode):
+        return [node.args, node.body]
+    elif isinstance(node, JumpNode):
+        return [node.call]
+    else:
+        return []
+
+
+def hot_nodes(root: Node, limit: int) -> list:
+    """
+    Returns the most executed nodes of an abstract syntax tree, by their execution counts.
+
+    The counts are only kept by the counting evaluator of the interpreter, which is installed by the '-et' option.
+
+    :param root: the root of the tree
+    :param limit: the maximum number of nodes to return
+    :return: the nodes executed at least once, the most executed first
+    """
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Node):
+            if node.execution > 0:
+                nodes.append(node)
+            stack.extend(children(node))
+    nodes.sort(key=lambda n: n.execution, reverse=True)
+    return nodes[:limit]
@@ -0,0 +1,720 @@
+""" The bytecode compiler of the spl interpreter.
+
+The body of a spl function is compiled into a flat stream of instructions, which is executed by the stack-based
+virtual machine in 'spl_vm'. Local variables of the function are resolved to numbered slots at compile time, and
+'if', 'while', 'for', 'break' and 'continue' are compiled into jumps.
+
+A function is only compiled if the compiler can prove that no code other than its own body reads or writes its
+local variables, i.e. it defines no inner functions or classes and does not use reflection like 'eval'.
+Nodes without a dedicated instruction, such as 'new' or 'try', are compiled into an 'EVAL' instruction, which lets
+the tree-walker evaluate the node in an environment built from the local slots.
+"""
+
+from bin import spl_ast as ast, spl_interpreter as itr
+from bin.environment import UNDEFINED
+
+# Opcodes
+LOAD_CONST = 1
+LOAD_STRING = 2
+LOAD_FAST = 3
+STORE_FAST = 4
+LOAD_OUTER = 5
+STORE_OUTER = 6
+LOAD_ATTR = 7
+STORE_ATTR = 8
+LOAD_INDEX = 9
+STORE_INDEX = 10
+BINARY = 11
+AND_JUMP = 12
+OR_JUMP = 13
+NEG = 14
+NOT = 15
+INCREMENT = 16
+DECREMENT = 17
+JUMP = 18
+JUMP_IF_FALSE = 19
+JUMP_IF_TRUE = 20
+CALL = 21
+CALL_METHOD = 22
+RETURN = 23
+POP = 24
+DUP = 25
+BUILD_PAIR = 26
+BUILD_SET = 27
+GET_ITER = 28
+FOR_ITER = 29
+EVAL = 30
+TAIL_CALL = 31
+
+OP_NAMES = {
+    LOAD_CONST: "LOAD_CONST",
+    LOAD_STRING: "LOAD_STRING",
+    LOAD_FAST: "LOAD_FAST",
+    STORE_FAST: "STORE_FAST",
+    LOAD_OUTER: "LOAD_OUTER",
+    STORE_OUTER: "STORE_OUTER",
+    LOAD_ATTR: "LOAD_ATTR",
+    STORE_ATTR: "STORE_ATTR",
+    LOAD_INDEX: "LOAD_INDEX",
+    STORE_INDEX: "STORE_INDEX",
+    BINARY: "BINARY",
+    AND_JUMP: "AND_JUMP",
+    OR_JUMP: "OR_JUMP",
+    NEG: "NEG",
+    NOT: "NOT",
+    INCREMENT: "INCREMENT",
+    DECREMENT: "DECREMENT",
+    JUMP: "JUMP",
+    JUMP_IF_FALSE: "JUMP_IF_FALSE",
+    JUMP_IF_TRUE: "JUMP_IF_TRUE",
+    CALL: "CALL",
+    CALL_METHOD: "CALL_METHOD",
+    RETURN: "RETURN",
+    POP: "POP",
+    DUP: "DUP",
+    BUILD_PAIR: "BUILD_PAIR",
+    BUILD_SET: "BUILD_SET",
+    GET_ITER: "GET_ITER",
+    FOR_ITER: "FOR_ITER",
+    EVAL: "EVAL",
+    TAIL_CALL: "TAIL_CALL"
+}
+
+# Names of functions that read or write the calling environment, a function calling them is not compiled
+REFLECTIVE_NAMES = {"eval", "exec", "get_env", "locals"}
+
+# Node types whose evaluation needs the environment of the function, see 'is_isolated'
+ENV_NODE_TYPES = {ast.BREAK_STMT, ast.CONTINUE_STMT, ast.DEF_STMT, ast.CLASS_STMT, ast.IMPORT_NODE, ast.JUMP_NODE,
+                  ast.ANNOTATION_NODE}
+
+
+class UnsupportedSyntax(Exception):
+    """
+    Raised internally when a function body contains a construct the compiler does not handle.
+    """
+    pass
+
+
+class CodeObject:
+    """
+    The compiled bytecode of a function body.
+
+    Instruction i is the pair (ops[i], args[i]), where the argument is any python object the opcode needs.
+
+    ===== Attributes =====
+    :param name: a description of the compiled function, used in disassembly
+    :param n_params: the number of parameters, which occupy the first slots
+    :param variadic: whether the function has an unpack or keyword unpack parameter
+    :param n_slots: the total number of local slots
+    :param slot_names: the variable name of each slot
+    """
+
+    def __init__(self, name: str, n_params: int):
+        self.name = name
+        self.n_params = n_params
+        self.variadic = False
+        self.n_slots = 0
+        self.slot_names = []
+        self.ops = []
+        self.args = []
+
+    def emit(self, op: int, arg=None) -> int:
+        """
+        Appends an instruction.
+
+        :param op: the opcode
+        :param arg: the argument of the instruction
+        :return: the index of the appended instruction
+        """
+        self.ops.append(op)
+        self.args.append(arg)
+        return len(self.ops) - 1
+
+    def patch(self, index: int, target: int):
+        """
+        Sets the target of a jump instruction.
+
+        :param index: the index of the jump instruction
+        :param target: the index of the instruction to jump to
+        :return: None
+        """
+        self.args[index] = target
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __str__(self):
+        lines = ["Code <{}>, {} slots {}".format(self.name, self.n_slots, self.slot_names)]
+        for i in range(len(self.ops)):
+            arg = self.args[i]
+            if isinstance(arg, tuple):
+                arg = arg[0]
+            lines.append("{:>5} {:<14} {}".format(i, OP_NAMES[self.ops[i]], "" if arg is None else arg))
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return "Code <{}>".format(self.name)
+
+
+def function_code(func: itr.Function):
+    """
+    Returns the bytecode of a function, compiling its body at the first call.
+
+    The bytecode is cached in the body node, so all functions sharing that body, for example the methods of
+    instances of the same class, share it.
+
+    :param func: the function
+    :return: the compiled bytecode, None if the function cannot be compiled
+    """
+    body = func.body
+    code = body.bytecode
+    if code is None:
+        try:
+            code = Compiler(func).compile()
+        except UnsupportedSyntax:
+            code = False
+        body.bytecode = code
+    return code if code else None
+
+
+def is_isolated(node) -> bool:
+    """
+    Returns True iff the node can be evaluated in a temporary environment holding the values of the local variables.
+
+    This is not the case if the node returns, jumps, defines closures over that environment, or reflects on it.
+
+    :param node: the node to be checked
+    :return: True iff the node can be evaluated in a temporary environment
+    """
+    if not isinstance(node, ast.Node):
+        return True
+    t = node.node_type
+    if t in ENV_NODE_TYPES:
+        return False
+    elif t == ast.UNARY_OPERATOR and (node.operation == "return" or node.operation == "namespace"):
+        return False
+    elif t == ast.FUNCTION_CALL and isinstance(node.call_obj, ast.NameNode) and \
+            node.call_obj.name in REFLECTIVE_NAMES:
+        return False
+    return all(is_isolated(child) for child in ast.children(node))
+
+
+def is_plain_arg(arg) -> bool:
+    """
+    Returns True iff the argument of a call is a plain positional argument.
+
+    :param arg: the argument node
+    :return: True iff the argument of a call is a plain positional argument
+    """
+    if isinstance(arg, ast.AssignmentNode):
+        return False
+    elif isinstance(arg, ast.UnaryOperator):
+        return arg.operation == "neg" or arg.operation == "new"
+    return True
+
+
+class Compiler:
+    """
+    Compiles the body of a function into a 'CodeObject'.
+
+    ===== Attributes =====
+    :param scopes: the lexical scopes from the function scope to the innermost one, each maps names to
+        (slot, is_const)
+    :param loops: the enclosing loops, each is (slot of the loop's result or None, indices of the jumps of its
+        'break's, indices of the jumps of its 'continue's)
+    """
+
+    def __init__(self, func: itr.Function):
+        self.func = func
+        self.heap = func.outer_scope.get_global().heap
+        self.code = CodeObject("function at line {} in '{}'".format(func.line_num, func.file), len(func.params))
+        self.scopes = [{}]
+        self.loops = []
+
+    def compile(self) -> CodeObject:
+        """
+        Compiles the function.
+
+        :return: the compiled bytecode
+        """
+        for param in self.func.params:
+            if param.preset is itr.UNPACK_ARGUMENT or param.preset is itr.KW_UNPACK_ARGUMENT:
+                self.code.variadic = True
+            self.declare(param.name, False)
+
+        self.compile_node(self.func.body, True)
+        self.code.emit(RETURN)
+        return self.code
+
+    # Scopes
+
+    def resolve(self, name: str):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def declare(self, name: str, const: bool) -> int:
+        if self.resolve(name) is not None or name in self.heap:
+            raise UnsupportedSyntax()  # re-declaration, leaves the error to the tree-walker
+        slot = self.new_slot(name)
+        self.scopes[-1][name] = slot, const
+        return slot
+
+    def new_slot(self, name: str) -> int:
+        slot = self.code.n_slots
+        self.code.n_slots += 1
+        self.code.slot_names.append(name)
+        return slot
+
+    def visible(self) -> tuple:
+        lst = []
+        for scope in self.scopes:
+            for name in scope:
+                slot, const = scope[name]
+                lst.append((name, slot, const))
+        return tuple(lst)
+
+    # Nodes
+
+    def compile_node(self, node, want: bool):
+        """
+        Compiles a node.
+
+        :param node: the node, or a raw value
+        :param want: whether the value of the node should be left on the stack
+        :return: None
+        """
+        if isinstance(node, ast.Node):
+            method = COMPILE_TABLE.get(node.node_type)
+            if method is None:
+                raise UnsupportedSyntax()
+            method(self, node, want)
+        elif want:
+            self.code.emit(LOAD_CONST, node)
+
+    def compile_fallback(self, node, want: bool):
+        if not is_isolated(node):
+            raise UnsupportedSyntax()
+        self.code.emit(EVAL, (node, self.visible()))
+        if not want:
+            self.code.emit(POP)
+
+    def compile_literal(self, node: ast.LiteralNode, want: bool):
+        if want:
+            self.code.emit(LOAD_STRING, node.literal)
+
+    def compile_undefined(self, node: ast.UndefinedNode, want: bool):
+        if want:
+            self.code.emit(LOAD_CONST, UNDEFINED)
+
+    def compile_name(self, node: ast.NameNode, want: bool):
+        local = self.resolve(node.name)
+        if local is None and node.depth == ast.HEAP_NAME:
+            self.code.emit(LOAD_CONST, self.heap[node.name])
+        elif local is None:
+            self.code.emit(LOAD_OUTER, (node.name, (node.line_num, node.file)))
+        else:
+            self.code.emit(LOAD_FAST, local[0])
+        if not want:
+            self.code.emit(POP)
+
+    def compile_store(self, key: ast.Node, want: bool):
+        """
+        Stores the value on top of the stack to an assignable node, with level 'ASSIGN'.
+
+        Like the tree-walker, an index assignment results in the returning value of '__setitem__' rather than the
+        assigned value.
+
+        :param key: the node to be assigned
+        :param want: whether the value should be kept on the stack
+        :return: None
+        """
+        code = self.code
+        if isinstance(key, ast.NameNode):
+            local = self.resolve(key.name)
+            if want:
+                code.emit(DUP)
+            if local is None:
+                code.emit(STORE_OUTER, (key.name, (key.line_num, key.file)))
+            elif local[1]:
+                raise UnsupportedSyntax()  # assignment to constant, leaves the error to the tree-walker
+            else:
+                code.emit(STORE_FAST, local[0])
+        elif isinstance(key, ast.Dot) and isinstance(key.right, ast.NameNode):
+            if want:
+                code.emit(DUP)
+            self.compile_node(key.left, True)
+            code.emit(STORE_ATTR, (key.right.name, (key.line_num, key.file), key))
+        elif isinstance(key, ast.IndexingNode) and key.arg is not None:
+            self.compile_node(key.call_obj, True)
+            for arg in key.arg.lines:
+                self.compile_node(arg, True)
+            code.emit(STORE_INDEX, (len(key.arg.lines), key))  # leaves the result of '__setitem__'
+            if not want:
+                code.emit(POP)
+        else:
+            raise UnsupportedSyntax()
+
+    def compile_assignment(self, node: ast.AssignmentNode, want: bool):
+        key = node.left
+        level = node.level
+        if level == ast.ASSIGN:
+            self.compile_node(node.right, True)
+            self.compile_store(key, want)
+        elif (level == ast.VAR or level == ast.CONST) and isinstance(key, ast.NameNode):
+            if level == ast.CONST and isinstance(node.right, ast.UndefinedNode):
+                raise UnsupportedSyntax()
+            self.compile_node(node.right, True)
+            slot = self.declare(key.name, level == ast.CONST)
+            if want:
+                self.code.emit(DUP)
+            self.code.emit(STORE_FAST, slot)
+        else:
+            raise UnsupportedSyntax()
+
+    def compile_operator(self, node: ast.BinaryOperator, want: bool):
+        code = self.code
+        if node.assignment:
+            symbol = node.operation[:-1]
+            self.compile_node(node.left, True)
+            self.compile_node(node.right, True)
+            code.emit(BINARY, (symbol, itr.NUMBER_ARITHMETIC_TABLE.get(symbol), None))
+            self.compile_store(node.left, want)
+            return
+
+        symbol = node.operation
+        if symbol == "&&" or symbol == "and" or symbol == "||" or symbol == "or":
+            self.compile_node(node.left, True)
+            jump = code.emit(AND_JUMP if symbol == "&&" or symbol == "and" else OR_JUMP)
+            self.compile_node(node.right, True)
+            code.patch(jump, len(code))
+        elif symbol == ":":
+            raise UnsupportedSyntax()
+        else:
+            self.compile_node(node.left, True)
+            self.compile_node(node.right, True)
+            code.emit(BINARY, (symbol, itr.NUMBER_ARITHMETIC_TABLE.get(symbol), node.right))
+        if not want:
+            code.emit(POP)
+
+    def compile_unary(self, node: ast.UnaryOperator, want: bool):
+        operation = node.operation
+        if operation == "return":
+            self.compile_node(node.value, True)
+            self.code.emit(RETURN)
+        elif operation == "neg" or operation == "!":
+            self.compile_node(node.value, True)
+            self.code.emit(NEG if operation == "neg" else NOT)
+            if not want:
+                self.code.emit(POP)
+        elif operation == "new" or operation == "throw" or operation == "assert":
+            self.compile_fallback(node, want)
+        else:
+            raise UnsupportedSyntax()
+
+    def compile_ternary(self, node: ast.TernaryOperator, want: bool):
+        if (node.first_op, node.second_op) != ("?", ":"):
+            raise UnsupportedSyntax()
+        code = self.code
+        self.compile_node(node.left, True)
+        jump_else = code.emit(JUMP_IF_FALSE)
+        self.compile_node(node.mid, want)
+        jump_end = code.emit(JUMP)
+        code.patch(jump_else, len(code))
+        self.compile_node(node.right, want)
+        code.patch(jump_end, len(code))
+
+    def compile_in_decrement(self, node: ast.InDecrementOperator, want: bool):
+        key = node.value
+        if not isinstance(key, ast.NameNode):
+            self.compile_fallback(node, want)
+            return
+        if node.operation == "++":
+            op = INCREMENT
+        elif node.operation == "--":
+            op = DECREMENT
+        else:
+            raise UnsupportedSyntax()
+
+        code = self.code
+        self.compile_node(key, True)
+        if want and node.is_post:
+            code.emit(DUP)
+        code.emit(op)
+        self.compile_store(key, want and not node.is_post)
+
+    def compile_block(self, node: ast.BlockStmt, want: bool):
+        code = self.code
+        if node.standalone:  # pair or set literal
+            lines = node.lines
+            if len(lines) == 0 or isinstance(lines[0], ast.AssignmentNode):
+                for line in lines:
+                    if not isinstance(line, ast.AssignmentNode):
+                        raise UnsupportedSyntax()
+                    self.compile_node(line.left, True)
+                    self.compile_node(line.right, True)
+                code.emit(BUILD_PAIR, len(lines))
+            else:
+                for line in lines:
+                    self.compile_node(line, True)
+                code.emit(BUILD_SET, len(lines))
+            if not want:
+                code.emit(POP)
+        elif len(node.lines) == 0:
+            if want:
+                code.emit(LOAD_CONST, None)
+        else:
+            last = len(node.lines) - 1
+            for i in range(last):
+                self.compile_node(node.lines[i], False)
+            self.compile_node(node.lines[last], want)
+
+    def compile_scoped(self, node, want: bool):
+        """
+        Compiles a node in a new lexical scope, which corresponds to a sub environment of the tree-walker.
+
+        :param node: the node
+        :param want: whether the value of the node should be left on the stack
+        :return: None
+        """
+        self.scopes.append({})
+        self.compile_node(node, want)
+        self.scopes.pop()
+
+    def compile_if(self, node: ast.IfStmt, want: bool):
+        code = self.code
+        self.compile_node(node.condition, True)
+        jump_else = code.emit(JUMP_IF_FALSE)
+        self.compile_scoped(node.then_block, want)
+        if node.else_block is None and not want:
+            code.patch(jump_else, len(code))
+        else:
+            jump_end = code.emit(JUMP)
+            code.patch(jump_else, len(code))
+            self.compile_scoped(node.else_block, want)
+            code.patch(jump_end, len(code))
+
+    def compile_while(self, node: ast.WhileStmt, want: bool):
+        code = self.code
+        self.scopes.append({})  # the title scope
+
+        result = None
+        if want:
+            result = self.new_slot("<result>")
+            code.emit(LOAD_CONST, 0)
+            code.emit(STORE_FAST, result)
+
+        start = len(code)
+        self.compile_node(node.condition, True)
+        exit_jump = code.emit(JUMP_IF_FALSE)
+
+        loop = result, [], []
+        self.loops.append(loop)
+        self.compile_scoped(node.body, want)
+        self.loops.pop()
+        if want:
+            code.emit(STORE_FAST, result)
+        code.emit(JUMP, start)
+
+        code.patch(exit_jump, len(code))
+        self.patch_loop(loop, len(code), start)
+        if want:
+            code.emit(LOAD_FAST, result)
+        self.scopes.pop()
+
+    def compile_for_loop(self, node: ast.ForLoopStmt, want: bool):
+        lines = node.condition.lines
+        if len(lines) == 3:
+            self.compile_for_range(node, lines, want)
+        elif len(lines) == 2:
+            self.compile_for_each(node, lines, want)
+        else:
+            raise UnsupportedSyntax()
+
+    def compile_for_range(self, node: ast.ForLoopStmt, lines: list, want: bool):
+        start, end, step = lines
+        if not isinstance(step, ast.Node):
+            raise UnsupportedSyntax()
+        pre_step = step.node_type == ast.IN_DECREMENT_OPERATOR and not step.is_post
+
+        code = self.code
+        self.scopes.append({})  # the title scope
+        self.compile_node(start, want)
+        result = None
+        if want:
+            result = self.new_slot("<result>")
+            code.emit(STORE_FAST, result)
+
+        begin = len(code)
+        self.compile_node(end, True)
+        exit_jump = code.emit(JUMP_IF_FALSE)
+        if pre_step:
+            self.compile_node(step, False)
+
+        loop = result, [], []
+        self.loops.append(loop)
+        self.compile_scoped(node.body, want)
+        self.loops.pop()
+        if want:
+            code.emit(STORE_FAST, result)
+
+        next_iteration = len(code)
+        if not pre_step:
+            self.compile_node(step, False)
+        code.emit(JUMP, begin)
+        code.patch(exit_jump, len(code))
+        self.patch_loop(loop, len(code), next_iteration)
+        if want:
+            code.emit(LOAD_FAST, result)
+        self.scopes.pop()
+
+    def compile_for_each(self, node: ast.ForLoopStmt, lines: list, want: bool):
+        inv, target = lines
+        code = self.code
+        self.scopes.append({})  # the title scope
+        if isinstance(inv, ast.AssignmentNode) and isinstance(inv.left, ast.NameNode):
+            self.compile_node(inv, False)
+            invariant = inv.left
+        elif isinstance(inv, ast.NameNode):
+            invariant = inv
+        else:
+            raise UnsupportedSyntax()
+
+        result = None
+        if want:
+            result = self.new_slot("<result>")
+            code.emit(LOAD_CONST, None)
+            code.emit(STORE_FAST, result)
+
+        self.compile_node(target, True)
+        code.emit(GET_ITER, ((node.line_num, node.file), node))
+        begin = code.emit(FOR_ITER)
+        self.compile_store(invariant, False)
+
+        loop = result, [], []
+        self.loops.append(loop)
+        self.compile_scoped(node.body, want)
+        self.loops.pop()
+        if want:
+            code.emit(STORE_FAST, result)
+        code.emit(JUMP, begin)
+        self.patch_loop(loop, len(code), begin)
+        if loop[1]:
+            code.emit(POP)  # the iterator, which a 'break' leaves on the stack
+        code.patch(begin, len(code))
+        if want:
+            code.emit(LOAD_FAST, result)
+        self.scopes.pop()
+
+    def patch_loop(self, loop: tuple, break_target: int, continue_target: int):
+        """
+        Sets the targets of the 'break' and 'continue' jumps of a compiled loop.
+
+        :param loop: the loop, as pushed to 'self.loops'
+        :param break_target: the index after the loop
+        :param continue_target: the index where the next iteration starts
+        :return: None
+        """
+        for index in loop[1]:
+            self.code.patch(index, break_target)
+        for index in loop[2]:
+            self.code.patch(index, continue_target)
+
+    def compile_break(self, node: ast.BreakStmt, want: bool):
+        self.compile_loop_jump(1, want)
+
+    def compile_continue(self, node: ast.ContinueStmt, want: bool):
+        self.compile_loop_jump(2, want)
+
+    def compile_loop_jump(self, kind: int, want: bool):
+        if len(self.loops) == 0:
+            raise UnsupportedSyntax()
+        loop = self.loops[-1]
+        result = loop[0]
+        if result is not None:
+            self.code.emit(LOAD_CONST, None)
+            self.code.emit(STORE_FAST, result)
+        loop[kind].append(self.code.emit(JUMP))
+        if want:
+            self.code.emit(LOAD_CONST, None)  # never reached, keeps the stack of the enclosing block balanced
+
+    def compile_func_call(self, node: ast.FuncCall, want: bool, op: int = CALL):
+        if node.args is None:
+            raise UnsupportedSyntax()
+        call_obj = node.call_obj
+        if isinstance(call_obj, ast.NameNode) and call_obj.name in REFLECTIVE_NAMES:
+            raise UnsupportedSyntax()
+        args = node.args.lines
+        if not all(is_plain_arg(arg) for arg in args):
+            self.compile_fallback(node, want)
+            return
+
+        self.compile_node(call_obj, True)
+        for arg in args:
+            self.compile_node(arg, True)
+        self.code.emit(op, (len(args), (node.line_num, node.file), node))
+        if not want:
+            self.code.emit(POP)
+
+    def compile_jump(self, node: ast.JumpNode, want: bool):
+        self.compile_func_call(node.call, want, TAIL_CALL)
+
+    def compile_dot(self, node: ast.Dot, want: bool):
+        obj = node.right
+        lf = node.line_num, node.file
+        if isinstance(obj, ast.NameNode):
+            self.compile_node(node.left, True)
+            self.code.emit(LOAD_ATTR, (obj, lf, node))
+        elif isinstance(obj, ast.FuncCall) and obj.args is not None and isinstance(obj.call_obj, ast.NameNode):
+            if obj.call_obj.name in REFLECTIVE_NAMES:
+                raise UnsupportedSyntax()
+            args = obj.args.lines
+            if not all(is_plain_arg(arg) for arg in args):
+                self.compile_fallback(node, want)
+                return
+            self.compile_node(node.left, True)
+            for arg in args:
+                self.compile_node(arg, True)
+            self.code.emit(CALL_METHOD, (len(args), lf, node, obj.call_obj))
+        else:
+            raise UnsupportedSyntax()
+        if not want:
+            self.code.emit(POP)
+
+    def compile_indexing(self, node: ast.IndexingNode, want: bool):
+        if node.arg is None:
+            raise UnsupportedSyntax()
+        self.compile_node(node.call_obj, True)
+        for arg in node.arg.lines:
+            self.compile_node(arg, True)
+        self.code.emit(LOAD_INDEX, (len(node.arg.lines), node))
+        if not want:
+            self.code.emit(POP)
+
+    def compile_try(self, node: ast.TryStmt, want: bool):
+        self.compile_fallback(node, want)
+
+
+# Compile methods of node types, node types not listed here make the function not compiled
+COMPILE_TABLE = {
+    ast.LITERAL_NODE: Compiler.compile_literal,
+    ast.NAME_NODE: Compiler.compile_name,
+    ast.BREAK_STMT: Compiler.compile_break,
+    ast.CONTINUE_STMT: Compiler.compile_continue,
+    ast.ASSIGNMENT_NODE: Compiler.compile_assignment,
+    ast.DOT: Compiler.compile_dot,
+    ast.BINARY_OPERATOR: Compiler.compile_operator,
+    ast.UNARY_OPERATOR: Compiler.compile_unary,
+    ast.TERNARY_OPERATOR: Compiler.compile_ternary,
+    ast.BLOCK_STMT: Compiler.compile_block,
+    ast.IF_STMT: Compiler.compile_if,
+    ast.WHILE_STMT: Compiler.compile_while,
+    ast.FOR_LOOP_STMT: Compiler.compile_for_loop,
+    ast.FUNCTION_CALL: Compiler.compile_func_call,
+    ast.JUMP_NODE: Compiler.compile_jump,
+    ast.TRY_STMT: Compiler.compile_try,
+    ast.UNDEFINED_NODE: Compiler.compile_undefined,
+    ast.IN_DECREMENT_OPERATOR: Compiler.compile_in_decrement,
+    ast.INDEXING_NODE: Compiler.compile_indexing,
+}
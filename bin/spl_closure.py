@@ -0,0 +1,402 @@
+""" The closure compiler, an alternative execution engine of the spl interpreter.
+
+Every node of the abstract syntax tree is compiled once into a python closure, which has the handler of that
+node type and the closures of its children already bound. Running a compiled node is then a plain python call,
+without the per-node dispatch of 'spl_interpreter.evaluate'.
+
+The tree-walking interpreter stays the reference: nodes that have no specialized closure are compiled into a
+call to their 'NODE_TABLE' handler, and all helpers of the interpreter evaluate their sub-nodes through the
+installed evaluator, so they run compiled closures as well.
+"""
+
+from bin import spl_ast as ast, spl_interpreter as itr
+import bin.spl_lib as lib
+from bin.environment import Environment, LoopEnvironment, SubEnvironment, UNDEFINED
+
+
+def install():
+    """
+    Makes the interpreter execute every node through its compiled closure.
+
+    :return: None
+    """
+    itr.set_evaluator(evaluate)
+
+
+def evaluate(node, env: Environment):
+    """
+    Evaluates a node by its compiled closure, compiling the node at the first evaluation.
+
+    This function is the entry used by the helpers of the interpreter. Compiled closures call each other directly.
+
+    :param node: the node in abstract syntax tree to be evaluated
+    :param env: the working environment
+    :return: the evaluation result
+    """
+    if isinstance(node, ast.Node):
+        closure = node.compiled
+        if closure is None:
+            closure = compile_node(node)
+        return closure(env)
+    else:
+        return node
+
+
+def compile_node(node: ast.Node):
+    """
+    Compiles a node into a closure that takes the working environment, and caches the closure in the node.
+
+    :param node: the node to be compiled
+    :return: the compiled closure
+    """
+    closure = node.compiled
+    if closure is None:
+        compiler = COMPILE_TABLE.get(node.node_type, compile_generic)
+        closure = compiler(node)
+        node.compiled = closure
+    return closure
+
+
+def compile_child(child):
+    """
+    Compiles a child of a node, which may also be a raw value such as a number, a boolean or None.
+
+    :param child: the child
+    :return: the compiled closure
+    """
+    if isinstance(child, ast.Node):
+        return compile_node(child)
+    else:
+        return lambda env: child
+
+
+def compile_generic(node: ast.Node):
+    handler = itr.NODE_TABLE[node.node_type]
+    return lambda env: handler(node, env)
+
+
+def compile_literal(node: ast.LiteralNode):
+    literal = node.literal
+    return lambda env: lib.String(literal)
+
+
+def compile_name(node: ast.NameNode):
+    name = node.name
+    lf = node.line_num, node.file
+    depth = node.depth
+    if depth is None:
+        return lambda env: env.get(name, lf)
+    elif depth == ast.HEAP_NAME:
+        return lambda env: env.heap[name]
+    else:
+        return lambda env: env.get_at(name, depth, lf)
+
+
+def compile_block(node: ast.BlockStmt):
+    if node.standalone:
+        return compile_generic(node)
+
+    lines = [compile_child(line) for line in node.lines]
+    if len(lines) == 1:
+        return lines[0]
+
+    def block(env):
+        result = None
+        for line in lines:
+            result = line(env)
+        return result
+
+    return block
+
+
+def compile_assignment(node: ast.AssignmentNode):
+    key = node.left
+    right = compile_child(node.right)
+    level = node.level
+
+    if isinstance(key, ast.NameNode) and level == ast.ASSIGN:
+        name = key.name
+        lf = key.line_num, key.file
+
+        def assign(env):
+            value = right(env)
+            env.assign(name, value, lf)
+            return value
+
+        return assign
+    else:
+        return lambda env: itr.assignment(key, right(env), env, level)
+
+
+def compile_operator(node: ast.BinaryOperator):
+    left = compile_child(node.left)
+    right = compile_child(node.right)
+
+    if node.assignment:
+        symbol = node.operation[:-1]
+        target = node.left
+
+        def operator_assign(env):
+            res = itr.specialized_arithmetic(node, left(env), right(env), symbol, env)
+            return itr.assignment(target, res, env, ast.ASSIGN)
+
+        return operator_assign
+
+    symbol = node.operation
+    if symbol == "&&" or symbol == "and":
+        def and_(env):
+            value = left(env)
+            if value is None or isinstance(value, bool) or isinstance(value, int) or isinstance(value, float):
+                return right(env) if value else False
+            raise lib.InterpretException("Operator '||' '&&' do not support type.")
+
+        return and_
+    elif symbol == "||" or symbol == "or":
+        def or_(env):
+            value = left(env)
+            if value is None or isinstance(value, bool) or isinstance(value, int) or isinstance(value, float):
+                return True if value else right(env)
+            raise lib.InterpretException("Operator '||' '&&' do not support type.")
+
+        return or_
+    else:
+        return lambda env: itr.specialized_arithmetic(node, left(env), right(env), symbol, env)
+
+
+def compile_unary(node: ast.UnaryOperator):
+    operation = node.operation
+    value = compile_child(node.value)
+
+    if operation == "return":
+        def return_(env):
+            raise lib.FunctionReturn(value(env))
+
+        return return_
+    elif operation == "neg":
+        return lambda env: -value(env)
+    elif operation == "!":
+        return lambda env: not bool(value(env))
+    else:
+        handler = itr.UNARY_TABLE[operation]
+        value_node = node.value
+        return lambda env: handler(value_node, env)
+
+
+def compile_ternary(node: ast.TernaryOperator):
+    if (node.first_op, node.second_op) != ("?", ":"):
+        return compile_generic(node)
+
+    cond = compile_child(node.left)
+    mid = compile_child(node.mid)
+    right = compile_child(node.right)
+    return lambda env: mid(env) if cond(env) else right(env)
+
+
+def compile_if(node: ast.IfStmt):
+    cond = compile_child(node.condition)
+    then_block = compile_child(node.then_block)
+    else_block = compile_child(node.else_block)
+
+    then_scoped = node.then_scoped
+    else_scoped = node.else_scoped
+
+    def if_stmt(env):
+        if cond(env):
+            return then_block(SubEnvironment(env) if then_scoped else env)
+        else:
+            return else_block(SubEnvironment(env) if else_scoped else env)
+
+    return if_stmt
+
+
+def compile_while(node: ast.WhileStmt):
+    cond = compile_child(node.condition)
+    body = compile_child(node.body)
+    declares = node.body_declares
+
+    def while_stmt(env):
+        title_scope = LoopEnvironment(env)
+        block_scope = SubEnvironment(title_scope)
+
+        result = 0
+        while cond(title_scope):
+            if declares:
+                block_scope.invalidate()
+            try:
+                result = body(block_scope)
+            except lib.LoopBreak:
+                result = None
+                break
+            except lib.LoopContinue:
+                result = None
+        return result
+
+    return while_stmt
+
+
+def compile_for_loop(node: ast.ForLoopStmt):
+    lines = node.condition.lines
+    if len(lines) != 3 or node.counter is not None:  # counted loops are run by the interpreter
+        return compile_generic(node)
+
+    start = compile_child(lines[0])
+    end = compile_child(lines[1])
+    step = compile_child(lines[2])
+    body = compile_child(node.body)
+    step_node = lines[2]
+    pre_step = isinstance(step_node, ast.Node) and step_node.node_type == ast.IN_DECREMENT_OPERATOR and \
+        not step_node.is_post
+    declares = node.body_declares
+
+    def for_loop(env):
+        title_scope = LoopEnvironment(env)
+        block_scope = LoopEnvironment(title_scope)
+
+        result = start(title_scope)
+        if pre_step:
+            while end(title_scope):
+                if declares:
+                    block_scope.invalidate()
+                step(title_scope)
+                try:
+                    result = body(block_scope)
+                except lib.LoopBreak:
+                    result = None
+                    break
+                except lib.LoopContinue:
+                    result = None
+        else:
+            while end(title_scope):
+                if declares:
+                    block_scope.invalidate()
+                try:
+                    result = body(block_scope)
+                except lib.LoopBreak:
+                    result = None
+                    break
+                except lib.LoopContinue:
+                    result = None
+                step(title_scope)
+        return result
+
+    return for_loop
+
+
+def compile_func_call(node: ast.FuncCall):
+    if node.args is None:
+        return compile_generic(node)
+
+    call_obj = compile_child(node.call_obj)
+    arg_list = node.args.lines
+    lf = node.line_num, node.file
+
+    def func_call(env):
+        func = call_obj(env)
+        if isinstance(func, itr.Function):
+            return itr.call_function(arg_list, lf, func, env)
+        else:
+            return itr.call_evaluated(node, func, env)
+
+    return func_call
+
+
+def compile_dot(node: ast.Dot):
+    left = compile_child(node.left)
+    obj = node.right
+    lf = node.line_num, node.file
+
+    if isinstance(obj, ast.NameNode):
+        name = obj.name
+
+        def get_attr(env):
+            instance = left(env)
+            if isinstance(instance, lib.NativeType):
+                return itr.native_types_attr_invoke(instance, obj)
+            elif isinstance(instance, itr.ClassInstance) or isinstance(instance, itr.Module):
+                return itr.get_attribute(instance, name, lf)
+            else:
+                raise lib.TypeException("Type '{}' does not have attribute '{}', in '{}', at line {}"
+                                        .format(itr.typeof(instance), name, node.file, node.line_num))
+
+        return get_attr
+    elif isinstance(obj, ast.FuncCall) and obj.args is not None and isinstance(obj.call_obj, ast.NameNode):
+        call_obj = obj.call_obj
+        method_name = call_obj.name
+        method_lf = call_obj.line_num, call_obj.file
+        args = obj.args.lines
+
+        def call_method(env):
+            instance = left(env)
+            if isinstance(instance, lib.NativeType):
+                try:
+                    return itr.native_types_call(instance, call_obj, args, env)
+                except IndexError as ie:
+                    raise lib.IndexOutOfRangeException(str(ie) + " in file: '{}', at line {}"
+                                                       .format(node.file, node.line_num))
+            elif isinstance(instance, itr.ClassInstance) or isinstance(instance, itr.Module):
+                func = itr.get_attribute(instance, method_name, method_lf)
+                return itr.call_function(args, lf, func, env)
+            else:
+                raise lib.TypeException("Not a class instance; {} instead, in file '{}', at line {}"
+                                        .format(itr.typeof(instance), node.file, node.line_num))
+
+        return call_method
+    else:
+        return compile_generic(node)
+
+
+def compile_in_decrement(node: ast.InDecrementOperator):
+    key = node.value
+    if not isinstance(key, ast.NameNode):
+        return compile_generic(node)
+
+    name = key.name
+    lf = key.line_num, key.file
+    is_post = node.is_post
+    if node.operation == "++":
+        table = itr.INCREMENT_TABLE
+    elif node.operation == "--":
+        table = itr.DECREMENT_TABLE
+    else:
+        return compile_generic(node)
+
+    def in_decrement(env):
+        current = env.get(name, lf)
+        post_val = table[type(current)](current)
+        env.assign(name, post_val, lf)
+        return current if is_post else post_val
+
+    return in_decrement
+
+
+def compile_undefined(node: ast.UndefinedNode):
+    return lambda env: UNDEFINED
+
+
+def compile_break(node: ast.BreakStmt):
+    return lambda env: env.break_loop()
+
+
+def compile_continue(node: ast.ContinueStmt):
+    return lambda env: env.pause_loop()
+
+
+# Compilers of node types that have specialized closures, others use 'compile_generic'
+COMPILE_TABLE = {
+    ast.LITERAL_NODE: compile_literal,
+    ast.NAME_NODE: compile_name,
+    ast.BREAK_STMT: compile_break,
+    ast.CONTINUE_STMT: compile_continue,
+    ast.ASSIGNMENT_NODE: compile_assignment,
+    ast.DOT: compile_dot,
+    ast.BINARY_OPERATOR: compile_operator,
+    ast.UNARY_OPERATOR: compile_unary,
+    ast.TERNARY_OPERATOR: compile_ternary,
+    ast.BLOCK_STMT: compile_block,
+    ast.IF_STMT: compile_if,
+    ast.WHILE_STMT: compile_while,
+    ast.FOR_LOOP_STMT: compile_for_loop,
+    ast.FUNCTION_CALL: compile_func_call,
+    ast.UNDEFINED_NODE: compile_undefined,
+    ast.IN_DECREMENT_OPERATOR: compile_in_decrement,
+}
@@ -5,6 +5,7 @@ import script
 import multiprocessing
 import math
 import inspect
+import operator
 import os
 import subprocess
 import traceback
@@ -87,7 +88,7 @@ class Interpreter:
         :return: the exit value
         """
         try:
-            return evaluate(self.ast, self.env)
+            return eval_outside_function(self.ast, self.env)
         except Exception as e:
             return self.handler(e)
 
@@ -184,6 +185,8 @@ class NativeFunction:
 
 
 class ParameterPair:
+    __slots__ = ("name", "preset")
+
     def __init__(self, name: str, preset):
         self.name: str = name
         self.preset = preset
@@ -199,11 +202,15 @@ class Function(lib.NativeType):
     """
     :type body: BlockStmt
     :type outer_scope: Environment
+    :param plan: the binding plan of the parameters, see 'binding_plan'
     """
+    __slots__ = ("params", "plan", "annotations", "body", "outer_scope", "abstract", "doc", "file", "line_num",
+                 "clazz")
 
     def __init__(self, params, body, outer, abstract: bool, annotations: lib.Set, doc):
         lib.NativeType.__init__(self)
         self.params: [ParameterPair] = params
+        self.plan = binding_plan(params, outer)
         self.annotations = annotations
         self.body = body
         self.outer_scope = outer
@@ -217,6 +224,28 @@ class Function(lib.NativeType):
     def type_name__(cls) -> str:
         return "Function"
 
+    def bind(self, outer, clazz):
+        """
+        Returns a copy of this function that shares its parameters, body and annotations, but runs in another scope.
+
+        :param outer: the environment where the copy runs
+        :param clazz: the class that owns the copy
+        :return: the copy
+        """
+        f = Function.__new__(Function)
+        lib.NativeType.__init__(f)
+        f.params = self.params
+        f.plan = self.plan
+        f.annotations = self.annotations
+        f.body = self.body
+        f.outer_scope = outer
+        f.abstract = self.abstract
+        f.doc = self.doc
+        f.file = self.file
+        f.line_num = self.line_num
+        f.clazz = clazz
+        return f
+
     def __str__(self):
         return "Function<{}>".format(id(self))
 
@@ -224,6 +253,46 @@ class Function(lib.NativeType):
         return self.__str__()
 
 
+def binding_plan(params: list, outer) -> tuple:
+    """
+    Returns the binding plan of the parameters of a function.
+
+    The plan is the tuple of parameter names if a call with exactly that many positional arguments can write them
+    straight into the new frame. This is the case if no parameter has a preset or unpacks, and no name repeats or
+    names a heap variable, whose definitions 'define_var' would reject.
+
+    :param params: the parameters
+    :param outer: the environment where the function is defined
+    :return: the tuple of parameter names, or None if the arguments must be bound one by one
+    """
+    names = tuple(param.name for param in params)
+    for param in params:
+        if param.preset is not INVALID or outer.heap is None or param.name in outer.heap:
+            return None
+    if len(set(names)) != len(names):
+        return None
+    return names
+
+
+class TailCall:
+    """
+    A call in tail position, returned by the calling function and then made by 'call_function'.
+
+    ===== Attributes =====
+    :param func: the called function
+    :param pos_args: the evaluated positional arguments
+    :param kwargs: the evaluated keyword arguments
+    :param lf: line and file of the call
+    """
+    __slots__ = ("func", "pos_args", "kwargs", "lf")
+
+    def __init__(self, func: Function, pos_args: list, kwargs: dict, lf: tuple):
+        self.func = func
+        self.pos_args = pos_args
+        self.kwargs = kwargs
+        self.lf = lf
+
+
 class Class(lib.SplObject):
     def __init__(self, class_name: str, body: ast.BlockStmt, abstract: bool, superclasses: list,
                  outer_env: Environment, doc: str, line, file):
@@ -237,6 +306,9 @@ class Class(lib.SplObject):
         # self.persists = ClassEnvironment(outer_env)
         self.line_num = line
         self.file = file
+        self.template = None  # the template of the class body, built by 'class_template' at the first instantiation
+        self.specials = None  # names of the special methods of its instances, set by 'create_instance'
+        self.ancestors = frozenset([self]).union(*[sc.ancestors for sc in superclasses if isinstance(sc, Class)])
 
     @classmethod
     def type_name__(cls):
@@ -446,6 +518,8 @@ class NativeInvokes(lib.NativeType):
 
 
 class ClassInstance(lib.SplObject):
+    __slots__ = ("clazz", "class_name", "env")
+
     def __init__(self, env: Environment, class_name: str, clazz):
         """
         ===== Attributes =====
@@ -453,63 +527,65 @@ class ClassInstance(lib.SplObject):
         :param clazz: the type of it
         :param env: instance attributes
         """
-        lib.SplObject.__init__(self)
         self.clazz: Class = clazz
         self.class_name = class_name
         self.env = env
+        lib.SplObject.__init__(self)
         self.env.constants["this"] = self
 
+    def special(self, name: str):
+        """
+        Returns the special method of this instance, None if its class does not declare it or it does not hold a
+        function, as a field declared in the class may only be assigned a function by the constructor.
+
+        :param name: the name of the special method, such as '__hash__'
+        :return: the special method, or None
+        """
+        if name in self.clazz.specials:
+            func = self.env.variables.get(name)
+            if isinstance(func, Function):
+                return func
+        return None
+
     def __getitem__(self, item):
-        if self.env.contains_key("__getitem__"):
-            call = ast.FuncCall(LINE_FILE, "__getitem__")
-            call.args = ast.BlockStmt(LINE_FILE)
-            call.args.add_line(item)
-            return evaluate(call, self.env)
-        else:
+        func = self.special("__getitem__")
+        if func is None:
             raise lib.SplException("{} object does not support indexing".format(self.class_name))
+        return call_function([item], LINE_FILE, func, self.env)
 
     def __hash__(self):
-        if self.env.contains_key("__hash__"):
-            call = ast.FuncCall(LINE_FILE, "__hash__")
-            call.args = ast.BlockStmt(LINE_FILE)
-            return evaluate(call, self.env)
-        else:
+        func = self.special("__hash__")
+        if func is None:
             raise lib.SplException("{} object is not hashable".format(self.class_name))
+        return call_function([], LINE_FILE, func, self.env)
 
     def __neg__(self):
-        if self.env.contains_key("__neg__"):
-            call = ast.FuncCall(LINE_FILE, "__neg__")
-            call.args = ast.BlockStmt(LINE_FILE)
-            return evaluate(call, self.env)
-        else:
+        func = self.special("__neg__")
+        if func is None:
             raise lib.SplException("{} object has no neg attribute".format(self.class_name))
+        return call_function([], LINE_FILE, func, self.env)
 
     def __repr__(self):
-        if self.env.contains_key("__repr__"):
-            func: Function = self.env.get("__repr__", LINE_FILE)
-            result = call_function([], LINE_FILE, func, None)
-            return result.literal
-        else:
+        func = self.special("__repr__")
+        if func is None:
             return "<{} at {}>".format(self.class_name, self.id)
+        result = call_function([], LINE_FILE, func, None)
+        return result.literal
 
     def __setitem__(self, item):
-        if self.env.contains_key("__setitem__"):
-            call = ast.FuncCall(LINE_FILE, "__setitem__")
-            call.args = ast.BlockStmt(LINE_FILE)
-            call.args.add_line(item)
-            return evaluate(call, self.env)
-        else:
+        func = self.special("__setitem__")
+        if func is None:
             raise lib.SplException("{} object does not support indexing".format(self.class_name))
+        return call_function([item], LINE_FILE, func, self.env)
 
     def __str__(self):
-        if self.env.contains_key("__str__"):
-            func: Function = self.env.get("__str__", LINE_FILE)
-            result = call_function([], LINE_FILE, func, None)
-            return result.literal
-        else:
+        func = self.special("__str__")
+        if func is None:
             attr = self.env.attributes()
             attr.pop("this")
             return "<{} at {}>: {}".format(self.class_name, self.id, lib.make_pair(attr))
+        result = call_function([], LINE_FILE, func, None)
+        return result.literal
 
 
 class Module(lib.SplObject):
@@ -849,28 +925,46 @@ def _exec_line(line: str, path: str):
 
 
 def eval_for_loop(node: ast.ForLoopStmt, env: Environment):
-    con: ast.BlockStmt = node.condition
-    start = con.lines[0]
-    end = con.lines[1]
-    step = con.lines[2]
+    if node.counter is not None:
+        return eval_counted_loop(node, env)
 
     title_scope = LoopEnvironment(env)
     block_scope = LoopEnvironment(title_scope)
 
-    result = evaluate(start, title_scope)
+    result = evaluate(node.condition.lines[0], title_scope)
+    return run_for_loop(node, title_scope, block_scope, result)
 
+
+def run_for_loop(node: ast.ForLoopStmt, title_scope: LoopEnvironment, block_scope: LoopEnvironment, result):
+    con: ast.BlockStmt = node.condition
+    end = con.lines[1]
+    step = con.lines[2]
+
+    declares = node.body_declares
     step_type = step.node_type
     if step_type == ast.IN_DECREMENT_OPERATOR and not step.is_post:
-        while not title_scope.broken and evaluate(end, title_scope):
-            block_scope.invalidate()
+        while evaluate(end, title_scope):
+            if declares:
+                block_scope.invalidate()
             evaluate(step, title_scope)
-            result = evaluate(node.body, block_scope)
-            title_scope.resume_loop()
+            try:
+                result = evaluate(node.body, block_scope)
+            except lib.LoopBreak:
+                result = None
+                break
+            except lib.LoopContinue:
+                result = None
     else:
-        while not title_scope.broken and evaluate(end, title_scope):
-            block_scope.invalidate()
-            result = evaluate(node.body, block_scope)
-            title_scope.resume_loop()
+        while evaluate(end, title_scope):
+            if declares:
+                block_scope.invalidate()
+            try:
+                result = evaluate(node.body, block_scope)
+            except lib.LoopBreak:
+                result = None
+                break
+            except lib.LoopContinue:
+                result = None
             evaluate(step, title_scope)
 
     del title_scope
@@ -878,19 +972,100 @@ def eval_for_loop(node: ast.ForLoopStmt, env: Environment):
     return result
 
 
-def loop_spl_iterator(iterator: ClassInstance, invariant: str, body: ast.Node,
+# Offsets from the constant bound of a counted loop to the stop of its python range
+COUNTED_RANGE_OFFSETS = {"<": 0, "<=": 1, ">": 0, ">=": -1}
+
+
+def eval_counted_loop(node: ast.ForLoopStmt, env: Environment):
+    """
+    Evaluates a counted loop, 'for (var i = a; i < b; i++)' or the like, whose body does not write the counter.
+
+    The counter is kept as a python int, and only published to the title scope for the body to read, so that the
+    condition and the step are not evaluated as nodes. A constant bound is counted to by a python range.
+
+    :param node: the loop, marked as a counted loop by the optimizer
+    :param env: the working environment
+    :return: the value of the last iteration
+    """
+    start, end, step = node.condition.lines
+    name = node.counter
+    body = node.body
+    declares = node.body_declares
+
+    title_scope = LoopEnvironment(env)
+    block_scope = LoopEnvironment(title_scope)
+    variables = title_scope.variables
+
+    result = evaluate(start, title_scope)
+    i = variables[name]
+    if type(i) is not int:
+        return run_for_loop(node, title_scope, block_scope, result)
+
+    symbol = end.operation
+    bound = end.right
+    delta = 1 if step.operation == "++" else -1
+    if type(bound) is int:
+        counter = range(i, bound + COUNTED_RANGE_OFFSETS[symbol], delta)
+    else:
+        counter = count_to(i, bound, delta, end, title_scope)
+    for i in counter:
+        variables[name] = i
+        if declares:
+            block_scope.invalidate()
+        try:
+            result = evaluate(body, block_scope)
+        except lib.LoopBreak:
+            return None
+        except lib.LoopContinue:
+            result = None
+    return result
+
+
+def count_to(i: int, bound: ast.Node, delta: int, end: ast.BinaryOperator, env: Environment):
+    """
+    Yields the values of the counter of a counted loop whose bound is evaluated before every iteration.
+
+    :param i: the initial value of the counter
+    :param bound: the bound
+    :param delta: the step of the counter
+    :param end: the condition of the loop
+    :param env: the title scope of the loop
+    :return: the generator of the counter values
+    """
+    symbol = end.operation
+    compare = INT_OPERATION_TABLE[symbol]
+    while True:
+        b = evaluate(bound, env)
+        if type(b) is int:
+            if not compare(i, b):
+                return
+        elif not specialized_arithmetic(end, i, b, symbol, env):
+            return
+        yield i
+        i += delta
+
+
+def loop_spl_iterator(iterator: ClassInstance, invariant: str, node: ast.ForLoopStmt,
                       title_scope: LoopEnvironment, block_scope: LoopEnvironment, lf: tuple):
     next_func = iterator.env.get("__next__", lf)
     has_next_func = iterator.env.get("__more__", lf)
+    body = node.body
+    declares = node.body_declares
     result = None
-    while not title_scope.broken:
-        block_scope.invalidate()
+    while True:
+        if declares:
+            block_scope.invalidate()
         has_next = call_function([], lf, has_next_func, title_scope)
         if has_next:
             next_call_res = call_function([], lf, next_func, title_scope)
             block_scope.assign(invariant, next_call_res, lf)
-            result = evaluate(body, block_scope)
-            title_scope.resume_loop()
+            try:
+                result = evaluate(body, block_scope)
+            except lib.LoopBreak:
+                result = None
+                break
+            except lib.LoopContinue:
+                result = None
         else:
             break
     del title_scope
@@ -925,39 +1100,54 @@ def eval_for_each_loop(node: ast.ForLoopStmt, env: Environment):
 def iterate(iterable, invariant, node, title_scope, block_scope, env, lf):
     if isinstance(iterable, lib.Iterable):
         result = None
+        declares = node.body_declares
         for x in iterable:
-            block_scope.invalidate()
+            if declares:
+                block_scope.invalidate()
             block_scope.assign(invariant, x, lf)
-            result = evaluate(node.body, block_scope)
-            title_scope.resume_loop()
-            if title_scope.broken:
+            try:
+                result = evaluate(node.body, block_scope)
+            except lib.LoopBreak:
+                result = None
                 break
+            except lib.LoopContinue:
+                result = None
         del title_scope
         del block_scope
-        # env.broken = False
         return result
     elif isinstance(iterable, ClassInstance):
-        if is_subclass_of(iterable.clazz, env.get_class("Iterator")):
-            return loop_spl_iterator(iterable, invariant, node.body, title_scope, block_scope, lf)
-        elif is_subclass_of(iterable.clazz, env.get_class("Iterable")):
+        if is_subclass_of(iterable.clazz, lang_class("Iterator", env)):
+            return loop_spl_iterator(iterable, invariant, node, title_scope, block_scope, lf)
+        elif is_subclass_of(iterable.clazz, lang_class("Iterable", env)):
             iter_func = iterable.env.get("__iter__", lf)
             iterator: ClassInstance = call_function([], lf, iter_func, title_scope)
             return iterate(iterator, invariant, node, title_scope, block_scope, env, lf)
-            # return loop_spl_iterator(iterator, invariant, node.body, title_scope, block_scope, lf)
+            # return loop_spl_iterator(iterator, invariant, node, title_scope, block_scope, lf)
     raise lib.SplException(
         "For-each loop on non-iterable objects, in {}, at line {}".format(node.file, node.line_num))
 
 
 def eval_try_catch(node: ast.TryStmt, env: Environment):
+    if node.finally_block is None:
+        return eval_try_block(node, env)
     try:
-        block_scope = SubEnvironment(env)
-        result = evaluate(node.try_block, block_scope)
-        return result
+        eval_try_block(node, env)
+    except lib.ControlFlow:  # a 'return', 'break' or 'continue' still runs the finally block on its way out
+        evaluate(node.finally_block, SubEnvironment(env) if node.finally_scoped else env)
+        raise
+    except Exception:  # the value of the finally block replaces any error, as the result of the whole statement
+        pass
+    return evaluate(node.finally_block, SubEnvironment(env) if node.finally_scoped else env)
+
+
+def eval_try_block(node: ast.TryStmt, env: Environment):
+    try:
+        return evaluate(node.try_block, SubEnvironment(env) if node.try_scoped else env)
     except SPLBaseException as re:  # catches the exceptions thrown by SPL program
         block_scope = SubEnvironment(env)
         exception: ClassInstance = re.exception
         exception_class = exception.clazz
-        spl_base_exception: Class = env.get_class("Exception")
+        spl_base_exception: Class = lang_class("Exception", env)
         catches = node.catch_blocks
         for cat in catches:  # catch blocks
             block_scope.invalidate()
@@ -1002,10 +1192,6 @@ def eval_try_catch(node: ast.TryStmt, env: Environment):
                     raise lib.SplException("Unexpected content inside catch statement, in file '{}', at line {}"
                                            .format(line.file, line.operation))
         raise e
-    finally:
-        block_scope = SubEnvironment(env)
-        if node.finally_block is not None:
-            return evaluate(node.finally_block, block_scope)
 
 
 def is_subclass_of(child_class: Class, target_class: Class) -> bool:
@@ -1016,26 +1202,39 @@ def is_subclass_of(child_class: Class, target_class: Class) -> bool:
     :param target_class: the ancestor class
     :return: whether the child class is the ancestor class itself or inherited from that class
     """
-    if isinstance(child_class, Class):
-        if child_class is target_class:
-            return True
-        else:
-            return any([is_subclass_of(ccn, target_class) for ccn in child_class.superclasses])
-    else:
-        return False
+    return isinstance(child_class, Class) and target_class in child_class.ancestors
+
+
+def lang_class(name: str, env: Environment) -> Class:
+    """
+    Returns a class defined in spl 'lib/lang.sp', which is looked up only once per global environment.
+
+    :param name: the class name
+    :param env: the current working environment
+    :return: the class
+    """
+    classes = env.get_global().lang_classes
+    if name in classes:
+        return classes[name]
+    clazz = env.get_class(name)
+    classes[name] = clazz
+    return clazz
 
 
 def eval_operator(node: ast.BinaryOperator, env: Environment):
     left = evaluate(node.left, env)
     if node.assignment:
         right = evaluate(node.right, env)
-        symbol = node.operation[:-1]
-        res = arithmetic(left, right, symbol, env)
+        symbol = stl.ASSIGN_OPERATORS[node.operation]
+        res = specialized_arithmetic(node, left, right, symbol, env)
         return assignment(node.left, res, env, ast.ASSIGN)
     else:
         symbol = node.operation
         right_node = node.right
-        return arithmetic(left, right_node, symbol, env)
+        if symbol in stl.LAZY:
+            return arithmetic(left, right_node, symbol, env)
+        right = evaluate(right_node, env)
+        return specialized_arithmetic(node, left, right, symbol, env)
 
 
 def eval_braces(node: ast.BlockStmt, env: Environment) -> object:
@@ -1169,16 +1368,12 @@ def create_instance(clazz: Class, call_env: Environment, class_define_env: Envir
 
     scope = ClassEnvironment(clazz.outer_env)
     # scope.extend_functions(clazz.persists)
-    class_inheritance(clazz, class_define_env, scope)
+    class_inheritance(clazz, class_define_env, scope, clazz)
+    if clazz.specials is None:
+        clazz.specials = frozenset(k for k in scope.variables if k[:2] == "__" and k[-2:] == "__")
 
     # print(scope.variables)
     instance = ClassInstance(scope, clazz.class_name, clazz)
-    attrs = scope.attributes()
-    for k in attrs:
-        v = attrs[k]
-        if isinstance(v, Function):
-            v.outer_scope = scope
-            v.clazz = clazz
 
     if call is not None:
         lf = call.line_num, call.file
@@ -1216,8 +1411,20 @@ def eval_eval(block: ast.BlockStmt, env: Environment):
 
 
 def eval_func_call(node: ast.FuncCall, env: Environment):
-    lf = node.line_num, node.file
     func = evaluate(node.call_obj, env)
+    return call_evaluated(node, func, env)
+
+
+def call_evaluated(node: ast.FuncCall, func, env: Environment):
+    """
+    Calls an already evaluated callee of a function call node.
+
+    :param node: the function call node
+    :param func: the evaluated callee
+    :param env: the calling environment
+    :return: the call result
+    """
+    lf = node.line_num, node.file
     call_obj, arg_list = make_arg_list(node)
 
     if isinstance(func, Function):
@@ -1304,21 +1511,47 @@ def call_function(args: list, lf: tuple, func: Function, call_env: Environment):
     """
     Calls a function
 
+    Tail calls made by the function are run here, one after another, so that a chain of tail calls runs in
+    constant python stack depth.
+
     :param args: the arguments list
     :param lf: line and file of the caller
     :param func: the function object itself
     :param call_env: the environment where the function call was made
     :return: the function result
     """
-
     if func.abstract:
         raise lib.AbstractMethodException("Abstract method is not callable, in '{}', at line {}."
                                           .format(lf[1], lf[0]))
 
+    pos_args, kwargs = parse_function_args(args, call_env)
+    result = run_function(pos_args, kwargs, lf, func, call_env)
+    while type(result) is TailCall:
+        result = run_function(result.pos_args, result.kwargs, result.lf, result.func, call_env)
+    return result
+
+
+def run_function(pos_args: list, kwargs: dict, lf: tuple, func: Function, call_env: Environment):
+    """
+    Binds the evaluated arguments to the parameters of a function, and evaluates its body.
+
+    :param pos_args: the positional arguments
+    :param kwargs: the keyword arguments
+    :param lf: line and file of the caller
+    :param func: the function object itself
+    :param call_env: the environment where the function call was made
+    :return: the function result, or a TailCall if the function ends with a tail call
+    """
     scope = FunctionEnvironment(func.outer_scope)
-    params = func.params
+    plan = func.plan
+    if plan is not None and not kwargs and len(pos_args) == len(plan):
+        scope.variables.update(zip(plan, pos_args))
+        try:
+            return evaluate(func.body, scope)
+        except lib.FunctionReturn as fr:
+            return fr.value
 
-    pos_args, kwargs = parse_function_args(args, call_env)
+    params = func.params
 
     variable_length = False  # Whether there exists unpack arguments
 
@@ -1351,7 +1584,43 @@ def call_function(args: list, lf: tuple, func: Function, call_env: Environment):
         raise lib.ArgumentException("Too many arguments for function at <{}>, in file '{}', at line {}"
                                     .format(func.id, lf[1], lf[0]))
 
-    return evaluate(func.body, scope)
+    try:
+        return evaluate(func.body, scope)
+    except lib.FunctionReturn as fr:
+        return fr.value
+
+
+def eval_outside_function(node: ast.Node, env: Environment):
+    """
+    Evaluates a node that is not part of any function body, such as a whole script or module.
+
+    A 'return' that unwinds out of the node has no function to stop at, and is reported as an error.
+
+    :param node: the node to be evaluated
+    :param env: the working environment
+    :return: the evaluation result
+    """
+    try:
+        return evaluate(node, env)
+    except lib.FunctionReturn:
+        raise lib.SplException("Return outside function.") from None
+
+
+TREE_CALLER = call_function
+
+
+def set_function_caller(caller=None):
+    """
+    Replaces the function that every spl function call is made through.
+
+    Like 'evaluate', 'call_function' is looked up at call time by all helpers of this module, so an alternative
+    execution engine can take over function calls without changing the evaluation of other nodes.
+
+    :param caller: the new caller, with the same signature as 'call_function', None to restore the tree-walker
+    :return: None
+    """
+    global call_function
+    call_function = TREE_CALLER if caller is None else caller
 
 
 def call_unpack(name: str, pos_args: list, index, scope: Environment, call_env: Environment, lf) -> int:
@@ -1388,8 +1657,7 @@ def eval_dot(node: ast.Dot, env: Environment):
         if isinstance(instance, lib.NativeType):
             return native_types_attr_invoke(instance, obj)
         elif isinstance(instance, ClassInstance) or isinstance(instance, Module):
-            attr = instance.env.get(obj.name, lf)
-            return attr
+            return get_attribute(instance, obj.name, lf)
         else:
             # print(instance)
             raise lib.TypeException("Type '{}' does not have attribute '{}', in '{}', at line {}"
@@ -1404,7 +1672,10 @@ def eval_dot(node: ast.Dot, env: Environment):
                 raise lib.IndexOutOfRangeException(str(ie) + " in file: '{}', at line {}"
                                                    .format(node.file, node.line_num))
         elif isinstance(instance, ClassInstance) or isinstance(instance, Module):
-            func = evaluate(obj.call_obj, instance.env)
+            if call_obj.node_type == ast.NAME_NODE:
+                func = get_attribute(instance, call_obj.name, (call_obj.line_num, call_obj.file))
+            else:
+                func = evaluate(call_obj, instance.env)
             result = call_function(args, lf, func, env)
             return result
         else:
@@ -1414,6 +1685,26 @@ def eval_dot(node: ast.Dot, env: Environment):
         raise lib.InterpretException("Unknown Syntax, in file '{}', at line {}".format(node.file, node.line_num))
 
 
+def get_attribute(instance, name: str, lf: tuple):
+    """
+    Returns an attribute of a class instance or a module.
+
+    The attribute is looked up in the constants and the variables of the instance itself, which is where its
+    attributes live, before falling back to the full lookup through the outer scopes.
+
+    :param instance: the class instance or module
+    :param name: the name of the attribute
+    :param lf: line and file of the access
+    :return: the attribute
+    """
+    env = instance.env
+    if name in env.constants:
+        return env.constants[name]
+    elif name in env.variables:
+        return env.variables[name]
+    return env.get(name, lf)
+
+
 def get_node_in_annotation(node: ast.AnnotationNode, env: Environment, ann_list: list) -> (ast.Node, ast.Node):
     if node.args is not None:
         node.args.standalone = True
@@ -1445,20 +1736,63 @@ def arithmetic(left, right_node: ast.Node, symbol, env: Environment):
             raise lib.InterpretException("Operator '||' '&&' do not support type.")
     else:
         right = evaluate(right_node, env)
-        if left is None or isinstance(left, bool):
-            return primitive_arithmetic(left, right, symbol)
-        elif isinstance(left, int) or isinstance(left, float):
-            return num_arithmetic(left, right, symbol)
-        elif isinstance(left, lib.String):
-            return string_arithmetic(left, right, symbol)
-        elif isinstance(left, lib.NativeType):  # NativeTypes other than String
-            return native_arithmetic(left, right, symbol)
-        elif isinstance(left, ClassInstance):
-            return instance_arithmetic(left, right, symbol, env)
-        elif isinstance(left, Class):
-            return class_arithmetic(left, right, symbol, env, right_node)
+        return value_arithmetic(left, right, symbol, env, right_node)
+
+
+def value_arithmetic(left, right, symbol, env: Environment, right_node):
+    """
+    Applies a non-lazy binary operator on two evaluated operands.
+
+    :param left: the evaluated left operand
+    :param right: the evaluated right operand
+    :param symbol: the operator
+    :param env: the working environment
+    :param right_node: the unevaluated right operand, used by 'Class instanceof Class'
+    :return: the operation result
+    """
+    if left is None or isinstance(left, bool):
+        return primitive_arithmetic(left, right, symbol)
+    elif isinstance(left, int) or isinstance(left, float):
+        return num_arithmetic(left, right, symbol)
+    elif isinstance(left, lib.String):
+        return string_arithmetic(left, right, symbol)
+    elif isinstance(left, lib.NativeType):  # NativeTypes other than String
+        return native_arithmetic(left, right, symbol)
+    elif isinstance(left, ClassInstance):
+        return instance_arithmetic(left, right, symbol, env)
+    elif isinstance(left, Class):
+        return class_arithmetic(left, right, symbol, env, right_node)
+    else:
+        return raw_type_comparison(left, right, symbol)
+
+
+def specialized_arithmetic(node: ast.BinaryOperator, left, right, symbol: str, env: Environment):
+    """
+    Applies a non-lazy binary operator, specializing the operator node to the operand types it sees.
+
+    The first evaluation records the exact types of both operands. If the pair has a specialized operation, later
+    evaluations with the same types call it directly, skipping the type dispatch of 'value_arithmetic'. Once any
+    other pair of types is seen, the node falls back to 'value_arithmetic' for good.
+
+    :param node: the operator node
+    :param left: the evaluated left operand
+    :param right: the evaluated right operand
+    :param symbol: the operator, without the trailing '=' of an operator assignment
+    :param env: the working environment
+    :return: the operation result
+    """
+    spec = node.specialization
+    if spec is None:
+        table = SPECIALIZATION_TABLE.get((type(left), type(right)))
+        if table is not None and symbol in table:
+            spec = type(left), type(right), table[symbol]
         else:
-            return raw_type_comparison(left, right, symbol)
+            spec = GENERIC
+        node.specialization = spec
+    if type(left) is spec[0] and type(right) is spec[1]:
+        return spec[2](left, right)
+    node.specialization = GENERIC
+    return value_arithmetic(left, right, symbol, env, node.right)
 
 
 def class_arithmetic(left: Class, right, symbol, env: Environment, right_node):
@@ -1477,6 +1811,9 @@ def class_arithmetic(left: Class, right, symbol, env: Environment, right_node):
         raise lib.AttributeException("'Class' object does not support operation '{}'".format(left.class_name, symbol))
 
 
+INSTANCE_OPERATORS = {symbol: "__" + name + "__" for symbol, name in stl.BINARY_OPERATORS.items() if name}
+
+
 def instance_arithmetic(left: ClassInstance, right, symbol, env: Environment):
     if symbol == "===" or symbol == "is":
         return isinstance(right, ClassInstance) and left.id == right.id
@@ -1488,14 +1825,9 @@ def instance_arithmetic(left: ClassInstance, right, symbol, env: Environment):
         else:
             return False
     else:
-        op_name = "__" + stl.BINARY_OPERATORS[symbol] + "__"
-        call_obj = ast.NameNode(LINE_FILE, op_name)
-        if not left.env.contains_key(op_name):
+        func: Function = left.special(INSTANCE_OPERATORS.get(symbol))
+        if func is None:
             raise lib.AttributeException("Class '{}' does not support operation '{}'".format(left.class_name, symbol))
-        block = ast.BlockStmt(LINE_FILE)
-        block.add_line(right)
-        # func: Function = left.env.get(fc.f_name, LINE_FILE)
-        func: Function = evaluate(call_obj, left.env)
         result = call_function([right], LINE_FILE, func, env)
         return result
 
@@ -1644,35 +1976,125 @@ def num_arithmetic(left, right, symbol):
     return NUMBER_ARITHMETIC_TABLE[symbol](left, right)
 
 
+INT_OPERATION_TABLE = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.floordiv,
+    "%": operator.mod,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "<<": operator.lshift,
+    ">>": operator.rshift,
+    "&": operator.and_,
+    "^": operator.xor,
+    "|": operator.or_,
+    "===": operator.is_,
+    "is": operator.is_,
+    "!==": operator.is_not
+}
+
+FLOAT_OPERATION_TABLE = {**INT_OPERATION_TABLE, "/": operator.truediv}
+
+STRING_OPERATION_TABLE = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "+": operator.add,
+    "===": operator.is_,
+    "is": operator.is_,
+    "!==": operator.is_not
+}
+
+# Operations of binary operators specialized to the exact types of both operands
+SPECIALIZATION_TABLE = {
+    (int, int): INT_OPERATION_TABLE,
+    (float, float): FLOAT_OPERATION_TABLE,
+    (int, float): FLOAT_OPERATION_TABLE,
+    (float, int): FLOAT_OPERATION_TABLE,
+    (lib.String, lib.String): STRING_OPERATION_TABLE
+}
+
+# The specialization of an operator that has seen operands of different types
+GENERIC = None, None, None
+
+
 def is_def(node: ast.AssignmentNode):
     return isinstance(node.right, ast.DefStmt)
 
 
-def class_inheritance(cla: Class, env: Environment, scope: Environment):
+def class_inheritance(cla: Class, env: Environment, scope: Environment, owner: Class):
     """
     Instantiates all instance attributes in the class and its superclasses.
 
+    Methods are bound from the class template, only the field initializers are evaluated.
+
     :param cla:
     :param env: the class defined environment
     :param scope: the class scope
+    :param owner: the class being instantiated
     :return: None
     """
     for sc in cla.superclasses:
-        class_inheritance(sc, sc.outer_env, scope)
+        class_inheritance(sc, sc.outer_env, scope, owner)
+
+    if cla.template is None:
+        cla.template = class_template(cla, env)
+    for left, level, right, method in cla.template:
+        if method is None:
+            value = evaluate(right, env)
+            if isinstance(value, Function):
+                value.outer_scope = scope
+                value.clazz = owner
+        elif method is INVALID:
+            value = eval_def(right, env)
+            value.outer_scope = scope
+            value.clazz = owner
+        else:
+            value = method.bind(scope, owner)
+        assignment(left, value, scope, level)
+
+
+def class_template(cla: Class, env: Environment) -> list:
+    """
+    Returns the template of a class body, which is evaluated only once per class.
 
-    # evaluate(cla.body, scope)
-    for line in cla.body.lines:  # this step just fills the scope
+    Each entry is (left, level, right, method). 'method' is the Function shared by all instances if 'right' defines a
+    method, INVALID if the method has parameter presets that must be evaluated for every instance, and None if 'right'
+    is a field initializer.
+
+    :param cla: the class
+    :param env: the class defined environment
+    :return: the template
+    """
+    template = []
+    for line in cla.body.lines:
         if isinstance(line, ast.AssignmentNode):
-            value = evaluate(line.right, env)
-            assignment(line.left, value, scope, line.level)
+            assign_node = line
         elif isinstance(line, ast.AnnotationNode):
             # print(line)
             assign_node: ast.AssignmentNode = get_node_in_annotation(line, env, [])
-            value = evaluate(assign_node.right, env)
-            assignment(assign_node.left, value, scope, assign_node.level)
         else:
             raise lib.SplException("Not an expression inside class body")
             # evaluate(line, scope)
+        right = assign_node.right
+        if isinstance(right, ast.DefStmt):
+            if any(p.node_type == ast.ASSIGNMENT_NODE for p in right.params.lines):
+                method = INVALID
+            else:
+                method = eval_def(right, env)
+        else:
+            method = None
+        template.append((assign_node.left, assign_node.level, right, method))
+    return template
+
+
+# Methods of native types with their calling conventions, maps (NativeType class, method name) to the entry
+# returned by 'native_method'
+NATIVE_METHOD_CACHE = {}
 
 
 def native_types_call(instance: lib.NativeType, call_obj: ast.NameNode, arg_list: list, env: Environment):
@@ -1686,22 +2108,41 @@ def native_types_call(instance: lib.NativeType, call_obj: ast.NameNode, arg_list
     :return: the returning value of the method called
     """
     args, kwargs = parse_function_args(arg_list, env)
-    name = call_obj.name
-    type_ = type(instance)
-    # print(type_, name)
-    method = getattr(type_, name)
-    params: tuple = method.__code__.co_varnames
-    if "self" in params and params.index("self") == 0:
-        if "env" in params and params.index("env") == 1:
-            res = method(instance, env, *args, **kwargs)
+    method, with_self, with_env = native_method(type(instance), call_obj.name)
+    if with_self:
+        if with_env:
+            return method(instance, env, *args, **kwargs)
         else:
-            res = method(instance, *args, **kwargs)
+            return method(instance, *args, **kwargs)
     else:
-        if "env" in params and params.index("env") == 0:
-            res = method(env, *args, **kwargs)
+        if with_env:
+            return method(env, *args, **kwargs)
         else:
-            res = method(*args, **kwargs)
-    return res
+            return method(*args, **kwargs)
+
+
+def native_method(type_: type, name: str) -> tuple:
+    """
+    Returns a method of a native type, and its calling convention.
+
+    The convention is read from the parameter names of the method: an initial 'self' takes the instance, and an
+    'env' following it takes the calling environment. It is resolved at the first call of each method, and cached
+    in 'NATIVE_METHOD_CACHE'.
+
+    :param type_: the NativeType class
+    :param name: the name of the method
+    :return: (the method, whether it takes the instance, whether it takes the environment)
+    """
+    key = type_, name
+    entry = NATIVE_METHOD_CACHE.get(key)
+    if entry is None:
+        method = getattr(type_, name)
+        params: tuple = method.__code__.co_varnames
+        with_self = len(params) > 0 and params[0] == "self"
+        env_index = 1 if with_self else 0
+        with_env = len(params) > env_index and params[env_index] == "env"
+        entry = NATIVE_METHOD_CACHE[key] = method, with_self, with_env
+    return entry
 
 
 def native_types_attr_invoke(instance: lib.NativeType, node: ast.NameNode):
@@ -1726,10 +2167,17 @@ def self_return(node):
 
 
 def eval_return(node: ast.Node, env: Environment):
-    res = evaluate(node, env)
-    # print(env.variables)
-    env.terminate(res)
-    return res
+    raise lib.FunctionReturn(evaluate(node, env))
+
+
+def eval_name(node: ast.NameNode, env: Environment):
+    depth = node.depth
+    if depth is None:
+        return env.get(node.name, (node.line_num, node.file))
+    elif depth == ast.HEAP_NAME:
+        return env.heap[node.name]
+    else:
+        return env.get_at(node.name, depth, (node.line_num, node.file))
 
 
 def eval_block(node: ast.BlockStmt, env: Environment):
@@ -1743,12 +2191,14 @@ def eval_block(node: ast.BlockStmt, env: Environment):
 
 
 def eval_if_stmt(node: ast.IfStmt, env: Environment):
-    cond = evaluate(node.condition, env)
-    block_scope = SubEnvironment(env)
-    if cond:
-        return evaluate(node.then_block, block_scope)
+    if evaluate(node.condition, env):
+        if node.then_scoped:
+            return evaluate(node.then_block, SubEnvironment(env))
+        return evaluate(node.then_block, env)
+    elif node.else_scoped:
+        return evaluate(node.else_block, SubEnvironment(env))
     else:
-        return evaluate(node.else_block, block_scope)
+        return evaluate(node.else_block, env)
 
 
 def eval_while(node: ast.WhileStmt, env: Environment):
@@ -1756,11 +2206,18 @@ def eval_while(node: ast.WhileStmt, env: Environment):
 
     block_scope = SubEnvironment(title_scope)
 
+    declares = node.body_declares
     result = 0
-    while not title_scope.broken and evaluate(node.condition, title_scope):
-        block_scope.invalidate()
-        result = evaluate(node.body, block_scope)
-        title_scope.resume_loop()
+    while evaluate(node.condition, title_scope):
+        if declares:
+            block_scope.invalidate()
+        try:
+            result = evaluate(node.body, block_scope)
+        except lib.LoopBreak:
+            result = None
+            break
+        except lib.LoopContinue:
+            result = None
 
     del title_scope
     del block_scope
@@ -1825,12 +2282,13 @@ def eval_class_stmt(node: ast.ClassStmt, env: Environment):
     return cla
 
 
-def eval_jump(node, env: Environment):
-    func: Function = env.get(node.to, (0, "f"))
-    lf = node.line_num, node.file
-    for i in range(len(node.args.lines)):
-        env.assign(func.params[i].name, evaluate(node.args.lines[i], env), lf)
-    return evaluate(func.body, env)
+def eval_jump(node: ast.JumpNode, env: Environment):
+    call = node.call
+    func = evaluate(call.call_obj, env)
+    if isinstance(func, Function) and not func.abstract:
+        pos_args, kwargs = parse_function_args(call.args.lines, env)
+        return TailCall(func, pos_args, kwargs, (call.line_num, call.file))
+    return call_evaluated(call, func, env)
 
 
 def eval_assert(node: ast.Node, env: Environment):
@@ -1957,7 +2415,7 @@ def eval_import_node(node: ast.ImportNode, env: Environment):
         module = Module(module_env)
         if i == len(lst) - 1:
             if prev_module is None:
-                evaluate(block, module_env)
+                eval_outside_function(block, module_env)
                 global_env.add_module(path, module)
             else:
                 module = prev_module
@@ -1968,7 +2426,7 @@ def eval_import_node(node: ast.ImportNode, env: Environment):
 
 
 def raise_exception(e: SPLBaseException, env: Environment):
-    if not is_subclass_of(env.get_class(e.exception.class_name), env.get_class("Exception")):
+    if not is_subclass_of(env.get_class(e.exception.class_name), lang_class("Exception", env)):
         raise lib.TypeException("Type '{}' is not throwable".format(e.exception.class_name))
     raise e
 
@@ -1981,7 +2439,7 @@ def eval_ann_node(node: ast.AnnotationNode, env: Environment):
 # Operation table of every non-abstract node types
 NODE_TABLE = {
     ast.LITERAL_NODE: lambda n, env: lib.String(n.literal),
-    ast.NAME_NODE: lambda n, env: env.get(n.name, (n.line_num, n.file)),
+    ast.NAME_NODE: eval_name,
     ast.BREAK_STMT: lambda n, env: env.break_loop(),
     ast.CONTINUE_STMT: lambda n, env: env.pause_loop(),
     ast.ASSIGNMENT_NODE: eval_assignment_node,
@@ -2014,17 +2472,46 @@ def evaluate(node: ast.Node, env: Environment):
     :param env: the working environment
     :return: the evaluation result
     """
-    if env.is_terminated():
-        return env.terminate_value()
     if isinstance(node, ast.Node):
         t = node.node_type
-        node.execution += 1
         tn = NODE_TABLE[t]
         return tn(node, env)
     else:
         return node
 
 
+def counting_evaluate(node: ast.Node, env: Environment):
+    """
+    Evaluates a node like 'evaluate', and also counts the executions of each node in 'node.execution'.
+
+    :param node: the node in abstract syntax tree to be evaluated
+    :param env: the working environment
+    :return: the evaluation result
+    """
+    if isinstance(node, ast.Node):
+        node.execution += 1
+        return NODE_TABLE[node.node_type](node, env)
+    else:
+        return node
+
+
+TREE_EVALUATOR = evaluate
+
+
+def set_evaluator(evaluator=None):
+    """
+    Replaces the function that every node of the program is evaluated through.
+
+    All helpers of this module look up 'evaluate' at call time, so an alternative execution engine only has to
+    install its own evaluator here to be used everywhere, including function calls and class bodies.
+
+    :param evaluator: the new evaluator, with the same signature as 'evaluate', None to restore the tree-walker
+    :return: None
+    """
+    global evaluate
+    evaluate = TREE_EVALUATOR if evaluator is None else evaluator
+
+
 # Processes before run
 
 
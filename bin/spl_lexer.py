@@ -14,11 +14,11 @@ LINE_FILE = 0, "TOKENIZER"
 
 class Tokenizer:
     """
-    :type tokens: list of Token
+    :type tokens: TokenBuffer
     """
 
     def __init__(self):
-        self.tokens = []
+        self.tokens = stl.TokenBuffer()
         self.import_lang = True
         self.spl_path = ""
         self.script_dir = ""
@@ -51,15 +51,16 @@ class Tokenizer:
 
     def tokenize(self, source):
         """
-        Tokenize the source spl source code into a list of tokens, stored in the memory of this Lexer.
+        Tokenize the source spl source code into a buffer of tokens, stored in the memory of this Lexer.
 
         :param source: the source code, whether an opened file or a list of lines.
         :return: None
         """
-        self.tokens.clear()
+        self.tokens = stl.TokenBuffer()
         if self.import_lang and self.file_name[-7:] != "lang.sp":
-            self.tokens += [stl.IdToken(LINE_FILE, "import"), stl.IdToken(LINE_FILE, "namespace"),
-                            stl.LiteralToken(LINE_FILE, "lang")]
+            self.tokens.append(stl.ID_TOKEN, "import", LINE_FILE)
+            self.tokens.append(stl.ID_TOKEN, "namespace", LINE_FILE)
+            self.tokens.append(stl.LITERAL_TOKEN, "lang", LINE_FILE)
             self.find_import(0, 3)
 
         if isinstance(source, list):
@@ -84,7 +85,7 @@ class Tokenizer:
             line = file.readline()
             line_num += 1
 
-        self.tokens.append(stl.Token((stl.EOF, None)))
+        self.tokens.append(stl.EOF_TOKEN, "", (stl.EOF, None))
         if self.link:
             self._write_to_file()
 
@@ -99,30 +100,10 @@ class Tokenizer:
             in_doc, doc = self.proceed_line(line, tup, in_doc, doc)
             self.find_import(last_index, len(self.tokens))
 
-        self.tokens.append(stl.Token((stl.EOF, None)))
+        self.tokens.append(stl.EOF_TOKEN, "", (stl.EOF, None))
 
     def restore_tokens(self, file: _io.BytesIO):
-        self.tokens.clear()
-        while True:
-            flag = int.from_bytes(file.read(1), "big")
-            if flag == 0:
-                self.tokens.append(stl.Token((stl.EOF, None)))
-                break
-            else:
-                line = int(stl.read_string(file))
-                file_name = stl.read_string(file)
-                lf = line, file_name
-                if flag == 1:
-                    token: stl.NumToken = stl.NumToken(lf, stl.read_string(file))
-                elif flag == 2:
-                    token: stl.LiteralToken = stl.LiteralToken(lf, stl.read_string(file))
-                elif flag == 3:
-                    token: stl.IdToken = stl.IdToken(lf, stl.read_string(file))
-                elif flag == 4:
-                    token: stl.DocToken = stl.DocToken(lf, stl.read_string(file))
-                else:
-                    raise stl.ParseException("Unknown flag: {}".format(flag))
-                self.tokens.append(token)
+        self.file_name, self.tokens = stl.TokenBuffer.from_binary(file)
 
     def proceed_line(self, line: str, line_num: (int, str), in_doc: bool, doc: str) -> (bool, str):
         """ Tokenize a line.
@@ -156,18 +137,18 @@ class Tokenizer:
 
             if not in_doc:
                 if len(doc) > 0:
-                    self.tokens.append(stl.DocToken(line_num, doc[2:]))
+                    self.tokens.append(stl.DOC_TOKEN, doc[2:], line_num)
                     doc = ""
                 if in_double:
                     if ch == '"':
                         in_double = False
-                        self.tokens.append(stl.LiteralToken(line_num, literal))
+                        self.tokens.append(stl.LITERAL_TOKEN, stl.replace_escapes(literal), line_num)
                         literal = ""
                         continue
                 elif in_single:
                     if ch == "'":
                         in_single = False
-                        self.tokens.append(stl.LiteralToken(line_num, literal))
+                        self.tokens.append(stl.LITERAL_TOKEN, stl.replace_escapes(literal), line_num)
                         literal = ""
                         continue
                 else:
@@ -208,19 +189,19 @@ class Tokenizer:
         lst = normalize(non_literal)
         for part in lst:
             if part.isidentifier():
-                self.tokens.append(stl.IdToken(line_num, part))
+                self.tokens.append(stl.ID_TOKEN, part, line_num)
             elif is_float(part):
-                self.tokens.append(stl.NumToken(line_num, part))
+                self.tokens.append(stl.NUM_TOKEN, part, line_num)
             elif is_integer(part):
-                self.tokens.append(stl.NumToken(line_num, part))
+                self.tokens.append(stl.NUM_TOKEN, part, line_num)
             elif part in stl.ALL:
-                self.tokens.append(stl.IdToken(line_num, part))
+                self.tokens.append(stl.ID_TOKEN, part, line_num)
             elif part[:-1] in stl.OP_EQ:
-                self.tokens.append(stl.IdToken(line_num, part))
+                self.tokens.append(stl.ID_TOKEN, part, line_num)
             elif part == stl.EOL:
-                self.tokens.append(stl.IdToken(line_num, stl.EOL))
+                self.tokens.append(stl.ID_TOKEN, stl.EOL, line_num)
             elif part == "=>":
-                self.tokens.append(stl.IdToken(line_num, part))
+                self.tokens.append(stl.ID_TOKEN, part, line_num)
             elif part in stl.OMITS:
                 pass
             else:
@@ -228,27 +209,24 @@ class Tokenizer:
 
     def find_import(self, from_, to):
         """
-        Looks for import statement between the given slice of the tokens list.
+        Looks for import statement between the given slice of the tokens buffer.
 
         :param from_: the beginning position of search
         :param to: the end position of search
         :return: None
         """
+        tokens = self.tokens
         for i in range(from_, to, 1):
-            token = self.tokens[i]
-            if isinstance(token, stl.IdToken) and token.symbol == "import":
-                next_token: stl.Token = self.tokens[i + 1]
-                namespace_token = None
-                if isinstance(next_token, stl.IdToken) and next_token.symbol == "namespace":
-                    namespace_token = next_token
-                    self.tokens.pop(i + 1)
-                    path_token: stl.LiteralToken = self.tokens[i + 1]
-                elif isinstance(next_token, stl.LiteralToken):
-                    path_token: stl.LiteralToken = self.tokens[i + 1]
-                else:
+            if tokens.code(i) == stl.IMPORT:
+                namespace_lf = None
+                if tokens.code(i + 1) == stl.NAMESPACE:
+                    namespace_lf = tokens.line_file(i + 1)
+                    tokens.pop(i + 1)
+                elif tokens.kinds[i + 1] != stl.LITERAL_TOKEN:
+                    next_lf = tokens.line_file(i + 1)
                     raise stl.ParseException("Unexpected token in file '{}', at line {}"
-                                             .format(next_token.file, next_token.line))
-                name = path_token.text
+                                             .format(next_lf[1], next_lf[0]))
+                name = tokens.value(i + 1)
 
                 if name[-3:] == ".sp":  # user lib
                     if len(self.script_dir) == 0:
@@ -260,24 +238,21 @@ class Tokenizer:
                     file_name = "{}{}lib{}{}.sp".format(self.spl_path, os.sep, os.sep, name)
                     import_name = name
 
-                if len(self.tokens) > i + 2:
-                    as_token: stl.IdToken = self.tokens[i + 2]
-                    if as_token.symbol == "as":
-                        if namespace_token is not None:
+                if len(tokens) > i + 2:
+                    if tokens.code(i + 2) == stl.AS:
+                        if namespace_lf is not None:
                             raise stl.ParseException("Unexpected combination 'import namespace ... as ...'")
-                        name_token: stl.IdToken = self.tokens[i + 3]
-                        import_name = name_token.symbol
-                        self.tokens.pop(i + 1)
-                        self.tokens.pop(i + 1)
+                        import_name = tokens.symbol(i + 3)
+                        tokens.pop(i + 1)
+                        tokens.pop(i + 1)
 
-                self.tokens.pop(i + 1)  # remove the import name token
+                tokens.pop(i + 1)  # remove the import name token
 
                 self.import_file(file_name, import_name)
-                if namespace_token:
-                    lf = namespace_token.line, namespace_token.file
-                    self.tokens.append(namespace_token)
-                    self.tokens.append(stl.IdToken(lf, import_name))
-                    self.tokens.append(stl.IdToken(lf, stl.EOL))
+                if namespace_lf:
+                    tokens.append(stl.ID_TOKEN, "namespace", namespace_lf)
+                    tokens.append(stl.ID_TOKEN, import_name, namespace_lf)
+                    tokens.append(stl.ID_TOKEN, stl.EOL, namespace_lf)
                 break
 
     def import_file(self, full_path, import_name):
@@ -296,26 +271,24 @@ class Tokenizer:
             # lexer.script_dir = get_dir(full_path)
             lexer.tokenize(file)
             # print(lexer.tokens)
-            self.tokens.append(stl.IdToken(LINE_FILE, import_name))
-            self.tokens.append(stl.IdToken(LINE_FILE, full_path))
-            self.tokens.append(stl.IdToken(LINE_FILE, "{"))
-            self.tokens += lexer.tokens
-            self.tokens.pop()  # remove the EOF token
-            self.tokens.append(stl.IdToken(LINE_FILE, "}"))
+            self.tokens.append(stl.ID_TOKEN, import_name, LINE_FILE)
+            self.tokens.append(stl.ID_TOKEN, full_path, LINE_FILE)
+            self.tokens.append(stl.ID_TOKEN, "{", LINE_FILE)
+            self.tokens.extend(lexer.tokens, len(lexer.tokens) - 1)  # without the EOF token
+            self.tokens.append(stl.ID_TOKEN, "}", LINE_FILE)
 
     def get_tokens(self):
         """
-        Returns the tokens list.
+        Returns the tokens buffer.
 
-        :return: the tokens list
+        :return: the tokens buffer
         """
         return self.tokens
 
     def _write_to_file(self):
         name = stl.replace_extension(self.file_name, "lsp")
         with open(name, "wb") as wf:
-            for token in self.tokens:
-                wf.write(token.to_binary())
+            wf.write(self.tokens.to_binary(self.file_name))
 
 
 def normalize(string):
@@ -106,14 +106,15 @@ class SplObject:
     ----- Attributes -----
         id: the identifier of this object, is guaranteed to be unique
     """
-
-    id: int
+    __slots__ = ("id",)
 
     def __init__(self):
-        self.id = mem.MEMORY.allocate()
+        self.id = mem.MEMORY.allocate(self)
 
 
 class NativeType(SplObject):
+    __slots__ = ()
+
     def __init__(self):
         SplObject.__init__(self)
 
@@ -151,6 +152,8 @@ class NativeType(SplObject):
 
 
 class Iterable:
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -162,6 +165,7 @@ class String(NativeType, Iterable):
     """
     An object of a string literal.
     """
+    __slots__ = ("literal",)
 
     def __init__(self, lit):
         NativeType.__init__(self)
@@ -706,6 +710,32 @@ class StringFormatException(SplException):
         SplException.__init__(self, msg)
 
 
+# Control flow
+
+class ControlFlow(BaseException):
+    """
+    Unwinds the evaluation up to the function or loop that a 'return', 'break' or 'continue' belongs to.
+
+    It derives from 'BaseException', so that neither the 'catch' blocks of spl nor the handlers of python errors
+    would intercept it.
+    """
+
+
+class FunctionReturn(ControlFlow):
+    def __init__(self, value):
+        ControlFlow.__init__(self)
+
+        self.value = value
+
+
+class LoopBreak(ControlFlow):
+    pass
+
+
+class LoopContinue(ControlFlow):
+    pass
+
+
 def exit_(code=0):
     """
     Exits the current process.
@@ -3,10 +3,11 @@ class Memory:
         self.object_counter = 0
         self.store = 0
 
-    def allocate(self) -> int:
+    def allocate(self, obj) -> int:
         """
         returns the current pointer.
 
+        :param obj: the object being allocated, not yet fully initialized
         :return:
         """
         p = self.object_counter
@@ -0,0 +1,391 @@
+""" The abstract syntax tree optimizer of the spl interpreter.
+
+Runs once after parsing, and rewrites the tree in a pipeline of passes, each enabled from an optimization level:
+
+* -O1, constant folding: operators whose operands are all constants are replaced by their results, evaluated by the
+  same operations as the interpreter uses at run time;
+* -O1, dead branches: 'if' statements and conditional operators with constant conditions are replaced by the taken
+  branch, and 'while' loops with false conditions are removed;
+* -O1, tail calls: 'return' statements returning a call of the function they are in are marked as tail calls, which
+  are made after the function returns, so that tail recursion runs in constant python stack depth;
+* -O1, counted loops: 'for' loops of the form 'for (var i = a; i < b; i++)', whose body does not write the counter,
+  are marked to be run by a native counter, see 'spl_interpreter.eval_counted_loop';
+* -O2, literal hoisting: string literals are replaced by the String objects they evaluate to, which are created
+  once instead of at every evaluation. All evaluations of a hoisted literal give the same object, so this level
+  changes the results of the identity operators on strings.
+
+Every change is recorded, and can be shown by the optimizer report.
+"""
+
+from bin import spl_ast as ast, spl_interpreter as itr
+import bin.spl_lib as lib
+import bin.spl_token_lib as stl
+from bin.spl_bytecode import REFLECTIVE_NAMES
+from bin.spl_resolver import collect_declarations, declares_names
+
+# Types of raw values in the tree that are constants, besides None
+CONSTANT_TYPES = {bool, int, float}
+
+# Operators not folded, as their results depend on object identities or on the run time types
+UNFOLDED_OPERATORS = {"===", "is", "!==", "instanceof", "subclassof"}
+
+# Comparisons of the counter of a counted loop, mapped to the step operator counting towards the bound
+COUNTING_OPERATORS = {"<": "++", "<=": "++", ">": "--", ">=": "--"}
+
+
+class Optimizer:
+    """
+    Rewrites abstract syntax trees.
+
+    ===== Attributes =====
+    :param level: the optimization level, 0 for no optimizations
+    :param changes: maps the name of each run pass to the list of (line-file, description) of its changes
+    """
+
+    def __init__(self, level: int):
+        self.level = level
+        self.changes = {}
+        self.current = None
+
+    def optimize(self, root: ast.BlockStmt) -> ast.BlockStmt:
+        """
+        Runs all passes enabled at the optimization level.
+
+        :param root: the root of the abstract syntax tree
+        :return: the optimized root
+        """
+        for name, level, visit in PASSES:
+            if self.level >= level:
+                self.current = self.changes[name] = []
+                root = self.rewrite(root, visit)
+        return root
+
+    def report(self) -> str:
+        """
+        Returns the description of all changes made by the run passes.
+
+        :return: the report
+        """
+        lines = ["===== Optimizer Report (-O{}) =====".format(self.level)]
+        for name in self.changes:
+            changes = self.changes[name]
+            lines.append("{}: {} change{}".format(name, len(changes), "" if len(changes) == 1 else "s"))
+            for lf, description in changes:
+                lines.append("    {}, line {}: {}".format(lf[1], lf[0], description))
+        lines.append("===== End of Report =====")
+        return "\n".join(lines)
+
+    def record(self, node: ast.Node, description: str):
+        self.current.append(((node.line_num, node.file), description))
+
+    def rewrite(self, node, visit):
+        """
+        Rewrites the children of a node, and then the node itself by the visit method of a pass.
+
+        :param node: the node, or a raw value
+        :param visit: the visit method, returns the replacement of a node
+        :return: the replacement of the node
+        """
+        if not isinstance(node, ast.Node):
+            return node
+        self.rewrite_children(node, visit)
+        return visit(self, node)
+
+    def rewrite_children(self, node: ast.Node, visit):
+        t = node.node_type
+        if t == ast.BLOCK_STMT:
+            node.lines = [self.rewrite(line, visit) for line in node.lines]
+        elif t == ast.ASSIGNMENT_NODE:
+            if isinstance(node.left, ast.Node):  # the assigned target or pair key is kept
+                self.rewrite_children(node.left, visit)
+            node.right = self.rewrite(node.right, visit)
+        elif isinstance(node, ast.BinaryExpr):
+            node.left = self.rewrite(node.left, visit)
+            node.right = self.rewrite(node.right, visit)
+        elif t == ast.UNARY_OPERATOR:
+            if node.operation != "assert":  # the failure message shows the source expression
+                node.value = self.rewrite(node.value, visit)
+        elif t == ast.IN_DECREMENT_OPERATOR:
+            node.value = self.rewrite(node.value, visit)
+        elif t == ast.TERNARY_OPERATOR:
+            node.left = self.rewrite(node.left, visit)
+            node.mid = self.rewrite(node.mid, visit)
+            node.right = self.rewrite(node.right, visit)
+        elif t == ast.IF_STMT:
+            node.condition = self.rewrite(node.condition, visit)
+            node.then_block = self.rewrite(node.then_block, visit)
+            node.else_block = self.rewrite(node.else_block, visit)
+        elif t == ast.WHILE_STMT or t == ast.FOR_LOOP_STMT:
+            node.condition = self.rewrite(node.condition, visit)
+            node.body = self.rewrite(node.body, visit)
+        elif t == ast.CATCH_STMT:
+            node.then = self.rewrite(node.then, visit)
+        elif t == ast.TRY_STMT:
+            node.try_block = self.rewrite(node.try_block, visit)
+            node.catch_blocks = [self.rewrite(cat, visit) for cat in node.catch_blocks]
+            node.finally_block = self.rewrite(node.finally_block, visit)
+        elif t == ast.DEF_STMT:
+            node.params = self.rewrite(node.params, visit)
+            node.body = self.rewrite(node.body, visit)
+        elif t == ast.FUNCTION_CALL:
+            node.call_obj = self.rewrite(node.call_obj, visit)
+            node.args = self.rewrite(node.args, visit)
+        elif t == ast.INDEXING_NODE:
+            node.call_obj = self.rewrite(node.call_obj, visit)
+            node.arg = self.rewrite(node.arg, visit)
+        elif t == ast.CLASS_STMT:
+            # lines of a class body must stay assignments, so the body block itself is not visited
+            node.block.lines = [self.rewrite(line, visit) for line in node.block.lines]
+        elif t == ast.IMPORT_NODE:
+            node.block = self.rewrite(node.block, visit)
+        elif t == ast.ANNOTATION_NODE:
+            node.args = self.rewrite(node.args, visit)
+            node.body = self.rewrite(node.body, visit)
+        elif t == ast.JUMP_NODE:
+            node.call = self.rewrite(node.call, visit)
+
+    # Constant folding
+
+    def fold(self, node: ast.Node):
+        t = node.node_type
+        if t == ast.BINARY_OPERATOR and not node.assignment:
+            return self.fold_binary(node)
+        elif t == ast.UNARY_OPERATOR:
+            value = node.value
+            if node.operation == "neg" and (type(value) is int or type(value) is float):
+                self.record(node, "{} -> {}".format(node, -value))
+                return -value
+            elif node.operation == "!" and is_constant(value):
+                self.record(node, "{} -> {}".format(node, not value))
+                return not value
+        return node
+
+    def fold_binary(self, node: ast.BinaryOperator):
+        symbol = node.operation
+        left = node.left
+        right = node.right
+        if symbol in stl.LAZY:
+            if not is_constant(left):
+                return node
+            if symbol == "&&" or symbol == "and":
+                result = right if left else False
+            else:
+                result = True if left else right
+        elif is_constant(left) and is_constant(right) and symbol not in UNFOLDED_OPERATORS:
+            try:
+                result = itr.value_arithmetic(left, right, symbol, None, right)
+            except (lib.SplException, ArithmeticError, KeyError, TypeError, ValueError):
+                return node  # leaves the error to the run time
+        elif isinstance(left, ast.LiteralNode) and isinstance(right, ast.LiteralNode):
+            if symbol == "+":
+                result = ast.LiteralNode((node.line_num, node.file), left.literal + right.literal)
+            elif symbol == "==":
+                result = left.literal == right.literal
+            elif symbol == "!=":
+                result = left.literal != right.literal
+            else:
+                return node
+        else:
+            return node
+        self.record(node, "{} -> {}".format(node, result))
+        return result
+
+    # Dead branches
+
+    def eliminate(self, node: ast.Node):
+        t = node.node_type
+        if t == ast.BLOCK_STMT and not node.standalone:
+            lines = []
+            last = len(node.lines) - 1
+            for i, line in enumerate(node.lines):
+                replacement = self.dead_branch(line)
+                if replacement is None:
+                    lines.append(line)
+                else:
+                    lines.extend(replacement)
+                    if i == last and len(replacement) == 0:  # keeps the value of the block
+                        lines.append(0 if line.node_type == ast.WHILE_STMT else None)
+            node.lines = lines
+        elif t == ast.IF_STMT and isinstance(node.else_block, ast.IfStmt):  # an 'else if'
+            replacement = self.dead_branch(node.else_block)
+            if replacement is not None:
+                if len(replacement) == 0:
+                    node.else_block = None
+                else:
+                    block = ast.BlockStmt((node.line_num, node.file))
+                    block.lines = replacement
+                    node.else_block = block
+        elif t == ast.TERNARY_OPERATOR and is_constant(node.left):
+            taken = node.mid if node.left else node.right
+            self.record(node, "{} -> {}".format(node, taken))
+            return taken
+        return node
+
+    def dead_branch(self, node):
+        """
+        Returns the lines replacing a statement with a constant condition, None if the statement is not replaced.
+
+        :param node: the statement, or a raw value
+        :return: the lines replacing the statement, or None
+        """
+        if not isinstance(node, ast.Node):
+            return None
+        t = node.node_type
+        if t == ast.IF_STMT:
+            constant, cond = constant_condition(node.condition)
+            if not constant:
+                return None
+            taken = node.then_block if cond else node.else_block
+            lf = node.line_num, node.file
+            if taken is None:
+                self.record(node, "removed 'if' with false condition")
+                return []
+            elif isinstance(taken, ast.BlockStmt) and not taken.standalone and not declares_names(taken):
+                self.record(node, "inlined the {} branch of 'if' with {} condition".format(
+                    "then" if cond else "else", "true" if cond else "false"))
+                return taken.lines
+            elif isinstance(taken, ast.IfStmt) and not declares_names(taken):
+                self.record(node, "inlined the else branch of 'if' with false condition")
+                return [taken]
+            elif cond and node.else_block is None:
+                return None
+            else:  # the branch keeps its own scope
+                self.record(node, "removed the {} branch of 'if' with {} condition".format(
+                    "else" if cond else "then", "true" if cond else "false"))
+                stmt = ast.IfStmt(lf)
+                stmt.condition = True
+                stmt.then_block = taken
+                return [stmt]
+        elif t == ast.WHILE_STMT:
+            constant, cond = constant_condition(node.condition)
+            if constant and not cond:
+                self.record(node, "removed 'while' with false condition")
+                return []
+        return None
+
+    # Tail calls
+
+    def mark_tail_calls(self, node: ast.Node):
+        if node.node_type == ast.ASSIGNMENT_NODE and isinstance(node.left, ast.NameNode) and \
+                isinstance(node.right, ast.DefStmt) and not node.right.abstract:
+            name = node.left.name
+            declared = set()
+            collect_declarations(node.right, declared)
+            if name not in declared:  # the name is not shadowed inside the function
+                self.mark_recursive_returns(node.right.body, name)
+        return node
+
+    def mark_recursive_returns(self, body, name: str):
+        """
+        Replaces the calls of a name returned by a function body with tail calls.
+
+        Returns inside 'try' statements are not tail positions, since the call must run before the 'catch' and
+        'finally' blocks.
+
+        :param body: the function body
+        :param name: the name the function is defined as
+        :return: None
+        """
+        stack = [body]
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, ast.Node):
+                continue
+            t = node.node_type
+            if t == ast.UNARY_OPERATOR and node.operation == "return":
+                call = node.value
+                if isinstance(call, ast.FuncCall) and isinstance(call.call_obj, ast.NameNode) and \
+                        call.call_obj.name == name and call.args is not None:
+                    node.value = ast.JumpNode((call.line_num, call.file), call)
+                    self.record(node, "tail call of '{}'".format(name))
+                    continue
+            elif t == ast.TRY_STMT or t == ast.DEF_STMT or t == ast.CLASS_STMT:
+                continue
+            stack.extend(ast.children(node))
+
+    # Counted loops
+
+    def mark_counted_loops(self, node: ast.Node):
+        if node.node_type == ast.FOR_LOOP_STMT and len(node.condition.lines) == 3:
+            start, end, step = node.condition.lines
+            if isinstance(start, ast.AssignmentNode) and start.level == ast.VAR and \
+                    isinstance(start.left, ast.NameNode):
+                name = start.left.name
+                if isinstance(end, ast.BinaryOperator) and end.operation in COUNTING_OPERATORS and \
+                        isinstance(end.left, ast.NameNode) and end.left.name == name and \
+                        isinstance(step, ast.InDecrementOperator) and step.is_post and \
+                        step.operation == COUNTING_OPERATORS[end.operation] and \
+                        isinstance(step.value, ast.NameNode) and step.value.name == name and \
+                        not writes_name(end.right, name) and not writes_name(node.body, name):
+                    node.counter = name
+                    self.record(node, "counted loop of '{}'".format(name))
+        return node
+
+    # Literal hoisting
+
+    def hoist(self, node: ast.Node):
+        if node.node_type == ast.LITERAL_NODE:
+            self.record(node, str(node))
+            return lib.String(node.literal)
+        return node
+
+
+# All passes, in the order they run, each is (name, minimum optimization level, visit method)
+PASSES = [
+    ("constant folding", 1, Optimizer.fold),
+    ("dead branches", 1, Optimizer.eliminate),
+    ("tail calls", 1, Optimizer.mark_tail_calls),
+    ("counted loops", 1, Optimizer.mark_counted_loops),
+    ("literal hoisting", 2, Optimizer.hoist),
+]
+
+
+def is_constant(value) -> bool:
+    return value is None or type(value) in CONSTANT_TYPES
+
+
+def constant_condition(condition) -> tuple:
+    """
+    Returns whether a condition is a constant, and its value.
+
+    :param condition: the condition, which is a block of one line if written in parenthesis
+    :return: (True, the value) if the condition is a constant, (False, None) otherwise
+    """
+    if isinstance(condition, ast.BlockStmt) and not condition.standalone and len(condition.lines) == 1:
+        condition = condition.lines[0]
+    if is_constant(condition):
+        return True, condition
+    return False, None
+
+
+def writes_name(node, name: str) -> bool:
+    """
+    Returns True iff evaluating the node may write a name, or it cannot be told statically.
+
+    This is the case for assignments, operator assignments and increments of the name, and for inner functions and
+    classes, or reflection, which may write the name from elsewhere.
+
+    :param node: the node
+    :param name: the name
+    :return: True iff evaluating the node may write the name
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, ast.Node):
+            continue
+        t = node.node_type
+        if t == ast.ASSIGNMENT_NODE and isinstance(node.left, ast.NameNode) and node.left.name == name:
+            return True
+        elif t == ast.BINARY_OPERATOR and node.assignment and isinstance(node.left, ast.NameNode) and \
+                node.left.name == name:
+            return True
+        elif t == ast.IN_DECREMENT_OPERATOR and isinstance(node.value, ast.NameNode) and node.value.name == name:
+            return True
+        elif t == ast.DEF_STMT or t == ast.CLASS_STMT:
+            return True
+        elif t == ast.FUNCTION_CALL and isinstance(node.call_obj, ast.NameNode) and \
+                node.call_obj.name in REFLECTIVE_NAMES:
+            return True
+        stack.extend(ast.children(node))
+    return False
@@ -1,20 +1,31 @@
 from bin import spl_ast as ast, spl_token_lib as stl
 
-ABSTRACT_IDENTIFIER = {"function", "def", "class"}
+UNARY_FOLLOWS = {stl.END_OF_LINE, stl.BINARY, stl.COLON, stl.LEFT_BRACE, stl.RIGHT_BRACE, stl.DOT, stl.COMMA,
+                 stl.TILDE, stl.LEFT_PARENTHESIS, stl.ASSIGN}.union(stl.RESERVED_CODES)  # codes before a unary '-'
 
 
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens: stl.TokenBuffer):
         self.tokens = tokens
 
     def parse(self):
         """
-        Parses the list of tokens stored in this Lexer, and returns the root node of the parsed abstract syntax
+        Parses the buffer of tokens stored in this Parser, and returns the root node of the parsed abstract syntax
         tree.
 
+        The cursor 'i' walks the columns of the buffer directly, without making a Token object for each token.
+
         :return: the parsed block
         """
         parser = ast.AbstractSyntaxTree()
+        tokens = self.tokens
+        kinds = tokens.kinds
+        values = tokens.values
+        lines = tokens.lines
+        files = tokens.files
+        strings = tokens.strings
+        codes = tokens.codes
+        file_names = tokens.file_names
         i = 0
         func_count = 0
         par_count = 0  # count of parenthesis
@@ -32,60 +43,61 @@ class Parser:
 
         while True:
             try:
-                token = self.tokens[i]
-                line = (token.line_number(), token.file_name())
-                if isinstance(token, stl.IdToken):
-                    sym = token.symbol
-                    if sym == "if":
+                kind = kinds[i]
+                line = (lines[i], file_names[files[i]])
+                if kind == stl.ID_TOKEN:
+                    sym = strings[values[i]]
+                    code = codes[values[i]]
+                    if code == stl.NAME:
+                        parser.add_name(line, sym)
+                    elif code == stl.IF:
                         cond_nest_list.append(par_count)
                         par_count += 1
                         parser.add_if(line)
                         i += 1
-                    elif sym == "else":
+                    elif code == stl.ELSE:
                         parser.add_else()
-                    elif sym == "while":
+                    elif code == stl.WHILE:
                         cond_nest_list.append(par_count)
                         par_count += 1
                         parser.add_while(line)
                         i += 1
-                    elif sym == "for":
+                    elif code == stl.FOR:
                         cond_nest_list.append(par_count)
                         par_count += 1
                         parser.add_for_loop(line)
                         i += 1
-                    elif sym == "return":
+                    elif code == stl.RETURN:
                         parser.add_unary(line, "return")
                         # parser.add_return(line)
-                    elif sym == "break":
+                    elif code == stl.BREAK:
                         parser.add_break(line)
-                    elif sym == "continue":
+                    elif code == stl.CONTINUE:
                         parser.add_continue(line)
-                    elif sym == "true" or sym == "false":
+                    elif code == stl.TRUE or code == stl.FALSE:
                         parser.add_bool(line, sym)
-                    elif sym == "null":
+                    elif code == stl.NULL:
                         parser.add_null(line)
-                    elif sym == "const":
+                    elif code == stl.CONST:
                         var_level = ast.CONST
-                    elif sym == "var":
+                    elif code == stl.VAR:
                         var_level = ast.VAR
-                    elif sym == "@":
+                    elif code == stl.AT:
                         i += 1
-                        next_token: stl.IdToken = self.tokens[i]
-                        # titles.append(next_token.symbol)
-                        parser.add_annotation(line, next_token.symbol)
-                    elif sym == "{":
+                        # titles.append(tokens.symbol(i))
+                        parser.add_annotation(line, tokens.symbol(i))
+                    elif code == stl.LEFT_BRACE:
                         brace_count += 1
                         if is_extending:
                             is_extending = False
                             parser.build_extends()
-                        last_token = self.tokens[i - 1]
-                        if isinstance(last_token, stl.IdToken) and \
-                                (last_token.symbol == ")" or  # is a function
-                                 is_identifier_before_block(last_token.symbol)):  # is a class or a dotted import
+                        if kinds[i - 1] == stl.ID_TOKEN and \
+                                (tokens.code(i - 1) == stl.RIGHT_PARENTHESIS or  # is a function
+                                 is_identifier_before_block(tokens.value(i - 1))):  # is a class or a dotted import
                             parser.new_block()
                         else:
                             parser.add_dict()
-                    elif sym == "}":
+                    elif code == stl.RIGHT_BRACE:
                         brace_count -= 1
                         parser.build_block()
                         parser.try_build_func()
@@ -95,17 +107,17 @@ class Parser:
                         elif is_this_list(class_braces, brace_count):
                             parser.build_class()
                             class_braces.pop()
-                        next_token = self.tokens[i + 1]
-                        if not (isinstance(next_token, stl.IdToken) and next_token.symbol in stl.NO_BUILD_LINE):
+                        next_code = tokens.code(i + 1)
+                        if not (next_code == stl.CATCH or next_code == stl.FINALLY):
                             parser.build_line()
-                    elif sym == "(":
-                        if i > 0 and is_call(self.tokens[i - 1]):
+                    elif code == stl.LEFT_PARENTHESIS:
+                        if i > 0 and is_call(tokens, i - 1):
                             parser.add_call(line)
                             call_nest_list.append(par_count)
                         else:
                             parser.add_parenthesis()
                         par_count += 1
-                    elif sym == ")":
+                    elif code == stl.RIGHT_PARENTHESIS:
                         par_count -= 1
                         if is_this_list(call_nest_list, par_count):
                             parser.build_line()
@@ -121,42 +133,39 @@ class Parser:
                         else:
                             parser.build_parenthesis()
                             # extra_precedence -= 1
-                    elif sym == "[":
-                        if i > 0 and is_call(self.tokens[i - 1]):
+                    elif code == stl.LEFT_SQUARE:
+                        if i > 0 and is_call(tokens, i - 1):
                             parser.add_getitem(line)
                         else:
                             square_nest_list.append(square_count)
                             func_name = "list"
-                            if i > 0:
-                                last_token = self.tokens[i - 1]
-                                if isinstance(last_token, stl.IdToken) and last_token.symbol == "~":
-                                    func_name = "array"
+                            if i > 0 and tokens.code(i - 1) == stl.TILDE:
+                                func_name = "array"
                             parser.add_name(line, func_name)
                             parser.add_call(line)
                         square_count += 1
-                    elif sym == "]":
+                    elif code == stl.RIGHT_SQUARE:
                         square_count -= 1
                         if is_this_list(square_nest_list, square_count):  # end of list creation
                             square_nest_list.pop()
                             parser.build_call()
                         else:
                             parser.build_getitem()
-                    elif sym == "=":
+                    elif code == stl.ASSIGN:
                         parser.build_expr()
                         parser.add_assignment(line, var_level)
                         var_level = ast.ASSIGN
-                    elif sym == ",":
+                    elif code == stl.COMMA:
                         if var_level == ast.ASSIGN:  # the normal level
                             parser.build_line()
-                    elif sym == ".":
+                    elif code == stl.DOT:
                         parser.add_dot(line)
-                    elif sym == "~":  # a special mark
+                    elif code == stl.TILDE:  # a special mark
                         pass
-                    elif sym == "function" or sym == "def":
+                    elif code == stl.FUNCTION:
                         func_doc = self.get_doc(i)
                         i += 1
-                        f_token: stl.IdToken = self.tokens[i]
-                        f_name = f_token.symbol
+                        f_name = tokens.symbol(i)
                         push_back = 1
                         if f_name == "(":
                             func_count += 1
@@ -171,99 +180,89 @@ class Parser:
                         param_nest_list.append(par_count)
                         par_count += 1
                         is_abstract = False
-                    elif sym == "operator":
+                    elif code == stl.OPERATOR:
                         func_doc = self.get_doc(i)
                         i += 1
-                        op_token: stl.IdToken = self.tokens[i]
-                        op_name = "__" + stl.BINARY_OPERATORS[op_token.symbol] + "__"
+                        op_name = "__" + stl.BINARY_OPERATORS[tokens.symbol(i)] + "__"
                         parser.add_name(line, op_name)
                         parser.add_assignment(line, ast.FUNC_DEFINE)
                         parser.add_function(line, False, func_doc)
                         param_nest_list.append(par_count)
                         par_count += 1
                         i += 1
-                    elif sym == "class":
+                    elif code == stl.CLASS:
                         class_doc = self.get_doc(i)
                         i += 1
-                        c_token: stl.IdToken = self.tokens[i]
-                        class_name = c_token.symbol
+                        class_name = tokens.symbol(i)
                         if class_name in stl.NO_CLASS_NAME:
                             raise stl.ParseException("Name '{}' is forbidden for class name".format(class_name))
                         parser.add_class(
-                            (c_token.line_number(), c_token.file_name()),
+                            tokens.line_file(i),
                             class_name,
                             is_abstract,
                             class_doc
                         )
                         class_braces.append(brace_count)
                         is_abstract = False
-                    elif sym == "extends":
+                    elif code == stl.EXTENDS:
                         parser.add_extends()
                         is_extending = True
-                    elif sym == "abstract":
-                        next_token = self.tokens[i + 1]
-                        if isinstance(next_token, stl.IdToken) and next_token.symbol in ABSTRACT_IDENTIFIER:
+                    elif code == stl.ABSTRACT:
+                        next_code = tokens.code(i + 1)
+                        if next_code == stl.FUNCTION or next_code == stl.CLASS:
                             is_abstract = True
                         else:
                             raise stl.ParseException("Unexpected token 'abstract', in file '{}', at line {}"
                                                      .format(line[1], line[0]))
                             # parser.add_abstract(line)
-                    elif sym == "new":
+                    elif code == stl.NEW:
                         parser.add_unary(line, "new")
                         # parser.add_class_new(line)
-                    elif sym == "throw":
+                    elif code == stl.THROW:
                         parser.add_unary(line, "throw")
                         # parser.add_throw(line)
-                    elif sym == "try":
+                    elif code == stl.TRY:
                         parser.add_try(line)
-                    elif sym == "catch":
+                    elif code == stl.CATCH:
                         parser.add_catch(line)
                         i += 1
                         cond_nest_list.append(par_count)
                         par_count += 1
-                    elif sym == "finally":
+                    elif code == stl.FINALLY:
                         parser.add_finally(line)
-                    elif sym == "assert":
+                    elif code == stl.ASSERT:
                         parser.add_unary(line, "assert")
-                    elif sym == "namespace":
+                    elif code == stl.NAMESPACE:
                         parser.add_unary(line, "namespace")
-                    elif sym == "++" or sym == "--":
+                    elif code == stl.IN_DECREMENT:
                         parser.add_increment_decrement(line, sym)
-                    elif sym in stl.TERNARY_OPERATORS and \
-                            (parser.is_in_ternary() or stl.TERNARY_OPERATORS[sym]):
+                    elif code == stl.QUESTION or (code == stl.COLON and parser.is_in_ternary()):
                         # This check should go strictly before the check of binary ops
                         if parser.is_in_ternary():
                             parser.finish_ternary(line, sym)
                         else:
                             parser.add_ternary(line, sym)
-                    elif sym in stl.BINARY_OPERATORS:
-                        if sym == "-" and (i == 0 or is_unary(self.tokens[i - 1])):
+                    elif code == stl.BINARY or code == stl.COLON:
+                        if sym == "-" and (i == 0 or is_unary(tokens, i - 1)):
                             parser.add_unary(line, "neg")
-                        elif sym == "*" and (i == 0 or is_unary(self.tokens[i - 1])):
-                            next_token = self.tokens[i + 1]
-                            if isinstance(next_token, stl.IdToken) and next_token.symbol == "*":
+                        elif sym == "*" and (i == 0 or is_unary(tokens, i - 1)):
+                            if kinds[i + 1] == stl.ID_TOKEN and tokens.value(i + 1) == "*":
                                 parser.add_unary(line, "kw_unpack")
                                 i += 1
                             else:
                                 parser.add_unary(line, "unpack")
                         else:
                             parser.add_operator(line, sym)
-                    elif sym in stl.UNARY_OPERATORS:
-                        if sym == "!" or sym == "not":
-                            parser.add_unary(line, "!")
-                        else:
-                            print("Should not be here")
-                    elif sym[:-1] in stl.OP_EQ:
+                    elif code == stl.UNARY:
+                        parser.add_unary(line, "!")
+                    elif code == stl.ASSIGN_OPERATOR:
                         parser.add_operator(line, sym, True)
-                    elif sym == "import":
+                    elif code == stl.IMPORT:
                         i += 2
-                        name_token: stl.IdToken = self.tokens[i - 1]
-                        path_token: stl.IdToken = self.tokens[i]
-                        # print(name_token)
-                        import_name = name_token.symbol
-                        parser.add_import(line, import_name, path_token.symbol)
+                        import_name = tokens.symbol(i - 1)
+                        parser.add_import(line, import_name, tokens.symbol(i))
                         import_braces.append(brace_count)
-                    elif token.is_eol():
+                    elif code == stl.END_OF_LINE:
                         if var_level != ast.ASSIGN:
                             active = parser.get_active()
                             und_vars = active.stack.copy()
@@ -276,29 +275,26 @@ class Parser:
                                 parser.build_line()
                             var_level = ast.ASSIGN
                         parser.build_line()
-                    else:
+                    else:  # 'as' outside of an import
                         parser.add_name(line, sym)
                         # auth = stl.PUBLIC
 
-                elif isinstance(token, stl.NumToken):
-                    value = token.value
-                    parser.add_number(line, value)
-                elif isinstance(token, stl.LiteralToken):
-                    value = token.text
-                    parser.add_literal(line, value)
-                elif isinstance(token, stl.DocToken):
+                elif kind == stl.NUM_TOKEN:
+                    parser.add_number(line, strings[values[i]])
+                elif kind == stl.LITERAL_TOKEN:
+                    parser.add_literal(line, strings[values[i]])
+                elif kind == stl.DOC_TOKEN:
                     pass
-                elif token.is_eof():
+                elif kind == stl.EOF_TOKEN:
                     parser.build_line()
                     break
                 else:
-                    stl.unexpected_token(token)
+                    stl.unexpected_token(tokens.token(i))
                 i += 1
             except stl.ParseException as e:
                 raise e
             except Exception:
-                raise stl.ParseException("Parse error in '{}', at line {}".format(self.tokens[i].file_name(),
-                                                                                  self.tokens[i].line_number()))
+                raise stl.ParseException("Parse error in '{}', at line {}".format(file_names[files[i]], lines[i]))
 
         if par_count != 0 or len(call_nest_list) != 0 or len(cond_nest_list) != 0 or len(param_nest_list) or \
                 len(square_nest_list) != 0 or brace_count != 0:
@@ -308,20 +304,18 @@ class Parser:
         return parser.get_as_block()
 
     def get_doc(self, index):
-        if index > 0:
-            doc_token = self.tokens[index - 1]
-            if isinstance(doc_token, stl.DocToken):
-                return doc_token.text
+        if index > 0 and self.tokens.kinds[index - 1] == stl.DOC_TOKEN:
+            return self.tokens.value(index - 1)
         return ""
 
 
-def is_call(last_token: stl.Token) -> bool:
-    if last_token.is_identifier():
-        last_token: stl.IdToken
-        if (last_token.symbol.isidentifier() and last_token.symbol not in stl.RESERVED) or \
-                last_token.symbol == "." or \
-                last_token.symbol == ")" or \
-                last_token.symbol == "]":
+def is_call(tokens: stl.TokenBuffer, index: int) -> bool:
+    if tokens.kinds[index] == stl.ID_TOKEN:
+        symbol = tokens.value(index)
+        if (symbol.isidentifier() and symbol not in stl.RESERVED) or \
+                symbol == "." or \
+                symbol == ")" or \
+                symbol == "]":
             return True
     return False
 
@@ -348,34 +342,20 @@ def is_this_list(lst: list, count: int) -> bool:
     return len(lst) > 0 and lst[-1] == count
 
 
-def is_unary(last_token):
+def is_unary(tokens: stl.TokenBuffer, index: int) -> bool:
     """
     Returns True iff this should be an unary operator.
     False if it should be a minus operator.
 
-    :param last_token:
-    :type last_token: Token
+    :param tokens: the tokens buffer
+    :param index: the index of the token before the operator
     :return:
     :rtype: bool
     """
-    if isinstance(last_token, stl.IdToken):
-        if last_token.is_eol():
-            return True
-        else:
-            sym = last_token.symbol
-            if sym in stl.BINARY_OPERATORS:
-                return True
-            elif sym in stl.SYMBOLS:
-                return True
-            elif sym == "(":
-                return True
-            elif sym == "=":
-                return True
-            elif sym in stl.RESERVED:
-                return True
-            else:
-                return False
-    elif isinstance(last_token, stl.NumToken):
+    kind = tokens.kinds[index]
+    if kind == stl.ID_TOKEN:
+        return tokens.code(index) in UNARY_FOLLOWS
+    elif kind == stl.NUM_TOKEN:
         return False
     else:
         return True
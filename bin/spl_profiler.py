@@ -0,0 +1,402 @@
+""" The profilers of the spl interpreter.
+
+The sampling profiler interrupts the running program at a fixed interval of cpu time. At each tick, it reads the
+spl call stack from the python frames of the execution engines, so the program itself runs without any
+instrumentation. The samples are reported as collapsed stacks, one line per distinct stack, which flamegraph tools
+read directly, and as a table of the functions with the most samples.
+
+The tracing profiler wraps every call to an spl function, a native function or a method of a native object, and
+records call counts, exclusive and inclusive times and the callers of each function. The statistics are written in
+the format of python's 'pstats', so existing viewers can read them.
+
+The allocation tracker replaces the memory that every spl object takes its id from, and attributes each object to
+its type and to the spl line that created it.
+"""
+
+import marshal
+import os
+import signal
+import sys
+import time
+from bin import spl_ast as ast, spl_interpreter as itr, spl_vm as vm, spl_lib as lib, spl_memory as mem
+
+INTERVAL = 0.005  # seconds of cpu time between two samples
+MAIN = "<main>"
+LAMBDA = "<lambda>"
+
+NATIVE_FILE = "~"  # the file of native functions in 'pstats', as python's profilers name built-ins
+
+PENDING_LIMIT = 256  # number of allocated objects kept until they are measured
+
+RUN_FUNCTION = itr.run_function.__code__
+EXECUTE = vm.execute.__code__
+TRANSPILED = " (transpiled)"
+
+
+class SamplingProfiler:
+    """
+    ===== Attributes =====
+    :param names: the qualified names of the functions of the program, by their bodies
+    :param samples: number of samples of each stack, a stack is a tuple of frame labels, outermost first
+    :param interval: seconds of cpu time between two samples
+    """
+
+    def __init__(self, root: ast.Node, interval: float = INTERVAL):
+        self.names = function_names(root)
+        self.samples = {}
+        self.interval = interval
+
+    def start(self):
+        if not hasattr(signal, "setitimer"):
+            raise OSError("Sampling profiler requires 'signal.setitimer', which this platform does not support")
+        signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def sample(self, signum, frame):
+        stack = tuple(self.label(func) for func in spl_stack(frame))
+        self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def label(self, func: itr.Function) -> str:
+        name = self.names.get(func.body, LAMBDA)
+        return "{} ({}:{})".format(name, os.path.basename(str(func.file)), func.line_num)
+
+    def collapsed(self) -> str:
+        """
+        Returns the samples as collapsed stacks, the input format of flamegraph tools.
+
+        :return: one line per distinct stack, with frames separated by ';' and followed by the number of samples
+        """
+        lines = []
+        for stack, count in sorted(self.samples.items()):
+            lines.append("{} {}".format(";".join((MAIN,) + stack), count))
+        return "\n".join(lines) + "\n"
+
+    def table(self, limit: int) -> str:
+        """
+        Returns a table of the functions with the most samples.
+
+        'self' counts the samples taken while the function itself was running, 'total' also counts the samples
+        taken in the functions it called.
+
+        :param limit: the maximum number of rows
+        :return: the table
+        """
+        self_counts = {}
+        total_counts = {}
+        n = 0
+        for stack, count in self.samples.items():
+            n += count
+            top = stack[-1] if stack else MAIN
+            self_counts[top] = self_counts.get(top, 0) + count
+            for label in set(stack) | {MAIN}:
+                total_counts[label] = total_counts.get(label, 0) + count
+        rows = sorted(total_counts, key=lambda label: (self_counts.get(label, 0), total_counts[label]), reverse=True)
+        lines = ["{:>8}  {:>7}  {:>8}  {:>7}  {}".format("self", "self%", "total", "total%", "function")]
+        for label in rows[:limit]:
+            s = self_counts.get(label, 0)
+            t = total_counts[label]
+            lines.append("{:>8}  {:>6.1f}%  {:>8}  {:>6.1f}%  {}".format(s, s * 100 / n, t, t * 100 / n, label))
+        lines.append("{} samples, {}s interval".format(n, self.interval))
+        return "\n".join(lines)
+
+
+class TracingProfiler:
+    """
+    ===== Attributes =====
+    :param names: the qualified names of the functions of the program, by their bodies
+    :param stats: the statistics of each function, by its 'pstats' key (file, line, name), as
+    [primitive calls, calls, exclusive time, inclusive time, {caller key: [the same four values]}]
+    :param stack: the running calls, as [key, start time, time spent in callees]
+    :param active: number of running calls of each function, calls made while it is positive are recursive
+    """
+
+    def __init__(self, root: ast.Node, script: str):
+        self.names = function_names(root)
+        self.main = (str(script), 0, MAIN)
+        self.stats = {}
+        self.stack = []
+        self.active = {}
+        self.caller = None
+        self.native_call = None
+        self.native_types_call = None
+
+    def start(self):
+        self.caller = itr.call_function
+        self.native_call = itr.NativeFunction.call
+        self.native_types_call = itr.native_types_call
+        itr.set_function_caller(self.traced_caller)
+        itr.NativeFunction.call = self.traced_native_call()
+        itr.native_types_call = self.traced_native_types_call
+        self.enter(self.main)
+
+    def stop(self):
+        while self.stack:  # calls left running by an error
+            self.exit()
+        itr.set_function_caller(None if self.caller is itr.TREE_CALLER else self.caller)
+        itr.NativeFunction.call = self.native_call
+        itr.native_types_call = self.native_types_call
+
+    def traced_caller(self, args: list, lf: tuple, func: itr.Function, call_env):
+        name = self.names.get(func.body, LAMBDA)
+        self.enter((str(func.file), func.line_num, name))
+        try:
+            return self.caller(args, lf, func, call_env)
+        finally:
+            self.exit()
+
+    def traced_native_call(self):
+        profiler = self
+        native_call = self.native_call
+
+        def call(func: itr.NativeFunction, env, args, kwargs):
+            profiler.enter((NATIVE_FILE, 0, "<native {}>".format(func.name)))
+            try:
+                return native_call(func, env, args, kwargs)
+            finally:
+                profiler.exit()
+
+        return call
+
+    def traced_native_types_call(self, instance, call_obj: ast.NameNode, arg_list: list, env):
+        self.enter((NATIVE_FILE, 0, "<method {}.{}>".format(itr.typeof(instance), call_obj.name)))
+        try:
+            return self.native_types_call(instance, call_obj, arg_list, env)
+        finally:
+            self.exit()
+
+    def enter(self, key: tuple):
+        self.stack.append([key, time.perf_counter(), 0.0])
+        self.active[key] = self.active.get(key, 0) + 1
+
+    def exit(self):
+        key, start, in_callees = self.stack.pop()
+        total = time.perf_counter() - start
+        own = total - in_callees
+        self.active[key] -= 1
+        primitive = self.active[key] == 0  # the outermost running call of a recursion
+        if key not in self.stats:
+            self.stats[key] = [0, 0, 0.0, 0.0, {}]
+        entry = self.stats[key]
+        add_call(entry, primitive, own, total)
+        if self.stack:
+            caller = self.stack[-1]
+            caller[2] += total
+            callers = entry[4]
+            if caller[0] not in callers:
+                callers[caller[0]] = [0, 0, 0.0, 0.0]
+            add_call(callers[caller[0]], primitive, own, total)
+
+    def dump(self, path: str):
+        """
+        Writes the statistics to a file, which 'pstats.Stats' can load.
+
+        :param path: the path of the file
+        :return: None
+        """
+        stats = {}
+        for key, (cc, nc, tt, ct, callers) in self.stats.items():
+            edges = {}
+            for caller, (edge_cc, edge_nc, edge_tt, edge_ct) in callers.items():
+                edges[caller] = (edge_nc, edge_cc, edge_tt, edge_ct)  # 'pstats' puts the calls first in edges
+            stats[key] = (cc, nc, tt, ct, edges)
+        with open(path, "wb") as f:
+            marshal.dump(stats, f)
+
+
+class AllocationTracker(mem.Memory):
+    """
+    A memory that records every allocation.
+
+    Objects are allocated before their own initializer runs, so they are measured a little later, in batches.
+
+    ===== Attributes =====
+    :param allocations: number of objects and their bytes, by (type name, site)
+    :param pending: the allocated objects not yet measured, as (key, object)
+    :param memory: the memory replaced by this tracker
+    """
+
+    def __init__(self):
+        mem.Memory.__init__(self)
+        self.allocations = {}
+        self.pending = []
+        self.memory = None
+
+    def start(self):
+        self.memory = mem.MEMORY
+        self.object_counter = self.memory.object_counter
+        self.store = self.memory.store
+        mem.MEMORY = self
+
+    def stop(self):
+        self.measure()
+        self.memory.object_counter = self.object_counter
+        self.memory.store = self.store
+        mem.MEMORY = self.memory
+
+    def allocate(self, obj) -> int:
+        self.pending.append(((type_name(obj), spl_site(sys._getframe(1))), obj))
+        if len(self.pending) >= PENDING_LIMIT:
+            self.measure()
+        return mem.Memory.allocate(self, obj)
+
+    def measure(self):
+        for key, obj in self.pending:
+            if key in self.allocations:
+                entry = self.allocations[key]
+            else:
+                entry = [0, 0]
+                self.allocations[key] = entry
+            entry[0] += 1
+            entry[1] += object_size(obj)
+        self.pending.clear()
+
+    def table(self, limit: int) -> str:
+        """
+        Returns a table of the types and sites that allocated the most bytes.
+
+        :param limit: the maximum number of rows
+        :return: the table
+        """
+        rows = sorted(self.allocations.items(), key=lambda item: item[1][1], reverse=True)
+        lines = ["{:>10}  {:>12}  {:<24}  {}".format("count", "bytes", "type", "site")]
+        for (name, site), (count, size) in rows[:limit]:
+            lines.append("{:>10}  {:>12}  {:<24}  {}".format(count, size, name, site))
+        lines.append("{} objects, {} bytes".format(sum(entry[0] for entry in self.allocations.values()),
+                                                   sum(entry[1] for entry in self.allocations.values())))
+        return "\n".join(lines)
+
+
+def type_name(obj) -> str:
+    """
+    Returns the name of the type of an spl object, the class name for instances of spl classes.
+
+    :param obj: the object
+    :return: the type name
+    """
+    if isinstance(obj, itr.ClassInstance):
+        return obj.class_name
+    elif isinstance(obj, lib.NativeType):
+        return obj.type_name__()
+    else:
+        return type(obj).__name__
+
+
+def object_size(obj) -> int:
+    """
+    Returns the approximate bytes of an spl object, which are the object, its attributes dict and the python
+    containers it holds directly, either in that dict or in its slots.
+
+    :param obj: the object
+    :return: the approximate bytes
+    """
+    size = sys.getsizeof(obj)
+    attrs = getattr(obj, "__dict__", None)
+    values = []
+    if attrs is not None:
+        size += sys.getsizeof(attrs)
+        values.extend(attrs.values())
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            if hasattr(obj, name):
+                values.append(getattr(obj, name))
+    for value in values:
+        if isinstance(value, (str, list, dict, set)):
+            size += sys.getsizeof(value)
+    if isinstance(obj, itr.ClassInstance):
+        size += sys.getsizeof(obj.env) + sys.getsizeof(obj.env.variables) + sys.getsizeof(obj.env.constants)
+    return size
+
+
+def spl_site(frame) -> str:
+    """
+    Returns the spl line that a python frame is running, as 'file:line'.
+
+    The line is the one of the innermost node being evaluated. Compiled functions of the virtual machine and the
+    transpiler have no nodes in their frames, so their definition is returned instead.
+
+    :param frame: the innermost python frame
+    :return: the site
+    """
+    while frame is not None:
+        code = frame.f_code
+        if code is RUN_FUNCTION or code is EXECUTE or \
+                (code.co_filename.endswith(TRANSPILED) and code.co_argcount > 0 and code.co_varnames[0] == "func"):
+            func = frame.f_locals["func"]
+            return "function at {}:{}".format(os.path.basename(str(func.file)), func.line_num)
+        if "node" in code.co_varnames or "node" in code.co_freevars:
+            node = frame.f_locals.get("node")
+            if isinstance(node, ast.Node) and node.line_num > 0:
+                return "{}:{}".format(os.path.basename(str(node.file)), node.line_num)
+        frame = frame.f_back
+    return MAIN
+
+
+def add_call(entry: list, primitive: bool, own: float, total: float):
+    """
+    Adds a finished call to the statistics of a function, or of a caller of the function.
+
+    The inclusive time is only added for the outermost call of a recursion, so it is not counted twice.
+
+    :param entry: [primitive calls, calls, exclusive time, inclusive time, ...]
+    :param primitive: whether the call is not a recursive call
+    :param own: the time spent in the function itself
+    :param total: the time spent in the function and its callees
+    :return: None
+    """
+    entry[1] += 1
+    entry[2] += own
+    if primitive:
+        entry[0] += 1
+        entry[3] += total
+
+
+def spl_stack(frame) -> list:
+    """
+    Returns the spl functions running in a python stack, outermost first.
+
+    Functions run by the tree-walker or the closure compiler have a 'run_function' frame, functions run by the
+    virtual machine are the frames of an 'execute' loop, and transpiled functions have their own python frames
+    that take the function as the first argument.
+
+    :param frame: the innermost python frame
+    :return: the spl functions
+    """
+    funcs = []
+    while frame is not None:
+        code = frame.f_code
+        if code is RUN_FUNCTION:
+            funcs.append(frame.f_locals["func"])
+        elif code is EXECUTE:
+            local_vars = frame.f_locals
+            funcs.append(local_vars["func"])
+            funcs.extend(f[0] for f in reversed(local_vars["frames"]))
+        elif code.co_filename.endswith(TRANSPILED) and code.co_argcount > 0 and code.co_varnames[0] == "func":
+            funcs.append(frame.f_locals["func"])
+        frame = frame.f_back
+    funcs.reverse()
+    return funcs
+
+
+def function_names(root: ast.Node) -> dict:
+    """
+    Returns the qualified names of the functions defined in a tree, such as 'foo' or 'Class.method'.
+
+    :param root: the root of the tree
+    :return: the names, by the function bodies
+    """
+    names = {}
+    stack = [(root, "")]
+    while stack:
+        node, prefix = stack.pop()
+        if isinstance(node, ast.AssignmentNode) and isinstance(node.right, ast.DefStmt) and \
+                isinstance(node.left, ast.NameNode):
+            names[node.right.body] = prefix + node.left.name
+        elif isinstance(node, ast.ClassStmt):
+            prefix = prefix + node.class_name + "."
+        if isinstance(node, ast.Node):
+            stack.extend((child, prefix) for child in ast.children(node))
+    return names
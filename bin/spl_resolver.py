@@ -0,0 +1,329 @@
+""" The static scope resolver of the spl interpreter.
+
+Runs once over the abstract syntax tree after parsing, and annotates every name read with where its value lives:
+
+* 'depth', the number of environments between the reading environment and the one declaring the name, for names
+  declared in the same function, module or global code, following the environments the tree-walker creates for
+  blocks and loops;
+* 'HEAP_NAME', for names of the global heap that are not declared anywhere in the program, whose lookup would
+  otherwise walk the whole environment chain and all namespaces.
+
+It also marks the blocks of 'if' and 'try' statements that declare no names, which run directly in the environment
+of the statement instead of a sub environment of their own, and the loop bodies that declare no names, whose block
+scopes need not be cleared between iterations. The resolved depths follow this layout.
+
+Names that cannot be resolved statically, for example attributes of class bodies, which also hold inherited
+attributes, or names inside code using 'eval', are left unresolved and looked up by the environment chain.
+A depth lookup never leaves the function it was resolved in, and falls back to the chain lookup if the name is not
+found there, so environments built differently from the resolved layout still look up correctly.
+"""
+
+from bin import spl_ast as ast
+from bin.spl_bytecode import REFLECTIVE_NAMES
+
+
+def resolve(root: ast.Node, heap: dict):
+    """
+    Annotates all name reads in the tree.
+
+    :param root: the root of the abstract syntax tree
+    :param heap: the heap of the global environment
+    :return: None
+    """
+    declared = set()
+    collect_declarations(root, declared)
+    resolver = Resolver({name for name in heap if name not in declared})
+    resolver.resolve_main(root, None if is_reflective(root) else ())
+
+
+def collect_declarations(node, declared: set):
+    """
+    Collects all names declared by the tree.
+
+    :param node: the root of the tree
+    :param declared: the set of names to be filled
+    :return: None
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, ast.Node):
+            continue
+        t = node.node_type
+        if t == ast.ASSIGNMENT_NODE and node.level != ast.ASSIGN and isinstance(node.left, ast.NameNode):
+            declared.add(node.left.name)
+        elif t == ast.DEF_STMT:
+            for p in node.params.lines:
+                if isinstance(p, ast.NameNode):
+                    declared.add(p.name)
+                elif isinstance(p, ast.AssignmentNode) and isinstance(p.left, ast.NameNode):
+                    declared.add(p.left.name)
+                elif isinstance(p, ast.UnaryOperator) and isinstance(p.value, ast.NameNode):
+                    declared.add(p.value.name)
+        elif t == ast.CLASS_STMT:
+            declared.add(node.class_name)
+        elif t == ast.IMPORT_NODE:
+            declared.update(node.import_name.split("."))
+        elif t == ast.CATCH_STMT:
+            for line in node.condition.lines:
+                if isinstance(line, ast.BinaryOperator) and isinstance(line.left, ast.NameNode):
+                    declared.add(line.left.name)
+        stack.extend(ast.children(node))
+
+
+def declares_names(node) -> bool:
+    """
+    Returns True iff evaluating the node may declare names in the environment it runs in.
+
+    Nested scopes are not searched, since their declarations are local to them.
+
+    :param node: the node
+    :return: True iff the node may declare names in its environment
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, ast.Node):
+            continue
+        t = node.node_type
+        if t == ast.ASSIGNMENT_NODE and node.level != ast.ASSIGN:
+            return True
+        elif t == ast.CLASS_STMT or t == ast.IMPORT_NODE:
+            return True
+        elif t == ast.UNARY_OPERATOR and node.operation == "namespace":
+            return True
+        elif t == ast.FUNCTION_CALL and isinstance(node.call_obj, ast.NameNode) and \
+                node.call_obj.name in REFLECTIVE_NAMES:
+            return True
+        elif t == ast.IF_STMT:
+            stack.append(node.condition)
+        elif t == ast.WHILE_STMT or t == ast.FOR_LOOP_STMT or t == ast.DEF_STMT or t == ast.TRY_STMT:
+            continue
+        else:
+            stack.extend(ast.children(node))
+    return False
+
+
+def is_reflective(node) -> bool:
+    """
+    Returns True iff the node calls a function that reads or defines names of its calling environment.
+
+    Function, class and module bodies are not searched since they run in their own environments.
+
+    :param node: the node to be searched
+    :return: True iff the node calls a function that reads or defines names of its calling environment
+    """
+    if not isinstance(node, ast.Node):
+        return False
+    if node.node_type == ast.FUNCTION_CALL and isinstance(node.call_obj, ast.NameNode) and \
+            node.call_obj.name in REFLECTIVE_NAMES:
+        return True
+    elif node.node_type == ast.DEF_STMT or node.node_type == ast.CLASS_STMT or node.node_type == ast.IMPORT_NODE:
+        return False
+    return any(is_reflective(child) for child in ast.children(node))
+
+
+class Resolver:
+    """
+    Annotates the name reads of a tree.
+
+    ===== Attributes =====
+    :param heap_names: names of the global heap that are not declared in the program
+    :param scopes: the scopes from the main scope of the current function, module or global code to the innermost
+        one, each is a set of declared names, or None if names are not resolved in the current context
+    """
+
+    def __init__(self, heap_names: set):
+        self.heap_names = heap_names
+        self.scopes = None
+
+    def resolve(self, node):
+        """
+        Resolves a node and its children.
+
+        :param node: the node, or a raw value
+        :return: None
+        """
+        if isinstance(node, ast.Node):
+            method = RESOLVE_TABLE.get(node.node_type, Resolver.resolve_children)
+            method(self, node)
+
+    def resolve_children(self, node: ast.Node):
+        for child in ast.children(node):
+            self.resolve(child)
+
+    def resolve_scoped(self, node, names=(), scoped=True):
+        """
+        Resolves a node in a new sub scope.
+
+        :param node: the node
+        :param names: names declared in the new scope before the node runs
+        :param scoped: whether the node runs in a new scope, the node is resolved in the current scope if not
+        :return: None
+        """
+        if self.scopes is None or not scoped:
+            self.resolve(node)
+        else:
+            self.scopes.append(set(names))
+            self.resolve(node)
+            self.scopes.pop()
+
+    def resolve_main(self, node, names):
+        """
+        Resolves a node in a new main scope, such as a function body.
+
+        :param node: the node
+        :param names: names declared in the new scope before the node runs, None if names are not resolved there
+        :return: None
+        """
+        outer_scopes = self.scopes
+        self.scopes = None if names is None else [set(names)]
+        self.resolve(node)
+        self.scopes = outer_scopes
+
+    def declare(self, name: str):
+        if self.scopes is not None:
+            self.scopes[-1].add(name)
+
+    def resolve_name(self, node: ast.NameNode):
+        name = node.name
+        if self.scopes is not None:
+            last = len(self.scopes) - 1
+            for i in range(last, -1, -1):
+                if name in self.scopes[i]:
+                    node.depth = last - i
+                    return
+        if name in self.heap_names:
+            node.depth = ast.HEAP_NAME
+
+    def resolve_assignment(self, node: ast.AssignmentNode):
+        self.resolve(node.right)
+        key = node.left
+        if isinstance(key, ast.NameNode):
+            if node.level != ast.ASSIGN:
+                self.declare(key.name)
+        elif isinstance(key, ast.Dot):
+            self.resolve(key.left)
+        else:
+            self.resolve(key)
+
+    def resolve_dot(self, node: ast.Dot):
+        self.resolve(node.left)
+        if isinstance(node.right, ast.FuncCall):
+            self.resolve_args(node.right.args)
+
+    def resolve_args(self, args):
+        if isinstance(args, ast.BlockStmt):
+            for arg in args.lines:
+                if isinstance(arg, ast.AssignmentNode):  # keyword argument
+                    self.resolve(arg.right)
+                else:
+                    self.resolve(arg)
+
+    def resolve_func_call(self, node: ast.FuncCall):
+        self.resolve(node.call_obj)
+        self.resolve_args(node.args)
+
+    def resolve_block(self, node: ast.BlockStmt):
+        if node.standalone:  # pair or set literal, keys are evaluated
+            for line in node.lines:
+                if isinstance(line, ast.AssignmentNode):
+                    self.resolve(line.left)
+                    self.resolve(line.right)
+                else:
+                    self.resolve(line)
+        else:
+            for line in node.lines:
+                self.resolve(line)
+
+    def resolve_if(self, node: ast.IfStmt):
+        self.resolve(node.condition)
+        node.then_scoped = declares_names(node.then_block)
+        node.else_scoped = declares_names(node.else_block)
+        self.resolve_scoped(node.then_block, scoped=node.then_scoped)
+        self.resolve_scoped(node.else_block, scoped=node.else_scoped)
+
+    def resolve_loop(self, node):
+        """
+        Resolves a loop, whose title scope holds the names declared in its condition.
+
+        :param node: the loop node
+        :return: None
+        """
+        if self.scopes is not None:
+            self.scopes.append(set())
+        if node.node_type == ast.WHILE_STMT:
+            self.resolve(node.condition)
+        else:
+            lines = node.condition.lines
+            if len(lines) == 2 and isinstance(lines[0], ast.NameNode):  # the invariant is only assigned
+                self.resolve(lines[1])
+            else:
+                for line in lines:
+                    self.resolve(line)
+        node.body_declares = declares_names(node.body)
+        self.resolve_scoped(node.body)
+        if self.scopes is not None:
+            self.scopes.pop()
+
+    def resolve_def(self, node: ast.DefStmt):
+        names = []
+        for p in node.params.lines:
+            if isinstance(p, ast.NameNode):
+                names.append(p.name)
+            elif isinstance(p, ast.AssignmentNode) and isinstance(p.left, ast.NameNode):
+                self.resolve(p.right)  # presets are evaluated where the function is defined
+                names.append(p.left.name)
+            elif isinstance(p, ast.UnaryOperator) and isinstance(p.value, ast.NameNode):
+                names.append(p.value.name)
+        self.resolve_main(node.body, None if is_reflective(node.body) else names)
+
+    def resolve_class(self, node: ast.ClassStmt):
+        for superclass in node.superclass_nodes:
+            self.resolve(superclass)
+        self.declare(node.class_name)
+        # class bodies run in instance environments, which also hold inherited attributes
+        self.resolve_main(node.block, None)
+
+    def resolve_try(self, node: ast.TryStmt):
+        node.try_scoped = declares_names(node.try_block)
+        node.finally_scoped = declares_names(node.finally_block)
+        self.resolve_scoped(node.try_block, scoped=node.try_scoped)
+        for cat in node.catch_blocks:
+            names = []
+            for line in cat.condition.lines:
+                if isinstance(line, ast.BinaryOperator) and isinstance(line.left, ast.NameNode):
+                    self.resolve(line.right)
+                    names.append(line.left.name)
+            self.resolve_scoped(cat.then, names)
+        self.resolve_scoped(node.finally_block, scoped=node.finally_scoped)
+
+    def resolve_import(self, node: ast.ImportNode):
+        self.resolve_main(node.block, None if is_reflective(node.block) else ())
+        self.declare(node.import_name.split(".")[0])
+
+    def resolve_annotation(self, node: ast.AnnotationNode):
+        if node.args is not None:
+            for line in node.args.lines:  # evaluated as a pair literal
+                if isinstance(line, ast.AssignmentNode):
+                    self.resolve(line.left)
+                    self.resolve(line.right)
+        self.resolve(node.body)
+
+
+# Resolve methods of node types, other node types have their children resolved in the same scope
+RESOLVE_TABLE = {
+    ast.NAME_NODE: Resolver.resolve_name,
+    ast.ASSIGNMENT_NODE: Resolver.resolve_assignment,
+    ast.DOT: Resolver.resolve_dot,
+    ast.BLOCK_STMT: Resolver.resolve_block,
+    ast.IF_STMT: Resolver.resolve_if,
+    ast.WHILE_STMT: Resolver.resolve_loop,
+    ast.FOR_LOOP_STMT: Resolver.resolve_loop,
+    ast.FUNCTION_CALL: Resolver.resolve_func_call,
+    ast.DEF_STMT: Resolver.resolve_def,
+    ast.CLASS_STMT: Resolver.resolve_class,
+    ast.TRY_STMT: Resolver.resolve_try,
+    ast.IMPORT_NODE: Resolver.resolve_import,
+    ast.ANNOTATION_NODE: Resolver.resolve_annotation,
+}
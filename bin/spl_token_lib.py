@@ -1,4 +1,6 @@
 import io
+import sys
+from array import array
 
 EOF = -1
 EOL = ";"
@@ -31,6 +33,76 @@ NO_BUILD_LINE = {"catch", "finally"}
 
 NO_CLASS_NAME = {"Object"}
 
+# Token kinds, also the flags of the tokens in '.lsp' files
+EOF_TOKEN = 0
+NUM_TOKEN = 1
+LITERAL_TOKEN = 2
+ID_TOKEN = 3
+DOC_TOKEN = 4
+
+LSP_MAGIC = b"LSP\x03"  # the header of a '.lsp' file, followed by the byte order of its columns and the main script
+
+# Symbol codes, the 'code' of an IdToken
+NAME = 0  # any other symbol, such as a variable name
+IF = 1
+ELSE = 2
+WHILE = 3
+FOR = 4
+RETURN = 5
+BREAK = 6
+CONTINUE = 7
+TRUE = 8
+FALSE = 9
+NULL = 10
+CONST = 11
+VAR = 12
+AT = 13
+LEFT_BRACE = 14
+RIGHT_BRACE = 15
+LEFT_PARENTHESIS = 16
+RIGHT_PARENTHESIS = 17
+LEFT_SQUARE = 18
+RIGHT_SQUARE = 19
+ASSIGN = 20
+COMMA = 21
+DOT = 22
+TILDE = 23
+FUNCTION = 24
+OPERATOR = 25
+CLASS = 26
+EXTENDS = 27
+ABSTRACT = 28
+NEW = 29
+THROW = 30
+TRY = 31
+CATCH = 32
+FINALLY = 33
+ASSERT = 34
+NAMESPACE = 35
+IMPORT = 36
+AS = 37
+IN_DECREMENT = 38
+QUESTION = 39
+COLON = 40
+BINARY = 41  # binary operators except ':', which may also end a ternary operator
+UNARY = 42
+ASSIGN_OPERATOR = 43
+END_OF_LINE = 44
+
+SYMBOL_CODES = {"if": IF, "else": ELSE, "while": WHILE, "for": FOR, "return": RETURN, "break": BREAK,
+                "continue": CONTINUE, "true": TRUE, "false": FALSE, "null": NULL, "const": CONST, "var": VAR,
+                "@": AT, "{": LEFT_BRACE, "}": RIGHT_BRACE, "(": LEFT_PARENTHESIS, ")": RIGHT_PARENTHESIS,
+                "[": LEFT_SQUARE, "]": RIGHT_SQUARE, "=": ASSIGN, ",": COMMA, ".": DOT, "~": TILDE,
+                "function": FUNCTION, "def": FUNCTION, "operator": OPERATOR, "class": CLASS, "extends": EXTENDS,
+                "abstract": ABSTRACT, "new": NEW, "throw": THROW, "try": TRY, "catch": CATCH, "finally": FINALLY,
+                "assert": ASSERT, "namespace": NAMESPACE, "import": IMPORT, "as": AS, "++": IN_DECREMENT,
+                "--": IN_DECREMENT, "?": QUESTION, ":": COLON, EOL: END_OF_LINE}
+SYMBOL_CODES.update({op: BINARY for op in BINARY_OPERATORS if op != ":"})
+SYMBOL_CODES.update({op: UNARY for op in UNARY_OPERATORS})
+SYMBOL_CODES.update({op + "=": ASSIGN_OPERATOR for op in OP_EQ})
+ASSIGN_OPERATORS = {op + "=": op for op in OP_EQ}  # assignment operator : its arithmetic operator
+RESERVED_CODES = {SYMBOL_CODES[word] for word in RESERVED}
+
 
 # PUBLIC = 0
 # PRIVATE = 1
@@ -90,6 +162,7 @@ def read_string(f: io.BytesIO) -> str:
 
 
 class Token:
+    __slots__ = ("line", "file")
 
     def __init__(self, line):
         self.line: int = line[0]
@@ -139,6 +212,8 @@ class Token:
 
 
 class NumToken(Token):
+    __slots__ = ("value",)
+
     def __init__(self, line, v):
         Token.__init__(self, line)
 
@@ -158,6 +233,8 @@ class NumToken(Token):
 
 
 class LiteralToken(Token):
+    __slots__ = ("text",)
+
     def __init__(self, line, t: str):
         Token.__init__(self, line)
 
@@ -177,6 +254,8 @@ class LiteralToken(Token):
 
 
 class DocToken(Token):
+    __slots__ = ("text",)
+
     def __init__(self, line, t: str):
         Token.__init__(self, line)
 
@@ -196,10 +275,18 @@ class DocToken(Token):
 
 
 class IdToken(Token):
+    """
+    ===== Attributes =====
+    :param symbol: the interned symbol, so equal symbols are the same str object
+    :param code: the symbol code of the keyword or operator, or NAME
+    """
+    __slots__ = ("symbol", "code")
+
     def __init__(self, line, s):
         Token.__init__(self, line)
 
-        self.symbol: str = s
+        self.symbol: str = sys.intern(s)
+        self.code: int = SYMBOL_CODES.get(s, NAME)
 
     def __eq__(self, other):
         return isinstance(other, IdToken) and other.symbol == self.symbol
@@ -223,6 +310,180 @@ class IdToken(Token):
         return self.__str__()
 
 
+class TokenBuffer:
+    """
+    A list of tokens, stored as parallel integer columns instead of one Token object per token.
+
+    Symbols, numbers and texts are stored once in the string table, and file names once in the file table. A token
+    is its index in the columns.
+
+    ===== Attributes =====
+    :param kinds: the kind of each token, such as ID_TOKEN
+    :param values: the index of the symbol, number or text of each token in 'strings'
+    :param lines: the line number of each token
+    :param files: the index of the file name of each token in 'file_names'
+    :param strings: the string table, whose strings are interned
+    :param codes: the symbol code of each string in 'strings', see 'SYMBOL_CODES'
+    :param file_names: the file table
+    """
+
+    def __init__(self):
+        self.kinds = array("i")
+        self.values = array("i")
+        self.lines = array("i")
+        self.files = array("i")
+        self.strings = []
+        self.codes = array("i")
+        self.file_names = []
+        self.string_ids = {}
+        self.file_ids = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __repr__(self):
+        return repr([self.token(i) for i in range(len(self))])
+
+    def string_id(self, s: str) -> int:
+        """
+        Returns the index of a string in the string table, adding it if absent.
+
+        :param s: the string
+        :return: the index
+        """
+        if s in self.string_ids:
+            return self.string_ids[s]
+        index = len(self.strings)
+        self.strings.append(sys.intern(s))
+        self.codes.append(SYMBOL_CODES.get(s, NAME))
+        self.string_ids[s] = index
+        return index
+
+    def file_id(self, file_name: str) -> int:
+        if file_name in self.file_ids:
+            return self.file_ids[file_name]
+        index = len(self.file_names)
+        self.file_names.append(file_name)
+        self.file_ids[file_name] = index
+        return index
+
+    def append(self, kind: int, value: str, line: tuple):
+        """
+        Appends a token.
+
+        :param kind: the kind of the token
+        :param value: the symbol, number or text of the token, with escapes already replaced
+        :param line: the line number and the file name of the token
+        """
+        self.kinds.append(kind)
+        self.values.append(self.string_id(value))
+        self.lines.append(line[0])
+        self.files.append(self.file_id(line[1]))
+
+    def extend(self, other, stop: int):
+        """
+        Appends the first tokens of another buffer.
+
+        :param other: the other buffer
+        :param stop: the number of tokens to append
+        """
+        strings = [self.string_id(s) for s in other.strings]
+        files = [self.file_id(f) for f in other.file_names]
+        self.kinds.extend(other.kinds[:stop])
+        self.values.extend(strings[v] for v in other.values[:stop])
+        self.lines.extend(other.lines[:stop])
+        self.files.extend(files[f] for f in other.files[:stop])
+
+    def pop(self, index: int):
+        self.kinds.pop(index)
+        self.values.pop(index)
+        self.lines.pop(index)
+        self.files.pop(index)
+
+    def value(self, index: int) -> str:
+        """
+        Returns the symbol, number or text of a token.
+        """
+        return self.strings[self.values[index]]
+
+    def symbol(self, index: int) -> str:
+        """
+        Returns the symbol of a token, which must be an identifier.
+        """
+        if self.kinds[index] != ID_TOKEN:
+            unexpected_token(self.token(index))
+        return self.strings[self.values[index]]
+
+    def code(self, index: int) -> int:
+        """
+        Returns the symbol code of a token, or NAME if it is not an identifier.
+        """
+        return self.codes[self.values[index]] if self.kinds[index] == ID_TOKEN else NAME
+
+    def line_file(self, index: int) -> tuple:
+        return self.lines[index], self.file_names[self.files[index]]
+
+    def token(self, index: int) -> Token:
+        """
+        Returns a Token object of a token.
+        """
+        kind = self.kinds[index]
+        lf = self.line_file(index)
+        value = self.value(index)
+        if kind == ID_TOKEN:
+            return IdToken(lf, value)
+        elif kind == NUM_TOKEN:
+            return NumToken(lf, value)
+        elif kind == LITERAL_TOKEN:
+            token = LiteralToken(lf, "")
+            token.text = value
+            return token
+        elif kind == DOC_TOKEN:
+            return DocToken(lf, value)
+        else:
+            return Token(lf)
+
+    def to_binary(self, main_file: str) -> bytes:
+        """
+        Returns the content of a '.lsp' file of this buffer: the header, the name of the main script, the number of
+        tokens, the four columns, and then the string table and the file table.
+
+        :param main_file: the name of the main script, which 'main()' compares against
+        :return: the bytes
+        """
+        parts = [LSP_MAGIC, bytes([sys.byteorder == "big"]), string_to_bytes(main_file), len(self).to_bytes(4, "big"),
+                 self.kinds.tobytes(), self.values.tobytes(), self.lines.tobytes(), self.files.tobytes(),
+                 len(self.strings).to_bytes(4, "big")]
+        parts.extend(string_to_bytes(s) for s in self.strings)
+        parts.append(len(self.file_names).to_bytes(4, "big"))
+        parts.extend(string_to_bytes("" if f is None else f) for f in self.file_names)
+        return b"".join(parts)
+
+    @classmethod
+    def from_binary(cls, f: io.BytesIO):
+        """
+        Reads a buffer from a '.lsp' file written by 'to_binary'.
+
+        :param f: the file, opened in binary mode
+        :return: the name of the main script, and the buffer
+        """
+        if f.read(len(LSP_MAGIC)) != LSP_MAGIC:
+            raise LexerException("Not a linked spl script of this version")
+        swap = (f.read(1) == b"\x01") != (sys.byteorder == "big")
+        main_file = read_string(f)
+        n = int.from_bytes(f.read(4), "big")
+        buffer = cls()
+        for column in (buffer.kinds, buffer.values, buffer.lines, buffer.files):
+            column.frombytes(f.read(n * column.itemsize))
+            if swap:
+                column.byteswap()
+        for _ in range(int.from_bytes(f.read(4), "big")):
+            buffer.string_id(read_string(f))
+        for _ in range(int.from_bytes(f.read(4), "big")):
+            buffer.file_id(read_string(f) or None)
+        return main_file, buffer
+
+
 class LexerException(Exception):
     def __init__(self, msg=""):
         Exception.__init__(self, msg)
@@ -0,0 +1,958 @@
+""" The python transpiler of the spl interpreter.
+
+Every spl function in the program is translated into python source, which is compiled by python's 'compile()' and
+run by CPython itself. Local variables of a function become python locals wherever the bytecode compiler's
+analysis proves it safe, i.e. the function defines no inner functions or classes and does not reflect on its
+environment. Functions failing that analysis are left to the tree-walker.
+
+The translated code uses the runtime types of 'spl_lib' and the helpers of 'spl_interpreter', so that spl values
+keep their semantics. Nodes the transpiler has no translation for are evaluated by the tree-walker, in an
+environment built from the python locals.
+
+The compiled code object is cached in a '.spc' file next to the script, and is reused as long as none of the
+source files of the program or the optimization level changes. Nodes are referenced by their index in the
+pre-order of the syntax tree, which only depends on the source files and the optimization level.
+"""
+
+import hashlib
+import marshal
+import os
+import sys
+from bin import spl_ast as ast, spl_interpreter as itr, spl_vm as vm
+import bin.spl_lib as lib
+from bin.spl_bytecode import UnsupportedSyntax, REFLECTIVE_NAMES, is_isolated, is_plain_arg
+from bin.environment import FunctionEnvironment, UNDEFINED
+
+VERSION = 2
+CACHE_EXTENSION = ".spc"
+
+# Attributes that tell apart nodes of the same type, hashed into the cache key
+FINGERPRINT_ATTRIBUTES = ("name", "operation", "literal", "level", "class_name", "import_name", "counter")
+
+# Binary operators translated into python operators when both operands are int
+INLINE_OPERATORS = {"+", "-", "*", "%", "<", ">", "<=", ">=", "==", "!="}
+
+
+class Transpiled:
+    """
+    The translated python function of a spl function body.
+
+    ===== Attributes =====
+    :param function: the python function, called with the spl Function object followed by the arguments
+    :param n_params: the number of parameters
+    :param variadic: whether the function has an unpack or keyword unpack parameter
+    """
+
+    def __init__(self, function, n_params: int, variadic: bool):
+        self.function = function
+        self.n_params = n_params
+        self.variadic = variadic
+
+
+def install(root: ast.BlockStmt, env, script: str, opt_level: int):
+    """
+    Translates all functions of a program, and makes the interpreter call them as python functions.
+
+    :param root: the root of the abstract syntax tree
+    :param env: the global environment of the interpreter
+    :param script: the path of the main script, where the cache file is placed
+    :param opt_level: the level the tree is optimized at
+    :return: None
+    """
+    nodes = pre_order(root)
+    heap = set(env.heap)
+    key = cache_key(nodes, heap, opt_level)
+    cache_path = os.path.splitext(script)[0] + CACHE_EXTENSION
+
+    cached = load_cache(cache_path, key)
+    if cached is not None and not matches_table(nodes, cached[1]):
+        cached = None
+    if cached is None:
+        code, table = transpile(nodes, heap, script)
+        save_cache(cache_path, key, code, table)
+    else:
+        code, table = cached
+
+    namespace = dict(RUNTIME)
+    namespace["N"] = nodes
+    exec(code, namespace)
+    for index, name, n_params, variadic in table:
+        nodes[index].transpiled = Transpiled(namespace[name], n_params, variadic)
+
+    itr.set_function_caller(call_function)
+
+
+def has_continue(node) -> bool:
+    """
+    Returns True iff the node contains a 'continue' that belongs to a loop enclosing this node.
+
+    :param node: the node to be searched
+    :return: True iff the node contains a 'continue' of an enclosing loop
+    """
+    if not isinstance(node, ast.Node):
+        return False
+    t = node.node_type
+    if t == ast.CONTINUE_STMT:
+        return True
+    elif t == ast.WHILE_STMT or t == ast.FOR_LOOP_STMT or t == ast.DEF_STMT or t == ast.CLASS_STMT:
+        return False
+    return any(has_continue(child) for child in ast.children(node))
+
+
+def pre_order(root: ast.Node) -> list:
+    """
+    Returns all nodes of the tree in pre-order, together with the String objects hoisted into the tree by the
+    optimizer.
+
+    :param root: the root node
+    :return: all nodes and hoisted strings in pre-order
+    """
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.Node):
+            nodes.append(node)
+            stack.extend(reversed(ast.children(node)))
+        elif isinstance(node, lib.String):
+            nodes.append(node)
+    return nodes
+
+
+def cache_key(nodes: list, heap: set, opt_level: int) -> str:
+    """
+    Returns a digest of everything the translated code depends on.
+
+    :param nodes: all nodes of the program
+    :param heap: names of the global heap
+    :param opt_level: the level the tree is optimized at
+    :return: the digest
+    """
+    digest = hashlib.sha1()
+    digest.update("{} {} {} {}".format(VERSION, sys.version, opt_level, sorted(heap)).encode())
+    for node in nodes:  # the tree, which the node indices of the translated code refer to
+        digest.update(node_fingerprint(node).encode())
+    files = {node.file for node in nodes if isinstance(node, ast.Node) and isinstance(node.file, str)}
+    files.add(__file__)  # the translation itself
+    for file in sorted(files):
+        if os.path.isfile(file):
+            digest.update(file.encode())
+            with open(file, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def node_fingerprint(node) -> str:
+    """
+    Returns a description of a node without its child nodes: its type, position, names and constant operands.
+
+    :param node: a node or a hoisted String
+    :return: the description
+    """
+    if isinstance(node, lib.String):
+        return "S{!r};".format(node.literal)
+    parts = [type(node).__name__, str(node.line_num), str(node.file)]
+    for attr in FINGERPRINT_ATTRIBUTES:
+        if hasattr(node, attr):
+            parts.append(repr(getattr(node, attr)))
+    parts.extend(repr(child) for child in ast.children(node) if not isinstance(child, (ast.Node, lib.String)))
+    return " ".join(parts) + ";"
+
+
+def load_cache(path: str, key: str):
+    """
+    Returns the cached (code, table) of a program, None if there is no valid cache.
+
+    :param path: the path of the cache file
+    :param key: the cache key of the program
+    :return: the cached (code, table), or None
+    """
+    try:
+        with open(path, "rb") as f:
+            cached_key, code, table = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return (code, table) if cached_key == key else None
+
+
+def matches_table(nodes: list, table: list) -> bool:
+    """
+    Returns True iff every entry of a translation table is the body of a function with that many parameters.
+
+    :param nodes: all nodes of the program, in pre-order
+    :param table: the table of (body index, python name, n_params, variadic)
+    :return: True iff the table can be installed on the nodes
+    """
+    functions = {id(node.body): node for node in nodes if isinstance(node, ast.DefStmt)}
+    for index, name, n_params, variadic in table:
+        if index >= len(nodes) or id(nodes[index]) not in functions:
+            return False
+        if len(functions[id(nodes[index])].params.lines) != n_params:
+            return False
+    return True
+
+
+def save_cache(path: str, key: str, code, table: list):
+    try:
+        with open(path, "wb") as f:
+            marshal.dump((key, code, table), f)
+    except OSError:
+        pass
+
+
+def transpile(nodes: list, heap: set, script: str):
+    """
+    Translates all functions of a program into one python module.
+
+    :param nodes: all nodes of the program, in pre-order
+    :param heap: names of the global heap
+    :param script: the path of the main script
+    :return: the compiled code of the module, and a table of (body index, python name, n_params, variadic)
+    """
+    indices = {id(node): i for i, node in enumerate(nodes)}
+    sources = []
+    table = []
+    referenced = set()
+    for node in nodes:
+        if isinstance(node, ast.DefStmt) and not node.abstract and isinstance(node.body, ast.BlockStmt):
+            translator = FunctionTranspiler(node, indices, heap)
+            try:
+                sources.append(translator.transpile())
+            except UnsupportedSyntax:
+                continue
+            referenced |= translator.referenced
+            table.append((indices[id(node.body)], translator.name, len(translator.params), translator.variadic))
+
+    for index in sorted(referenced):
+        sources.append("n{} = N[{}]".format(index, index))
+    code = compile("\n\n".join(sources) + "\n", script + " (transpiled)", "exec")
+    return code, table
+
+
+class FunctionTranspiler:
+    """
+    Translates one spl function into the source of a python function.
+
+    ===== Attributes =====
+    :param scopes: the lexical scopes from the function scope to the innermost one, each maps spl names to
+        (python name, is_const)
+    :param loops: the enclosing loops, each is the name that the loop's result is assigned to, or None
+    :param referenced: indices of nodes referenced by the translated code
+    """
+
+    def __init__(self, node: ast.DefStmt, indices: dict, heap: set):
+        self.node = node
+        self.indices = indices
+        self.heap = heap
+        self.name = "f{}".format(indices[id(node.body)])
+        self.params = []
+        self.variadic = False
+        self.scopes = [{}]
+        self.loops = []
+        self.referenced = set()
+        self.lines = []
+        self.indent = 1
+        self.n_names = 0
+
+    def transpile(self) -> str:
+        """
+        Translates the function.
+
+        :return: the python source of the function
+        """
+        for p in self.node.params.lines:
+            if isinstance(p, ast.NameNode):
+                name = p.name
+            elif isinstance(p, ast.AssignmentNode) and isinstance(p.left, ast.NameNode):
+                name = p.left.name
+            elif isinstance(p, ast.UnaryOperator) and (p.operation == "unpack" or p.operation == "kw_unpack") and \
+                    isinstance(p.value, ast.NameNode):
+                name = p.value.name
+                self.variadic = True
+            else:
+                raise UnsupportedSyntax()
+            self.params.append(self.declare(name, False))
+
+        self.emit("o = func.outer_scope")
+        if any(isinstance(node, ast.JumpNode) for node in pre_order(self.node.body)):
+            self.emit("while True:")  # restarted by tail calls of the function itself
+            self.indent += 1
+        self.statement(self.node.body, "r")
+        self.emit("return r")
+        header = "def {}({}):".format(self.name, ", ".join(["func"] + self.params))
+        return "\n".join([header] + self.lines)
+
+    def emit(self, line: str):
+        self.lines.append("    " * self.indent + line)
+
+    def emit_block(self, node, target):
+        """
+        Emits an indented block, in a new lexical scope.
+
+        :param node: the node of the block
+        :param target: the name to store the value of the block, or None
+        :return: None
+        """
+        self.indent += 1
+        self.scopes.append({})
+        count = len(self.lines)
+        self.statement(node, target)
+        if len(self.lines) == count:
+            self.emit("pass")
+        self.scopes.pop()
+        self.indent -= 1
+
+    # Names
+
+    def new_name(self, prefix: str) -> str:
+        self.n_names += 1
+        return "{}{}".format(prefix, self.n_names)
+
+    def resolve(self, name: str):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def declare(self, name: str, const: bool) -> str:
+        if self.resolve(name) is not None or name in self.heap:
+            raise UnsupportedSyntax()  # re-declaration, leaves the error to the tree-walker
+        py_name = self.new_name("v") + "_" + name
+        self.scopes[-1][name] = py_name, const
+        return py_name
+
+    def ref(self, node: ast.Node) -> str:
+        index = self.indices[id(node)]
+        self.referenced.add(index)
+        return "n{}".format(index)
+
+    @staticmethod
+    def lf(node: ast.Node) -> str:
+        return repr((node.line_num, node.file))
+
+    # Statements
+
+    def statement(self, node, target):
+        """
+        Emits the statements of a node.
+
+        :param node: the node, or a raw value
+        :param target: the name to store the value of the node, or None
+        :return: None
+        """
+        if not isinstance(node, ast.Node):
+            if target is not None:
+                self.emit("{} = {}".format(target, self.expr(node)))
+            return
+
+        t = node.node_type
+        if t == ast.BLOCK_STMT and not node.standalone:
+            if len(node.lines) == 0:
+                if target is not None:
+                    self.emit("{} = None".format(target))
+            else:
+                last = len(node.lines) - 1
+                for i in range(last):
+                    self.statement(node.lines[i], None)
+                self.statement(node.lines[last], target)
+        elif t == ast.IF_STMT:
+            self.emit("if {}:".format(self.expr(node.condition)))
+            self.emit_block(node.then_block, target)
+            if node.else_block is not None or target is not None:
+                self.emit("else:")
+                self.emit_block(node.else_block, target)
+        elif t == ast.WHILE_STMT:
+            self.while_loop(node, target)
+        elif t == ast.FOR_LOOP_STMT:
+            lines = node.condition.lines
+            if len(lines) == 3:
+                self.for_range(node, lines, target)
+            elif len(lines) == 2:
+                self.for_each(node, lines, target)
+            else:
+                raise UnsupportedSyntax()
+        elif t == ast.UNARY_OPERATOR and node.operation == "return":
+            if isinstance(node.value, ast.JumpNode):
+                self.tail_call(node.value.call)
+            else:
+                self.emit("return {}".format(self.expr(node.value)))
+        elif t == ast.BREAK_STMT or t == ast.CONTINUE_STMT:
+            if len(self.loops) == 0:
+                raise UnsupportedSyntax()
+            if self.loops[-1] is not None:
+                self.emit("{} = None".format(self.loops[-1]))
+            self.emit("break" if t == ast.BREAK_STMT else "continue")
+        elif t == ast.ASSIGNMENT_NODE and isinstance(node.left, ast.NameNode) and node.level != ast.FUNC_DEFINE:
+            value = self.expr(node.right)
+            if node.level == ast.ASSIGN:
+                local = self.resolve(node.left.name)
+                if local is None:
+                    self.emit_expr(self.store_outer(node.left, value), target)
+                    return
+                elif local[1]:
+                    raise UnsupportedSyntax()  # assignment to constant, leaves the error to the tree-walker
+                py_name = local[0]
+            else:
+                if node.level == ast.CONST and isinstance(node.right, ast.UndefinedNode):
+                    raise UnsupportedSyntax()
+                py_name = self.declare(node.left.name, node.level == ast.CONST)
+            self.emit("{} = {}".format(py_name, value))
+            if target is not None:
+                self.emit("{} = {}".format(target, py_name))
+        else:
+            self.emit_expr(self.expr(node), target)
+
+    def emit_expr(self, expr: str, target):
+        if target is None:
+            self.emit(expr)
+        else:
+            self.emit("{} = {}".format(target, expr))
+
+    def while_loop(self, node: ast.WhileStmt, target):
+        self.scopes.append({})  # the title scope
+        if target is not None:
+            self.emit("{} = 0".format(target))
+        self.emit("while {}:".format(self.expr(node.condition)))
+        self.loops.append(target)
+        self.emit_block(node.body, target)
+        self.loops.pop()
+        self.scopes.pop()
+
+    def for_range(self, node: ast.ForLoopStmt, lines: list, target):
+        start, end, step = lines
+        if not isinstance(step, ast.Node):
+            raise UnsupportedSyntax()
+        pre_step = step.node_type == ast.IN_DECREMENT_OPERATOR and not step.is_post
+
+        self.scopes.append({})  # the title scope
+        self.statement(start, target)
+        if pre_step or not has_continue(node.body):
+            self.emit("while {}:".format(self.expr(end)))
+            self.indent += 1
+            if pre_step:
+                self.statement(step, None)
+            self.indent -= 1
+        else:
+            # the step is run at the start of every iteration but the first, so that 'continue' runs it too
+            first = self.new_name("s")
+            self.emit("{} = True".format(first))
+            self.emit("while True:")
+            self.indent += 1
+            self.emit("if {}:".format(first))
+            self.emit("    {} = False".format(first))
+            self.emit("else:")
+            self.indent += 1
+            self.statement(step, None)
+            self.indent -= 1
+            self.emit("if not {}:".format(self.expr(end)))
+            self.emit("    break")
+            self.indent -= 1
+        self.loops.append(target)
+        self.emit_block(node.body, target)
+        self.loops.pop()
+        if not pre_step and not has_continue(node.body):
+            self.indent += 1
+            self.statement(step, None)
+            self.indent -= 1
+        self.scopes.pop()
+
+    def for_each(self, node: ast.ForLoopStmt, lines: list, target):
+        inv, iterable = lines
+        self.scopes.append({})  # the title scope
+        if isinstance(inv, ast.AssignmentNode) and isinstance(inv.left, ast.NameNode):
+            self.statement(inv, None)
+            invariant = inv.left
+        elif isinstance(inv, ast.NameNode):
+            invariant = inv
+        else:
+            raise UnsupportedSyntax()
+        if target is not None:
+            self.emit("{} = None".format(target))
+
+        item = self.new_name("t")
+        self.emit("for {} in iterate(func, {}, {}):".format(item, self.expr(iterable), self.ref(node)))
+        self.indent += 1
+        self.emit(self.store(invariant, item))
+        self.indent -= 1
+        self.loops.append(target)
+        self.emit_block(node.body, target)
+        self.loops.pop()
+        self.scopes.pop()
+
+    # Expressions
+
+    def tail_call(self, call: ast.FuncCall):
+        """
+        Emits a tail call, which restarts the function if it calls the function itself, and is otherwise returned to
+        the caller as a TailCall.
+
+        :param call: the call node
+        :return: None
+        """
+        args = call.args.lines
+        if call.call_obj.name in REFLECTIVE_NAMES or not all(is_plain_arg(arg) for arg in args):
+            self.emit("return {}".format(self.expr(call)))
+            return
+        callee = self.new_name("t")
+        values = [self.new_name("t") for _ in args]
+        self.emit("{} = {}".format(callee, self.expr(call.call_obj)))
+        for value, arg in zip(values, args):
+            self.emit("{} = {}".format(value, self.expr(arg)))
+        if len(self.loops) == 0 and not self.variadic and len(args) == len(self.params):
+            self.emit("if {} is func:".format(callee))
+            self.indent += 1
+            if len(self.params) > 0:
+                self.emit("{} = {}".format(", ".join(self.params), ", ".join(values)))
+            self.emit("continue")
+            self.indent -= 1
+        self.emit("return tail_call(func, {})".format(", ".join([self.ref(call), callee] + values)))
+
+    def expr(self, node) -> str:
+        """
+        Returns a python expression evaluating a node.
+
+        :param node: the node, or a raw value
+        :return: the python expression
+        """
+        if isinstance(node, lib.String):  # hoisted by the optimizer
+            return self.ref(node)
+        elif not isinstance(node, ast.Node):
+            return repr(node)
+        method = EXPR_TABLE.get(node.node_type)
+        if method is None:
+            raise UnsupportedSyntax()
+        return method(self, node)
+
+    def fallback(self, node: ast.Node) -> str:
+        if not is_isolated(node):
+            raise UnsupportedSyntax()
+        variables = []
+        constants = []
+        for scope in self.scopes:
+            for name in scope:
+                py_name, const = scope[name]
+                (constants if const else variables).append((name, py_name))
+        env = self.new_name("t")
+        result = self.new_name("t")
+        parts = ["({} := make_env(func, {{{}}}, {{{}}}))".format(
+            env,
+            ", ".join("{!r}: {}".format(name, py_name) for name, py_name in variables),
+            ", ".join("{!r}: {}".format(name, py_name) for name, py_name in constants)),
+            "({} := evaluate({}, {}))".format(result, self.ref(node), env)]
+        for name, py_name in variables:
+            parts.append("({} := {}.variables[{!r}])".format(py_name, env, name))
+        parts.append(result)
+        return "({})[-1]".format(", ".join(parts))
+
+    def store(self, key: ast.Node, value: str) -> str:
+        """
+        Returns a python expression assigning a value to an assignable node, with level 'ASSIGN'.
+
+        :param key: the node to be assigned
+        :param value: the python expression of the value
+        :return: the python expression
+        """
+        if isinstance(key, ast.NameNode):
+            local = self.resolve(key.name)
+            if local is None:
+                return self.store_outer(key, value)
+            elif local[1]:
+                raise UnsupportedSyntax()
+            return "({} := {})".format(local[0], value)
+        elif isinstance(key, ast.Dot) and isinstance(key.right, ast.NameNode):
+            return "set_attr({}, {}, {!r}, {})".format(value, self.expr(key.left), key.right.name, self.ref(key))
+        elif isinstance(key, ast.IndexingNode) and key.arg is not None:
+            args = [self.expr(arg) for arg in key.arg.lines]
+            return "set_index(func, {})".format(", ".join([value, self.expr(key.call_obj)] + args))
+        else:
+            raise UnsupportedSyntax()
+
+    def store_outer(self, key: ast.NameNode, value: str) -> str:
+        return "assign_outer(o, {!r}, {}, {})".format(key.name, value, self.lf(key))
+
+    def expr_literal(self, node: ast.LiteralNode) -> str:
+        return "String({!r})".format(node.literal)
+
+    def expr_undefined(self, node: ast.UndefinedNode) -> str:
+        return "UNDEFINED"
+
+    def expr_name(self, node: ast.NameNode) -> str:
+        local = self.resolve(node.name)
+        if local is None and node.depth == ast.HEAP_NAME:
+            return "o.heap[{!r}]".format(node.name)
+        elif local is None:
+            return "o.get({!r}, {})".format(node.name, self.lf(node))
+        return local[0]
+
+    def expr_assignment(self, node: ast.AssignmentNode) -> str:
+        key = node.left
+        level = node.level
+        value = self.expr(node.right)
+        if level == ast.ASSIGN:
+            return self.store(key, value)
+        elif (level == ast.VAR or level == ast.CONST) and isinstance(key, ast.NameNode):
+            if level == ast.CONST and isinstance(node.right, ast.UndefinedNode):
+                raise UnsupportedSyntax()
+            return "({} := {})".format(self.declare(key.name, level == ast.CONST), value)
+        else:
+            raise UnsupportedSyntax()
+
+    def binary(self, left: str, right: str, symbol: str, right_node) -> str:
+        rn = self.ref(right_node) if symbol == "instanceof" and isinstance(right_node, ast.Node) else "None"
+        if symbol in INLINE_OPERATORS:
+            a = self.new_name("t")
+            b = self.new_name("t")
+            return "({a} {op} {b} if (type({a} := {left}) is int) & (type({b} := {right}) is int) " \
+                   "else binary(func, {a}, {b}, {op!r}, None))".format(a=a, b=b, op=symbol, left=left, right=right)
+        return "binary(func, {}, {}, {!r}, {})".format(left, right, symbol, rn)
+
+    def expr_operator(self, node: ast.BinaryOperator) -> str:
+        if node.assignment:
+            symbol = node.operation[:-1]
+            value = self.binary(self.expr(node.left), self.expr(node.right), symbol, None)
+            return self.store(node.left, value)
+
+        symbol = node.operation
+        if symbol == "&&" or symbol == "and":
+            return "({} if lazy({}) else False)".format(self.expr(node.right), self.expr(node.left))
+        elif symbol == "||" or symbol == "or":
+            return "(True if lazy({}) else {})".format(self.expr(node.left), self.expr(node.right))
+        elif symbol == ":":
+            raise UnsupportedSyntax()
+        else:
+            return self.binary(self.expr(node.left), self.expr(node.right), symbol, node.right)
+
+    def expr_unary(self, node: ast.UnaryOperator) -> str:
+        operation = node.operation
+        if operation == "neg":
+            return "(-{})".format(self.expr(node.value))
+        elif operation == "!":
+            return "(not {})".format(self.expr(node.value))
+        elif operation == "new" or operation == "throw" or operation == "assert":
+            return self.fallback(node)
+        else:
+            raise UnsupportedSyntax()
+
+    def expr_ternary(self, node: ast.TernaryOperator) -> str:
+        if (node.first_op, node.second_op) != ("?", ":"):
+            raise UnsupportedSyntax()
+        return "({} if {} else {})".format(self.expr(node.mid), self.expr(node.left), self.expr(node.right))
+
+    def expr_in_decrement(self, node: ast.InDecrementOperator) -> str:
+        key = node.value
+        if not isinstance(key, ast.NameNode):
+            return self.fallback(node)
+        if node.operation == "++":
+            op, table = "+", "increment"
+        elif node.operation == "--":
+            op, table = "-", "decrement"
+        else:
+            raise UnsupportedSyntax()
+
+        local = self.resolve(key.name)
+        if local is None:
+            return "in_decrement_outer(o, {!r}, {}, {}, {})".format(
+                key.name, self.lf(key), node.is_post, table.upper() + "_TABLE")
+        elif local[1]:
+            raise UnsupportedSyntax()
+        v = local[0]
+        if node.is_post:
+            old = self.new_name("t")
+            return "(({old} := {v}), ({v} := {old} {op} 1 if type({old}) is int else {table}({old})))[0]" \
+                .format(old=old, v=v, op=op, table=table)
+        else:
+            return "({v} := {v} {op} 1 if type({v}) is int else {table}({v}))".format(v=v, op=op, table=table)
+
+    def expr_block(self, node: ast.BlockStmt) -> str:
+        lines = node.lines
+        if not node.standalone:
+            if len(lines) == 0:
+                return "None"
+            elif len(lines) == 1:
+                return self.expr(lines[0])
+            return "({})[-1]".format(", ".join(self.expr(line) for line in lines))
+        if len(lines) == 0 or isinstance(lines[0], ast.AssignmentNode):
+            items = []
+            for line in lines:
+                if not isinstance(line, ast.AssignmentNode):
+                    raise UnsupportedSyntax()
+                items.append(self.expr(line.left))
+                items.append(self.expr(line.right))
+            return "build_pair({})".format(", ".join(items))
+        return "build_set({})".format(", ".join(self.expr(line) for line in lines))
+
+    def expr_func_call(self, node: ast.FuncCall) -> str:
+        if node.args is None:
+            raise UnsupportedSyntax()
+        call_obj = node.call_obj
+        if isinstance(call_obj, ast.NameNode) and call_obj.name in REFLECTIVE_NAMES:
+            raise UnsupportedSyntax()
+        if not all(is_plain_arg(arg) for arg in node.args.lines):
+            return self.fallback(node)
+        args = [self.expr(arg) for arg in node.args.lines]
+        return "call(func, {})".format(", ".join([self.ref(node), self.expr(call_obj)] + args))
+
+    def expr_jump(self, node: ast.JumpNode) -> str:
+        return self.expr(node.call)
+
+    def expr_dot(self, node: ast.Dot) -> str:
+        obj = node.right
+        if isinstance(obj, ast.NameNode):
+            return "get_attr({}, {}, {})".format(self.expr(node.left), self.ref(obj), self.ref(node))
+        elif isinstance(obj, ast.FuncCall) and obj.args is not None and isinstance(obj.call_obj, ast.NameNode):
+            if obj.call_obj.name in REFLECTIVE_NAMES:
+                raise UnsupportedSyntax()
+            if not all(is_plain_arg(arg) for arg in obj.args.lines):
+                return self.fallback(node)
+            args = [self.expr(arg) for arg in obj.args.lines]
+            return "call_method(func, {})".format(
+                ", ".join([self.ref(node), self.ref(obj.call_obj), self.expr(node.left)] + args))
+        else:
+            raise UnsupportedSyntax()
+
+    def expr_indexing(self, node: ast.IndexingNode) -> str:
+        if node.arg is None:
+            raise UnsupportedSyntax()
+        args = [self.expr(arg) for arg in node.arg.lines]
+        return "get_index(func, {})".format(", ".join([self.expr(node.call_obj)] + args))
+
+    def expr_try(self, node: ast.TryStmt) -> str:
+        return self.fallback(node)
+
+
+# Translations of expression node types, node types not listed here make the function not translated
+EXPR_TABLE = {
+    ast.LITERAL_NODE: FunctionTranspiler.expr_literal,
+    ast.NAME_NODE: FunctionTranspiler.expr_name,
+    ast.ASSIGNMENT_NODE: FunctionTranspiler.expr_assignment,
+    ast.DOT: FunctionTranspiler.expr_dot,
+    ast.BINARY_OPERATOR: FunctionTranspiler.expr_operator,
+    ast.UNARY_OPERATOR: FunctionTranspiler.expr_unary,
+    ast.TERNARY_OPERATOR: FunctionTranspiler.expr_ternary,
+    ast.BLOCK_STMT: FunctionTranspiler.expr_block,
+    ast.FUNCTION_CALL: FunctionTranspiler.expr_func_call,
+    ast.TRY_STMT: FunctionTranspiler.expr_try,
+    ast.UNDEFINED_NODE: FunctionTranspiler.expr_undefined,
+    ast.IN_DECREMENT_OPERATOR: FunctionTranspiler.expr_in_decrement,
+    ast.INDEXING_NODE: FunctionTranspiler.expr_indexing,
+    ast.JUMP_NODE: FunctionTranspiler.expr_jump,
+}
+
+
+# Runtime of the translated code
+
+
+def call_function(args: list, lf: tuple, func: itr.Function, call_env):
+    """
+    Calls a function, through its translated python function if there is one.
+
+    This function has the same signature and argument binding rules as 'spl_interpreter.call_function'.
+
+    :param args: the arguments list
+    :param lf: line and file of the caller
+    :param func: the function object itself
+    :param call_env: the environment where the function call was made
+    :return: the function result
+    """
+    if func.abstract:
+        raise lib.AbstractMethodException("Abstract method is not callable, in '{}', at line {}."
+                                          .format(lf[1], lf[0]))
+    target = func.body.transpiled
+    if target is None:
+        return itr.TREE_CALLER(args, lf, func, call_env)
+
+    pos_args, kwargs = itr.parse_function_args(args, call_env)
+    result = target.function(func, *vm.bind_args(pos_args, kwargs, lf, func, target.n_params))
+    return run_tail_calls(result) if type(result) is itr.TailCall else result
+
+
+def run_tail_calls(result):
+    """
+    Makes the tail calls returned by translated functions, until one returns a value.
+
+    :param result: the TailCall returned by a function
+    :return: the result of the last call
+    """
+    while type(result) is itr.TailCall:
+        func = result.func
+        target = func.body.transpiled
+        if target is None:
+            result = itr.run_function(result.pos_args, result.kwargs, result.lf, func,
+                                      FunctionEnvironment(func.outer_scope))
+        else:
+            result = target.function(func, *vm.bind_args(result.pos_args, result.kwargs, result.lf, func,
+                                                          target.n_params))
+    return result
+
+
+def call(func, node: ast.FuncCall, callee, *args):
+    if type(callee) is itr.Function and not callee.abstract:
+        target = callee.body.transpiled
+        if target is not None and not target.variadic:
+            n_args = len(args)
+            if n_args == target.n_params:
+                result = target.function(callee, *args)
+                return run_tail_calls(result) if type(result) is itr.TailCall else result
+            elif n_args < target.n_params:
+                args = list(args)
+                params = callee.params
+                for i in range(n_args, target.n_params):
+                    if params[i].preset is itr.INVALID:
+                        raise lib.ArgumentException(
+                            "Function at <{}> missing a positional argument '{}', in file '{}', at line {}"
+                            .format(callee.id, params[i].name, node.file, node.line_num))
+                    args.append(params[i].preset)
+                result = target.function(callee, *args)
+                return run_tail_calls(result) if type(result) is itr.TailCall else result
+    return vm.call_value(callee, list(args), (node.line_num, node.file), node, FunctionEnvironment(func.outer_scope))
+
+
+def tail_call(func, node: ast.FuncCall, callee, *args):
+    if type(callee) is itr.Function and not callee.abstract:
+        return itr.TailCall(callee, list(args), {}, (node.line_num, node.file))
+    return call(func, node, callee, *args)
+
+
+def call_method(func, node: ast.Dot, call_obj: ast.NameNode, instance, *args):
+    if isinstance(instance, lib.NativeType):
+        try:
+            return itr.native_types_call(instance, call_obj, list(args), FunctionEnvironment(func.outer_scope))
+        except IndexError as ie:
+            raise lib.IndexOutOfRangeException(str(ie) + " in file: '{}', at line {}"
+                                               .format(node.file, node.line_num))
+    elif isinstance(instance, itr.ClassInstance) or isinstance(instance, itr.Module):
+        callee = itr.get_attribute(instance, call_obj.name, (call_obj.line_num, call_obj.file))
+        return call(func, node, callee, *args)
+    else:
+        raise lib.TypeException("Not a class instance; {} instead, in file '{}', at line {}"
+                                .format(itr.typeof(instance), node.file, node.line_num))
+
+
+def get_attr(instance, obj: ast.NameNode, node: ast.Dot):
+    if isinstance(instance, lib.NativeType):
+        return itr.native_types_attr_invoke(instance, obj)
+    elif isinstance(instance, itr.ClassInstance) or isinstance(instance, itr.Module):
+        return itr.get_attribute(instance, obj.name, (node.line_num, node.file))
+    else:
+        raise lib.TypeException("Type '{}' does not have attribute '{}', in '{}', at line {}"
+                                .format(itr.typeof(instance), obj.name, node.file, node.line_num))
+
+
+def set_attr(value, parent, name: str, key: ast.Dot):
+    if isinstance(parent, itr.ClassInstance) or isinstance(parent, itr.Module):
+        parent.env.assign(name, value, (key.line_num, key.file))
+        return value
+    else:
+        raise lib.TypeException("Type '{}' does not support attribute assignment, in file '{}', at line {}"
+                                .format(itr.typeof(parent), key.file, key.line_num))
+
+
+def get_index(func, obj, *args):
+    env = FunctionEnvironment(func.outer_scope)
+    if isinstance(obj, itr.ClassInstance):
+        return itr.call_function(list(args), itr.LINE_FILE, obj.env.get("__getitem__", itr.LINE_FILE), env)
+    elif isinstance(obj, lib.NativeType):
+        return itr.native_types_call(obj, GET_ITEM, list(args), env)
+    else:
+        raise lib.TypeException("Unknown type for indexing")
+
+
+def set_index(func, value, obj, *args):
+    env = FunctionEnvironment(func.outer_scope)
+    args = list(args)
+    args.append(value)
+    if isinstance(obj, itr.ClassInstance):
+        return itr.call_function(args, itr.LINE_FILE, obj.env.get("__setitem__", itr.LINE_FILE), env)
+    elif isinstance(obj, lib.NativeType):
+        return itr.native_types_call(obj, SET_ITEM, args, env)
+    else:
+        raise lib.TypeException("Unknown type for index assignment")
+
+
+def assign_outer(outer, name: str, value, lf: tuple):
+    outer.assign(name, value, lf)
+    return value
+
+
+def in_decrement_outer(outer, name: str, lf: tuple, is_post: bool, table: dict):
+    current = outer.get(name, lf)
+    post_val = table[type(current)](current)
+    outer.assign(name, post_val, lf)
+    return current if is_post else post_val
+
+
+def binary(func, left, right, symbol: str, right_node):
+    return itr.value_arithmetic(left, right, symbol, FunctionEnvironment(func.outer_scope), right_node)
+
+
+def lazy(value) -> bool:
+    if value is None or isinstance(value, bool) or isinstance(value, int) or isinstance(value, float):
+        return bool(value)
+    raise lib.InterpretException("Operator '||' '&&' do not support type.")
+
+
+def increment(value):
+    return itr.INCREMENT_TABLE[type(value)](value)
+
+
+def decrement(value):
+    return itr.DECREMENT_TABLE[type(value)](value)
+
+
+def build_pair(*items):
+    pair = lib.Pair({})
+    for i in range(0, len(items), 2):
+        pair.put(items[i], items[i + 1])
+    return pair
+
+
+def build_set(*items):
+    s = lib.Set()
+    for item in items:
+        s.add(item)
+    return s
+
+
+def iterate(func, iterable, node: ast.ForLoopStmt):
+    return vm.iterate(iterable, (node.line_num, node.file), node, FunctionEnvironment(func.outer_scope))
+
+
+def make_env(func, variables: dict, constants: dict):
+    env = FunctionEnvironment(func.outer_scope)
+    env.variables.update(variables)
+    env.constants.update(constants)
+    return env
+
+
+def evaluate(node: ast.Node, env):
+    return itr.evaluate(node, env)
+
+
+GET_ITEM = ast.NameNode(itr.LINE_FILE, "__getitem__")
+SET_ITEM = ast.NameNode(itr.LINE_FILE, "__setitem__")
+
+# Globals of the translated code
+RUNTIME = {
+    "String": lib.String,
+    "UNDEFINED": UNDEFINED,
+    "INCREMENT_TABLE": itr.INCREMENT_TABLE,
+    "DECREMENT_TABLE": itr.DECREMENT_TABLE,
+    "call": call,
+    "tail_call": tail_call,
+    "call_method": call_method,
+    "get_attr": get_attr,
+    "set_attr": set_attr,
+    "get_index": get_index,
+    "set_index": set_index,
+    "assign_outer": assign_outer,
+    "in_decrement_outer": in_decrement_outer,
+    "binary": binary,
+    "lazy": lazy,
+    "increment": increment,
+    "decrement": decrement,
+    "build_pair": build_pair,
+    "build_set": build_set,
+    "iterate": iterate,
+    "make_env": make_env,
+    "evaluate": evaluate,
+}
@@ -0,0 +1,396 @@
+""" The stack-based virtual machine of the spl interpreter.
+
+Executes spl functions compiled by 'spl_bytecode'. A call from compiled code to another compiled function pushes a
+new frame in the loop of 'execute' instead of recursing into python, so deeply recursive spl programs run in
+constant python stack depth. A tail call replaces the frame of the calling function instead, so tail recursion also
+runs in a constant number of frames.
+
+The virtual machine takes over function calls once installed. Code outside functions, and functions that cannot be
+compiled, are still evaluated by the tree-walking interpreter.
+"""
+
+from bin import spl_ast as ast, spl_interpreter as itr
+import bin.spl_lib as lib
+from bin.spl_bytecode import CodeObject, function_code, LOAD_CONST, LOAD_STRING, LOAD_FAST, STORE_FAST, \
+    LOAD_OUTER, STORE_OUTER, LOAD_ATTR, STORE_ATTR, LOAD_INDEX, STORE_INDEX, BINARY, AND_JUMP, OR_JUMP, NEG, NOT, \
+    INCREMENT, DECREMENT, JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE, CALL, CALL_METHOD, RETURN, POP, DUP, BUILD_PAIR, \
+    BUILD_SET, GET_ITER, FOR_ITER, EVAL, TAIL_CALL
+from bin.environment import FunctionEnvironment
+
+
+def install():
+    """
+    Makes the interpreter call every compiled spl function through the virtual machine.
+
+    :return: None
+    """
+    itr.set_function_caller(call_function)
+
+
+def call_function(args: list, lf: tuple, func: itr.Function, call_env):
+    """
+    Calls a function, through the virtual machine if the function can be compiled.
+
+    This function has the same signature and argument binding rules as 'spl_interpreter.call_function'.
+
+    :param args: the arguments list
+    :param lf: line and file of the caller
+    :param func: the function object itself
+    :param call_env: the environment where the function call was made
+    :return: the function result
+    """
+    if func.abstract:
+        raise lib.AbstractMethodException("Abstract method is not callable, in '{}', at line {}."
+                                          .format(lf[1], lf[0]))
+    code = function_code(func)
+    if code is None:
+        return itr.TREE_CALLER(args, lf, func, call_env)
+
+    pos_args, kwargs = itr.parse_function_args(args, call_env)
+    return execute(func, code, bind_args(pos_args, kwargs, lf, func, code.n_slots))
+
+
+def bind_args(pos_args: list, kwargs: dict, lf: tuple, func: itr.Function, n_slots: int) -> list:
+    """
+    Returns the local slots of a new frame, with arguments bound to parameters.
+
+    :param pos_args: the positional arguments
+    :param kwargs: the keyword arguments
+    :param lf: line and file of the caller
+    :param func: the function
+    :param n_slots: the number of local slots, at least the number of parameters
+    :return: the local slots
+    """
+    plan = func.plan
+    if plan is not None and not kwargs and len(pos_args) == len(plan):
+        return pos_args + [None] * (n_slots - len(plan))
+
+    slots = [None] * n_slots
+    params = func.params
+    variable_length = False
+    arg_index = 0
+    for i in range(len(params)):
+        param: itr.ParameterPair = params[i]
+        if param.preset is itr.UNPACK_ARGUMENT:
+            variable_length = True
+            slots[i] = lib.Array(*pos_args[arg_index:])
+            arg_index = max(arg_index, len(pos_args))
+        elif param.preset is itr.KW_UNPACK_ARGUMENT:
+            variable_length = True
+            pair = lib.Pair({})
+            for k in kwargs:
+                pair[lib.String(k)] = kwargs[k]
+            slots[i] = pair
+        elif i < len(pos_args):
+            slots[i] = pos_args[arg_index]
+            arg_index += 1
+        elif param.name in kwargs:
+            slots[i] = kwargs[param.name]
+        elif param.preset is not itr.INVALID:
+            slots[i] = param.preset
+        else:
+            raise lib.ArgumentException("Function at <{}> missing a positional argument '{}', in file '{}', at line {}"
+                                        .format(func.id, param.name, lf[1], lf[0]))
+    if not variable_length and len(pos_args) + len(kwargs) > len(params):
+        raise lib.ArgumentException("Too many arguments for function at <{}>, in file '{}', at line {}"
+                                    .format(func.id, lf[1], lf[0]))
+    return slots
+
+
+def make_env(func: itr.Function, slots: list, visible: tuple) -> FunctionEnvironment:
+    """
+    Returns an environment holding the current values of the visible local variables.
+
+    :param func: the running function
+    :param slots: the local slots
+    :param visible: the visible local variables, as (name, slot, is_const)
+    :return: the environment
+    """
+    env = FunctionEnvironment(func.outer_scope)
+    for name, slot, const in visible:
+        if const:
+            env.constants[name] = slots[slot]
+        else:
+            env.variables[name] = slots[slot]
+    return env
+
+
+def iterate(iterable, lf: tuple, node: ast.ForLoopStmt, env):
+    """
+    Returns a python iterator over the target of a for-each loop.
+
+    :param iterable: the target
+    :param lf: line and file of the loop
+    :param node: the loop node
+    :param env: the calling environment
+    :return: the python iterator
+    """
+    if isinstance(iterable, lib.Iterable):
+        return iter(iterable)
+    elif isinstance(iterable, itr.ClassInstance):
+        if itr.is_subclass_of(iterable.clazz, itr.lang_class("Iterator", env)):
+            return spl_iterator(iterable, lf, env)
+        elif itr.is_subclass_of(iterable.clazz, itr.lang_class("Iterable", env)):
+            iter_func = iterable.env.get("__iter__", lf)
+            iterator = itr.call_function([], lf, iter_func, env)
+            return iterate(iterator, lf, node, env)
+    raise lib.SplException(
+        "For-each loop on non-iterable objects, in {}, at line {}".format(node.file, node.line_num))
+
+
+def spl_iterator(iterator: itr.ClassInstance, lf: tuple, env):
+    next_func = iterator.env.get("__next__", lf)
+    has_next_func = iterator.env.get("__more__", lf)
+    while itr.call_function([], lf, has_next_func, env):
+        yield itr.call_function([], lf, next_func, env)
+
+
+def call_value(callee, args: list, lf: tuple, node: ast.Node, env):
+    """
+    Calls a callee that is not run in a new frame of the virtual machine.
+
+    :param callee: the evaluated callee
+    :param args: the evaluated arguments
+    :param lf: line and file of the call
+    :param node: the call node
+    :param env: the calling environment
+    :return: the call result
+    """
+    if isinstance(callee, itr.Function):
+        return itr.call_function(args, lf, callee, env)
+    elif isinstance(callee, itr.ClassInstance):
+        constructor = callee.env.get(callee.class_name, lf)
+        itr.call_function(args, lf, constructor, env)
+        return callee
+    elif isinstance(callee, itr.NativeFunction):
+        if callee.name == "getcwf" or callee.name == "main":
+            args.append(node.file)
+        result = callee.call(env, args, {})
+        if isinstance(result, ast.BlockStmt):
+            return itr.eval_eval(result, env)
+        else:
+            return result
+    else:
+        raise lib.InterpretException("Type '{}' is not a function call, in {}, at line {}."
+                                     .format(itr.typeof(callee), node.file, node.line_num))
+
+
+def execute(func: itr.Function, code: CodeObject, slots: list):
+    """
+    Runs a compiled function until it returns.
+
+    :param func: the function
+    :param code: the bytecode of the function
+    :param slots: the local slots, with arguments already bound
+    :return: the function result
+    """
+    frames = []
+    ops = code.ops
+    op_args = code.args
+    pc = 0
+    stack = []
+    env = None  # the environment passed to natives and the interpreter, created when first needed
+
+    while True:
+        op = ops[pc]
+        arg = op_args[pc]
+        pc += 1
+
+        if op == LOAD_FAST:
+            stack.append(slots[arg])
+        elif op == LOAD_CONST:
+            stack.append(arg)
+        elif op == STORE_FAST:
+            slots[arg] = stack.pop()
+        elif op == BINARY:
+            right = stack.pop()
+            left = stack[-1]
+            t = type(left)
+            if (t is int or t is float) and arg[1] is not None:
+                stack[-1] = arg[1](left, right)
+            else:
+                if env is None:
+                    env = FunctionEnvironment(func.outer_scope)
+                stack[-1] = itr.value_arithmetic(left, right, arg[0], env, arg[2])
+        elif op == JUMP_IF_FALSE:
+            if not stack.pop():
+                pc = arg
+        elif op == JUMP:
+            pc = arg
+        elif op == LOAD_OUTER:
+            stack.append(func.outer_scope.get(arg[0], arg[1]))
+        elif op == CALL or op == CALL_METHOD or op == TAIL_CALL:
+            argc = arg[0]
+            if argc:
+                args = stack[-argc:]
+                del stack[-argc:]
+            else:
+                args = []
+            if op != CALL_METHOD:
+                callee = stack.pop()
+            else:
+                instance = stack.pop()
+                if isinstance(instance, lib.NativeType):
+                    if env is None:
+                        env = FunctionEnvironment(func.outer_scope)
+                    try:
+                        stack.append(itr.native_types_call(instance, arg[3], args, env))
+                    except IndexError as ie:
+                        node = arg[2]
+                        raise lib.IndexOutOfRangeException(str(ie) + " in file: '{}', at line {}"
+                                                           .format(node.file, node.line_num))
+                    continue
+                elif isinstance(instance, itr.ClassInstance) or isinstance(instance, itr.Module):
+                    call_obj = arg[3]
+                    callee = itr.get_attribute(instance, call_obj.name, (call_obj.line_num, call_obj.file))
+                else:
+                    node = arg[2]
+                    raise lib.TypeException("Not a class instance; {} instead, in file '{}', at line {}"
+                                            .format(itr.typeof(instance), node.file, node.line_num))
+
+            if isinstance(callee, itr.Function) and not callee.abstract:
+                callee_code = function_code(callee)
+                if callee_code is not None and not callee_code.variadic and argc <= callee_code.n_params:
+                    params = callee.params
+                    for i in range(argc, callee_code.n_params):
+                        preset = params[i].preset
+                        if preset is itr.INVALID:
+                            lf = arg[1]
+                            raise lib.ArgumentException(
+                                "Function at <{}> missing a positional argument '{}', in file '{}', at line {}"
+                                .format(callee.id, params[i].name, lf[1], lf[0]))
+                        args.append(preset)
+                    if callee_code.n_slots > callee_code.n_params:
+                        args.extend([None] * (callee_code.n_slots - callee_code.n_params))
+                    if op != TAIL_CALL:  # a tail call is followed by a return, so the frame is not needed
+                        frames.append((func, ops, op_args, pc, stack, slots, env))
+                    func = callee
+                    ops = callee_code.ops
+                    op_args = callee_code.args
+                    pc = 0
+                    stack = []
+                    slots = args
+                    env = None
+                    continue
+            if env is None:
+                env = FunctionEnvironment(func.outer_scope)
+            stack.append(call_value(callee, args, arg[1], arg[2], env))
+        elif op == RETURN:
+            value = stack.pop()
+            if not frames:
+                return value
+            func, ops, op_args, pc, stack, slots, env = frames.pop()
+            stack.append(value)
+        elif op == POP:
+            stack.pop()
+        elif op == DUP:
+            stack.append(stack[-1])
+        elif op == LOAD_STRING:
+            stack.append(lib.String(arg))
+        elif op == JUMP_IF_TRUE:
+            if stack.pop():
+                pc = arg
+        elif op == AND_JUMP or op == OR_JUMP:
+            value = stack[-1]
+            if value is None or isinstance(value, bool) or isinstance(value, int) or isinstance(value, float):
+                if op == AND_JUMP:
+                    if value:
+                        stack.pop()
+                    else:
+                        stack[-1] = False
+                        pc = arg
+                else:
+                    if value:
+                        stack[-1] = True
+                        pc = arg
+                    else:
+                        stack.pop()
+            else:
+                raise lib.InterpretException("Operator '||' '&&' do not support type.")
+        elif op == INCREMENT:
+            value = stack[-1]
+            stack[-1] = itr.INCREMENT_TABLE[type(value)](value)
+        elif op == DECREMENT:
+            value = stack[-1]
+            stack[-1] = itr.DECREMENT_TABLE[type(value)](value)
+        elif op == LOAD_ATTR:
+            instance = stack[-1]
+            obj = arg[0]
+            if isinstance(instance, lib.NativeType):
+                stack[-1] = itr.native_types_attr_invoke(instance, obj)
+            elif isinstance(instance, itr.ClassInstance) or isinstance(instance, itr.Module):
+                stack[-1] = itr.get_attribute(instance, obj.name, arg[1])
+            else:
+                node = arg[2]
+                raise lib.TypeException("Type '{}' does not have attribute '{}', in '{}', at line {}"
+                                        .format(itr.typeof(instance), obj.name, node.file, node.line_num))
+        elif op == STORE_ATTR:
+            parent = stack.pop()
+            value = stack.pop()
+            if isinstance(parent, itr.ClassInstance) or isinstance(parent, itr.Module):
+                parent.env.assign(arg[0], value, arg[1])
+            else:
+                key = arg[2]
+                raise lib.TypeException("Type '{}' does not support attribute assignment, in file '{}', at line {}"
+                                        .format(itr.typeof(parent), key.file, key.line_num))
+        elif op == STORE_OUTER:
+            func.outer_scope.assign(arg[0], stack.pop(), arg[1])
+        elif op == LOAD_INDEX or op == STORE_INDEX:
+            argc = arg[0]
+            args = stack[-argc:] if argc else []
+            del stack[len(stack) - argc:]
+            obj = stack.pop()
+            if op == LOAD_INDEX:
+                name = "__getitem__"
+            else:
+                name = "__setitem__"
+                args.append(stack.pop())
+            if env is None:
+                env = FunctionEnvironment(func.outer_scope)
+            if isinstance(obj, itr.ClassInstance):
+                stack.append(itr.call_function(args, itr.LINE_FILE, obj.env.get(name, itr.LINE_FILE), env))
+            elif isinstance(obj, lib.NativeType):
+                stack.append(itr.native_types_call(obj, ast.NameNode(itr.LINE_FILE, name), args, env))
+            elif op == LOAD_INDEX:
+                raise lib.TypeException("Unknown type for indexing")
+            else:
+                raise lib.TypeException("Unknown type for index assignment")
+        elif op == NEG:
+            stack[-1] = -stack[-1]
+        elif op == NOT:
+            stack[-1] = not bool(stack[-1])
+        elif op == FOR_ITER:
+            try:
+                stack.append(next(stack[-1]))
+            except StopIteration:
+                stack.pop()
+                pc = arg
+        elif op == GET_ITER:
+            if env is None:
+                env = FunctionEnvironment(func.outer_scope)
+            stack[-1] = iterate(stack[-1], arg[0], arg[1], env)
+        elif op == BUILD_PAIR:
+            pair = lib.Pair({})
+            if arg:
+                items = stack[-arg * 2:]
+                del stack[-arg * 2:]
+                for i in range(0, len(items), 2):
+                    pair.put(items[i], items[i + 1])
+            stack.append(pair)
+        elif op == BUILD_SET:
+            s = lib.Set()
+            if arg:
+                items = stack[-arg:]
+                del stack[-arg:]
+                for item in items:
+                    s.add(item)
+            stack.append(s)
+        elif op == EVAL:
+            node, visible = arg
+            eval_env = make_env(func, slots, visible)
+            stack.append(itr.evaluate(node, eval_env))
+            for name, slot, const in visible:
+                if not const:
+                    slots[slot] = eval_env.variables[name]
+        else:
+            raise lib.InterpretException("Unknown opcode {}".format(op))
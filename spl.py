@@ -4,12 +4,19 @@ import sys
 import script
 import time
 import os
-from bin import spl_lib as lib, spl_lexer, spl_parser as psr, spl_interpreter
+import pstats
+from bin import spl_lib as lib, spl_lexer, spl_parser as psr, spl_interpreter, spl_closure, spl_vm, \
+    spl_transpiler, spl_resolver, spl_optimizer, spl_ast, spl_profiler
 
 sys.setrecursionlimit(10000)
 
 EXE_NAME = "spl.py"
 
+HOT_NODES = 30  # number of nodes shown by '-et'
+HOT_FUNCTIONS = 20  # number of rows shown by the profilers
+COLLAPSED_EXTENSION = ".folded"
+PROFILE_EXTENSION = ".prof"
+
 INSTRUCTION = """Welcome to Slowest Programming Language.
 
 Try "{} help" to see usage.""".format(EXE_NAME)
@@ -23,11 +30,21 @@ Usage
 Description
 OPTIONS:    
     -a,   --ast,     abstract syntax tree    shows the structure of the abstract syntax tree     
+    -b,   --bytecode, bytecode compiler      executes spl functions as bytecode in a virtual machine
+    -C,   --closure, closure compiler        executes the program as compiled closures
     -d,   --debug,   debugger                enables debugger
-    -et,             execution               shows the execution times of each node
+    -et,             execution               shows the most executed nodes of the tree-walker
     -e,   --exit,    exit value              shows the program's exit value
     -l,   --link,    link                    write the linked script to file
     -ni,  --noimport                         do not automatically import lib.lang.sp
+    -O0,  -O1,  -O2,  optimization level     optimizes the syntax tree at the level, -O1 as default
+    -or,  --optreport, optimizer report      shows what each optimization pass changed
+          --profile,  tracing profiler         traces every call, writes 'pstats' statistics to a .prof file
+          --profile-sample, sampling profiler  samples the spl call stack, writes collapsed stacks for flamegraphs
+          --profile-alloc, allocation tracker  shows the types and spl lines that allocate the most objects,
+                                             only one of the three profilers can be given,
+                                             and '--profile' not with -b or -py
+    -py,  --python,  python transpiler       executes spl functions as transpiled python code
     -t,   --timer,   timer                   enables the timer
     -tk,  --tokens,   tokens                 shows language tokens
     -v,   --vars,    variables               prints out all global variables after execution
@@ -46,7 +63,10 @@ Example
 def parse_arg(args):
     d = {"file": None, "dir": None, "debugger": False, "timer": False, "ast": False, "tokens": False,
          "vars": False, "argv": [], "encoding": None, "exit": False, "exec_time": False, "link": False,
-         "import": True, "out": sys.stdout, "in": sys.stdin, "err": sys.stderr}
+         "import": True, "bytecode": False, "closure": False, "python": False, "optimize": 1,
+         "opt_report": False, "profile": False, "profile_sample": False, "profile_alloc": False,
+         "out": sys.stdout, "in": sys.stdin,
+         "err": sys.stderr}
     i = 1
     while i < len(args):
         arg: str = args[i]
@@ -61,6 +81,22 @@ def parse_arg(args):
                     d["timer"] = True
                 elif flag == "a" or flag == "-ast":
                     d["ast"] = True
+                elif flag == "b" or flag == "-bytecode":
+                    d["bytecode"] = True
+                elif flag == "C" or flag == "-closure":
+                    d["closure"] = True
+                elif flag == "py" or flag == "-python":
+                    d["python"] = True
+                elif flag == "O0" or flag == "O1" or flag == "O2":
+                    d["optimize"] = int(flag[1])
+                elif flag == "or" or flag == "-optreport":
+                    d["opt_report"] = True
+                elif flag == "-profile":
+                    d["profile"] = True
+                elif flag == "-profile-alloc":
+                    d["profile_alloc"] = True
+                elif flag == "-profile-sample":
+                    d["profile_sample"] = True
                 elif flag == "tk" or flag == "-tokens":
                     d["tokens"] = True
                 elif flag == "v" or flag == "-vars":
@@ -86,6 +122,11 @@ def parse_arg(args):
                 d["dir"] = spl_lexer.get_dir(arg)
                 d["argv"].append(arg)
         i += 1
+    if d["profile"] + d["profile_sample"] + d["profile_alloc"] > 1:
+        raise ArgumentsException("Only one of '--profile', '--profile-sample' and '--profile-alloc' can be given.")
+    if d["profile"] and (d["bytecode"] or d["python"]):
+        # compiled and transpiled functions call each other directly, without the traced caller
+        raise ArgumentsException("'--profile' cannot trace the calls of '-b' or '-py', use '--profile-sample'.")
     if d["file"] is None:
         print_usage()
         return None
@@ -109,9 +150,10 @@ def interpret(mode: str):
         lexer.setup(script.get_spl_path(), file_name, argv["dir"], link=argv["link"],
                     import_lang=argv["import"])
         lexer.tokenize(f)
-    # elif mode == "lsp":
-    #     lexer = spl_lexer.Tokenizer()
-    #     lexer.restore_tokens(f)
+    elif mode == "lsp":
+        lexer = spl_lexer.Tokenizer()
+        lexer.restore_tokens(f)
+        argv["argv"][0] = lexer.file_name  # the linked script runs as its source, for 'main()'
     else:
         raise Exception
 
@@ -123,20 +165,47 @@ def interpret(mode: str):
     parser = psr.Parser(lexer.get_tokens())
     block = parser.parse()
 
+    optimizer = spl_optimizer.Optimizer(argv["optimize"])
+    block = optimizer.optimize(block)
+    if argv["opt_report"]:
+        print(optimizer.report())
+
     if argv["ast"]:
         print("===== Abstract Syntax Tree =====")
         print(block)
         print("===== End of AST =====")
     if argv["debugger"]:
         spl_interpreter.DEBUG = True
+    if argv["bytecode"]:
+        spl_vm.install()
+    if argv["closure"]:
+        spl_closure.install()
+    if argv["exec_time"]:
+        spl_interpreter.set_evaluator(spl_interpreter.counting_evaluate)
 
     interpret_start = time.time()
 
     ioe = (argv["in"], argv["out"], argv["err"])
 
     itr = spl_interpreter.Interpreter(argv["argv"], argv["dir"], argv["encoding"], ioe)
+    spl_resolver.resolve(block, itr.env.heap)
     itr.set_ast(block)
-    result = itr.interpret()
+    if argv["python"]:
+        spl_transpiler.install(block, itr.env, file_name, argv["optimize"])
+    if argv["profile"] or argv["profile_sample"] or argv["profile_alloc"]:
+        if argv["profile"]:
+            profiler = spl_profiler.TracingProfiler(block, file_name)
+        elif argv["profile_alloc"]:
+            profiler = spl_profiler.AllocationTracker()
+        else:
+            profiler = spl_profiler.SamplingProfiler(block)
+        profiler.start()
+        try:
+            result = itr.interpret()
+        finally:
+            profiler.stop()
+    else:
+        result = itr.interpret()
 
     end = time.time()
 
@@ -154,7 +223,47 @@ def interpret(mode: str):
               (parse_start - lex_start, interpret_start - parse_start, end - interpret_start))
 
     if argv["exec_time"]:
-        print(block)
+        print_hot_nodes(block)
+
+    if argv["profile"]:
+        print_profile(profiler)
+    elif argv["profile_alloc"]:
+        print("===== Allocations =====")
+        print(profiler.table(HOT_FUNCTIONS))
+        print("===== End of Allocations =====")
+    elif argv["profile_sample"]:
+        print_samples(profiler)
+
+
+def print_hot_nodes(block):
+    print("===== Hot Nodes =====")
+    print("{:>10}  {:<30}  {:<16}  {}".format("count", "location", "node", "source"))
+    for node in spl_ast.hot_nodes(block, HOT_NODES):
+        location = "{}:{}".format(os.path.basename(str(node.file)), node.line_num)
+        source = " ".join(str(node).split())
+        if len(source) > 40:
+            source = source[:37] + "..."
+        print("{:>10}  {:<30}  {:<16}  {}".format(node.execution, location, type(node).__name__, source))
+    print("===== End of Hot Nodes =====")
+
+
+def print_profile(profiler):
+    path = os.path.splitext(file_name)[0] + PROFILE_EXTENSION
+    profiler.dump(path)
+    print("===== Profile =====")
+    pstats.Stats(path).sort_stats("tottime").print_stats(HOT_FUNCTIONS)
+    print("Statistics written to '{}'".format(path))
+    print("===== End of Profile =====")
+
+
+def print_samples(profiler):
+    path = os.path.splitext(file_name)[0] + COLLAPSED_EXTENSION
+    with open(path, "w") as stacks:
+        stacks.write(profiler.collapsed())
+    print("===== Sampling Profile =====")
+    print(profiler.table(HOT_FUNCTIONS))
+    print("Collapsed stacks written to '{}'".format(path))
+    print("===== End of Sampling Profile =====")
 
 
 class ArgumentsException(Exception):
@@ -0,0 +1,77 @@
+"""
+Runs every script of this directory that has an expected output, '<name>.out' next to '<name>.sp', in each
+execution mode and once linked into a '.lsp' file, and reports the scripts whose output differs.
+
+Usage: python3 tests/run_scripts.py
+"""
+
+import os
+import subprocess
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SPL = os.path.join(os.path.dirname(TESTS_DIR), "spl.py")
+
+# The flags of each execution mode
+MODES = {"tree": [], "closure": ["-C"], "bytecode": ["-b"], "python": ["-py"]}
+
+
+def run(flags: list, script: str) -> str:
+    """
+    Runs a script and returns everything it printed.
+
+    :param flags: the flags given to spl.py
+    :param script: the path of the script
+    :return: the output of the script
+    """
+    result = subprocess.run([sys.executable, SPL, *flags, script], stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, timeout=600)
+    return result.stdout
+
+
+def run_linked(script: str) -> str:
+    """
+    Links a script into a '.lsp' file, then runs the linked script and returns everything it printed.
+
+    :param script: the path of the script
+    :return: the output of the linked script
+    """
+    run(["-l"], script)
+    linked = script[:-3] + ".lsp"
+    try:
+        return run([], linked)
+    finally:
+        os.remove(linked)
+
+
+def expected_scripts() -> list:
+    """
+    Returns the paths of the scripts that have an expected output.
+
+    :return: the paths of the scripts
+    """
+    scripts = []
+    for name in sorted(os.listdir(TESTS_DIR)):
+        path = os.path.join(TESTS_DIR, name)
+        if name.endswith(".sp") and os.path.exists(path[:-3] + ".out"):
+            scripts.append(path)
+    return scripts
+
+
+if __name__ == "__main__":
+    failures = 0
+    for script in expected_scripts():
+        with open(script[:-3] + ".out") as f:
+            expected = f.read()
+        for mode, flags in MODES.items():
+            if run(flags, script) != expected:
+                print("FAIL {} ({})".format(os.path.basename(script), mode))
+                failures += 1
+        if run_linked(script) != expected:
+            print("FAIL {} (linked)".format(os.path.basename(script)))
+            failures += 1
+        cache = script[:-3] + ".spc"
+        if os.path.exists(cache):
+            os.remove(cache)
+    print("{} failures".format(failures))
+    sys.exit(failures != 0)